@@ -2,7 +2,8 @@
 Flask Application Factory
 """
 
-from flask import Flask
+import threading
+from flask import Flask, Request, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import config
@@ -12,9 +13,19 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 
 
+class AppRequest(Request):
+    """Request whose body size limit can be raised per endpoint (MAX_CONTENT_LENGTH_BY_ENDPOINT)"""
+
+    @property
+    def max_content_length(self):
+        limits = current_app.config.get('MAX_CONTENT_LENGTH_BY_ENDPOINT') or {}
+        return limits.get(self.endpoint, current_app.config['MAX_CONTENT_LENGTH'])
+
+
 def create_app(config_name='default'):
     """Create and configure the Flask application"""
     app = Flask(__name__)
+    app.request_class = AppRequest
     app.config.from_object(config[config_name])
 
     # Initialize extensions with app
@@ -22,6 +33,10 @@ def create_app(config_name='default'):
     login_manager.init_app(app)
     login_manager.login_view = 'main.login'
 
+    # Per-app agent singletons (built lazily, shut down on worker exit)
+    from app.agents.registry import init_agents
+    init_agents(app)
+
     # Register blueprints
     from app.views.main_views import main_blueprint
     from app.views.legal_views import legal_blueprint
@@ -29,4 +44,37 @@ def create_app(config_name='default'):
     app.register_blueprint(main_blueprint)
     app.register_blueprint(legal_blueprint, url_prefix='/legal')
 
+    @app.cli.command('init-db')
+    def init_db():
+        """Create database tables"""
+        create_tables()
+        print("✅ Database initialized successfully")
+
+    if app.config.get('CREATE_DB_ON_FIRST_REQUEST'):
+        _create_db_on_first_request(app)
+
     return app
+
+
+def create_tables():
+    """Create missing tables and the values generated once per database (e.g. the install ID)"""
+    db.create_all()
+
+    # Created here, outside any request's transaction, rather than on first use
+    from app.services.app_settings import get_install_id
+    get_install_id()
+
+
+def _create_db_on_first_request(app):
+    """Create tables before the first request instead of at import (ephemeral SQLite demos)"""
+    lock = threading.Lock()
+    state = {'done': False}
+
+    @app.before_request
+    def create_db_once():
+        if state['done']:
+            return
+        with lock:
+            if not state['done']:
+                create_tables()
+                state['done'] = True
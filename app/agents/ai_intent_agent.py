@@ -5,104 +5,61 @@ Uses ElevenLabs STT and Google Gemini for structured intent extraction
 
 import os
 import json
-from pydantic import BaseModel, Field
-from typing import Optional, Literal
-
-
-# Pydantic Schemas for Intent Extraction
-class OrderService(BaseModel):
-    """Schema for ordering a legal service"""
-    service_id: Literal["WY_DAO_LLC", "DE_LLC", "UCC1_FILING"] = Field(
-        description="The ID of the legal service to order"
-    )
-    entity_name: Optional[str] = Field(
-        default=None,
-        description="The name of the company, DAO, or LLC"
-    )
-    smart_contract_identifier: Optional[str] = Field(
-        default=None,
-        description="The public smart contract address for a DAO"
-    )
-    registered_agent_name: Optional[str] = Field(
-        default=None,
-        description="Name of the registered agent"
-    )
-    registered_agent_address: Optional[str] = Field(
-        default=None,
-        description="Address of the registered agent"
-    )
-    management_statement: Optional[str] = Field(
-        default=None,
-        description="Management structure (member-managed or algorithmically managed)"
-    )
-    # DE LLC fields
-    authorized_person_name: Optional[str] = Field(
-        default=None,
-        description="Name of authorized person for Delaware LLC"
-    )
-    # UCC-1 fields
-    debtor_name: Optional[str] = Field(
-        default=None,
-        description="Legal name of the debtor"
-    )
-    secured_party_name: Optional[str] = Field(
-        default=None,
-        description="Name of the secured party/creditor"
-    )
-    collateral_description: Optional[str] = Field(
-        default=None,
-        description="Description of collateral"
-    )
-
-
-class ReviewTask(BaseModel):
-    """Schema for lawyer review actions"""
-    action: Literal["approve", "reject", "comment"] = Field(
-        description="The action the lawyer is taking"
-    )
-    case_id: int = Field(
-        description="The unique case ID being reviewed"
-    )
-    memo: Optional[str] = Field(
-        default=None,
-        description="The lawyer's comments or suggestions for the client"
-    )
+from app.agents.intent_cache import get_intent_cache, intent_cache_key
+from app.agents.intent_prompts import get_prompt_registry
 
 
 class AiIntentAgent:
     """Agent for AI-powered intent extraction from voice or text"""
 
-    def __init__(self, mock_mode=None):
-        """Initialize AI Intent Agent"""
+    def __init__(self, mock_mode=None, cache=None, use_rules=True):
+        """
+        Initialize AI Intent Agent
+
+        Args:
+            mock_mode: Use canned results instead of ElevenLabs/Gemini (default: MOCK_MODE)
+            cache: Intent cache (default: the process-wide get_intent_cache())
+            use_rules: Try the local rule extractor before the cache and the LLM
+        """
         if mock_mode is None:
             mock_mode = os.environ.get('MOCK_MODE', 'True').lower() in ('true', '1', 'yes')
 
         self.mock_mode = mock_mode
         self.elevenlabs_key = os.environ.get("ELEVENLABS_API_KEY")
         self.gemini_key = os.environ.get("GEMINI_API_KEY")
-
-        # Initialize ElevenLabs client
-        if not self.mock_mode and self.elevenlabs_key:
+        self.cache = cache if cache is not None else get_intent_cache()
+        self.use_rules = use_rules
+
+        # SDK clients are created on first use: the elevenlabs and
+        # google.generativeai imports are slow and most requests need neither
+        self._eleven_client = None
+        self._gemini_model = None
+
+        if not self.mock_mode and not (self.elevenlabs_key and self.gemini_key):
+            print("⚠️  Missing ElevenLabs or Gemini API key, using mock mode")
+            self.mock_mode = True
+
+    @property
+    def eleven_client(self):
+        """ElevenLabs client (None in mock mode; falls back to mock mode if it cannot start)"""
+        if self._eleven_client is None and not self.mock_mode:
             try:
                 from elevenlabs.client import ElevenLabs
-                self.eleven_client = ElevenLabs(api_key=self.elevenlabs_key)
+                self._eleven_client = ElevenLabs(api_key=self.elevenlabs_key)
                 print("✅ ElevenLabs initialized")
             except Exception as e:
                 print(f"⚠️  ElevenLabs initialization failed: {e}")
                 self.mock_mode = True
-                self.eleven_client = None
-        else:
-            self.eleven_client = None
-            if not self.mock_mode:
-                print("⚠️  Missing ElevenLabs API key, using mock mode")
-                self.mock_mode = True
+        return self._eleven_client
 
-        # Initialize Gemini client
-        if not self.mock_mode and self.gemini_key:
+    @property
+    def gemini_model(self):
+        """Gemini model (None in mock mode; falls back to mock mode if it cannot start)"""
+        if self._gemini_model is None and not self.mock_mode:
             try:
                 import google.generativeai as genai
                 genai.configure(api_key=self.gemini_key)
-                self.gemini_model = genai.GenerativeModel(
+                self._gemini_model = genai.GenerativeModel(
                     'gemini-1.5-pro-latest',
                     generation_config={"response_mime_type": "application/json"}
                 )
@@ -110,24 +67,20 @@ class AiIntentAgent:
             except Exception as e:
                 print(f"⚠️  Gemini initialization failed: {e}")
                 self.mock_mode = True
-                self.gemini_model = None
-        else:
-            self.gemini_model = None
-            if not self.mock_mode:
-                print("⚠️  Missing Gemini API key, using mock mode")
-                self.mock_mode = True
+        return self._gemini_model
 
     def transcribe_audio(self, audio_file_bytes):
         """
         Transcribe audio to text using ElevenLabs STT
 
         Args:
-            audio_file_bytes: Audio file as bytes
+            audio_file_bytes: Audio file as bytes, or a binary file object
+                (streamed to ElevenLabs in chunks instead of buffered)
 
         Returns:
             Transcribed text or None
         """
-        if self.mock_mode:
+        if self.mock_mode or self.eleven_client is None:
             print("🔧 MOCK: Transcribing audio...")
             return "I need to form a Wyoming DAO called 'DeFi Collective DAO' with smart contract at 0x1234567890abcdef"
 
@@ -140,18 +93,59 @@ class AiIntentAgent:
             print(f"❌ ElevenLabs STT Error: {e}")
             return None
 
-    def _extract_json(self, transcript, schema_description):
+    def transcribe_file(self, path):
         """
-        Extract structured JSON from transcript using Gemini
+        Transcribe an audio file on disk (e.g. a spooled voice upload)
+
+        The open file is handed to the SDK, whose multipart upload reads it
+        in chunks, so long recordings are never held in memory.
+
+        Returns:
+            Transcribed text or None
+        """
+        with open(path, 'rb') as audio_file:
+            return self.transcribe_audio(audio_file)
+
+    def _extract(self, transcript, prompt, use_cache=True):
+        """
+        Extract a validated intent from transcript
+
+        Formulaic requests are answered by the local rule extractor; the rest
+        come from the intent cache or, failing that, the model.
 
         Args:
             transcript: Text to analyze
-            schema_description: Description of expected JSON schema
+            prompt: IntentPrompt from the prompt registry
+            use_cache: Set False to skip the cache lookup and always call the model
 
         Returns:
-            Parsed JSON dict or None
+            Instance of prompt.model, or None
         """
-        if self.mock_mode:
+        if self.use_rules:
+            rules = get_prompt_registry().rules
+            data, confidence = rules.extract(prompt.name, transcript)
+            if rules.is_confident(confidence):
+                intent = prompt.validate(data)
+                if intent is not None:
+                    print(f"⚡ Rule-based {prompt.name} intent (confidence {confidence:.2f})")
+                    return intent
+
+        key = intent_cache_key(transcript, prompt.version)
+        if use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                print("⚡ Intent cache hit")
+                return prompt.model.model_validate(cached)
+
+        result = self._call_model(transcript, prompt)
+        intent = prompt.validate(result) if result is not None else None
+        if intent is not None:
+            self.cache.set(key, intent.model_dump(exclude_none=True))
+        return intent
+
+    def _call_model(self, transcript, prompt):
+        """Extract structured JSON from transcript using Gemini"""
+        if self.mock_mode or self.gemini_model is None:
             print(f"🔧 MOCK: Extracting intent from: {transcript}")
             # Return mock structured data
             if "wyoming" in transcript.lower() or "dao" in transcript.lower():
@@ -166,17 +160,8 @@ class AiIntentAgent:
             return None
 
         try:
-            prompt = f"""
-Extract the user's intent from this transcript into valid JSON matching this schema:
-{schema_description}
-
-Transcript: {transcript}
-
-Return ONLY valid JSON, no additional text.
-"""
-
             response = self.gemini_model.generate_content(
-                prompt,
+                prompt.render(transcript),
                 generation_config={"response_mime_type": "application/json"}
             )
 
@@ -188,15 +173,16 @@ Return ONLY valid JSON, no additional text.
             print(f"❌ Gemini Extraction Error: {e}")
             return None
 
-    def get_intent_from_voice_order(self, audio_file_bytes):
+    def get_intent_from_voice_order(self, audio_file_bytes, use_cache=True):
         """
         Extract order intent from voice audio
 
         Args:
             audio_file_bytes: Audio file bytes
+            use_cache: Set False to bypass the intent cache
 
         Returns:
-            Dict with extracted order data or None
+            OrderService model (see intent_prompts) or None
         """
         # Step 1: Transcribe
         transcript = self.transcribe_audio(audio_file_bytes)
@@ -204,48 +190,47 @@ Return ONLY valid JSON, no additional text.
             return None
 
         # Step 2: Extract structured data
-        schema_desc = OrderService.schema_json(indent=2)
-        return self._extract_json(transcript, schema_desc)
+        return self._extract(transcript, get_prompt_registry().order, use_cache)
 
-    def get_intent_from_text_order(self, text):
+    def get_intent_from_text_order(self, text, use_cache=True):
         """
         Extract order intent from text (alternative to voice)
 
         Args:
             text: User's text input
+            use_cache: Set False to bypass the intent cache
 
         Returns:
-            Dict with extracted order data or None
+            OrderService model (see intent_prompts) or None
         """
-        schema_desc = OrderService.schema_json(indent=2)
-        return self._extract_json(text, schema_desc)
+        return self._extract(text, get_prompt_registry().order, use_cache)
 
-    def get_intent_from_voice_review(self, audio_file_bytes):
+    def get_intent_from_voice_review(self, audio_file_bytes, use_cache=True):
         """
         Extract review intent from lawyer's voice
 
         Args:
             audio_file_bytes: Audio file bytes
+            use_cache: Set False to bypass the intent cache
 
         Returns:
-            Dict with review action or None
+            ReviewTask or None
         """
         transcript = self.transcribe_audio(audio_file_bytes)
         if not transcript:
             return None
 
-        schema_desc = ReviewTask.schema_json(indent=2)
-        return self._extract_json(transcript, schema_desc)
+        return self._extract(transcript, get_prompt_registry().review, use_cache)
 
-    def get_intent_from_text_review(self, text):
+    def get_intent_from_text_review(self, text, use_cache=True):
         """
         Extract review intent from lawyer's text
 
         Args:
             text: Lawyer's text input
+            use_cache: Set False to bypass the intent cache
 
         Returns:
-            Dict with review action or None
+            ReviewTask or None
         """
-        schema_desc = ReviewTask.schema_json(indent=2)
-        return self._extract_json(text, schema_desc)
+        return self._extract(text, get_prompt_registry().review, use_cache)
@@ -3,27 +3,189 @@ Circle Wallet Agent
 Manages Circle Developer-Controlled Wallets and gasless USDC transfers on Arc
 """
 
+import base64
 import os
+import time
 import uuid
-from web3 import Web3
+import threading
+import requests
+from flask import has_app_context
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from app.agents.wallet_balance_cache import get_balance_cache, read_usdc_balances
+
+
+# Transfer submissions per second and burst size, shared by every agent in the process
+# (keep at or below the Circle API quota for the API key)
+CIRCLE_TRANSFER_RATE = float(os.environ.get('CIRCLE_TRANSFER_RATE', '10'))
+CIRCLE_TRANSFER_BURST = int(os.environ.get('CIRCLE_TRANSFER_BURST', '20'))
+
+# Concurrent transfer submissions per dispatcher
+CIRCLE_TRANSFER_WORKERS = int(os.environ.get('CIRCLE_TRANSFER_WORKERS', '8'))
+
+# Retries reuse the transfer's idempotency key, so Circle never executes it twice
+TRANSFER_MAX_ATTEMPTS = 4
+TRANSFER_BACKOFF_SECONDS = 0.5
+
+# Namespace for idempotency keys derived from case_id and purpose
+TRANSFER_KEY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'agent-ledger/circle-transfers')
+
+# Mixed into every idempotency key so the same case IDs in another deployment, or in a reset
+# database, never give keys Circle has already seen (default: the database's install ID)
+CIRCLE_IDEMPOTENCY_SALT = os.environ.get('CIRCLE_IDEMPOTENCY_SALT')
+
+# Circle REST API used for transfer status lookups (override to point at a local mock server)
+CIRCLE_API_BASE_URL = os.environ.get('CIRCLE_API_BASE_URL', 'https://api.circle.com/v1/w3s').rstrip('/')
+CIRCLE_TIMEOUT = (5, 30)  # (connect, read) seconds
+
+# Public keys that webhook signatures (X-Circle-Signature) are verified with, by X-Circle-Key-Id
+CIRCLE_WEBHOOK_KEY_URL = os.environ.get(
+    'CIRCLE_WEBHOOK_KEY_URL', 'https://api.circle.com/v2/notifications/publicKey'
+).rstrip('/')
+
+# Shared WalletSet for client wallets (when unset, one is created once and stored in the database)
+CIRCLE_WALLET_SET_ID = os.environ.get('CIRCLE_WALLET_SET_ID')
+
+# Wallets created per create_wallets call (Circle's per-request maximum)
+WALLET_CREATE_BATCH_SIZE = 200
+
+# Circle transaction states after which a transfer never changes again
+TERMINAL_TRANSFER_STATES = frozenset(['COMPLETE', 'FAILED', 'CANCELLED', 'DENIED'])
+
+_transfer_rate_limiter = None
+_transfer_rate_limiter_lock = threading.Lock()
+_circle_session = None
+_circle_session_lock = threading.Lock()
+_arc_session = None
+_arc_session_lock = threading.Lock()
+
+# Wallet ID -> on-chain address (addresses never change, so entries never expire)
+_wallet_addresses = {}
+
+# Webhook key ID -> public key (Circle rotates keys by issuing new IDs)
+_webhook_keys = {}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: sustained rate_per_second with bursts up to capacity"""
+
+    def __init__(self, rate_per_second, capacity):
+        self.rate = float(rate_per_second)
+        self.capacity = max(1, int(capacity))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_transfer_rate_limiter():
+    """Get the process-wide token bucket for Circle transfer submissions"""
+    global _transfer_rate_limiter
+    with _transfer_rate_limiter_lock:
+        if _transfer_rate_limiter is None:
+            _transfer_rate_limiter = TokenBucket(CIRCLE_TRANSFER_RATE, CIRCLE_TRANSFER_BURST)
+    return _transfer_rate_limiter
+
+
+def get_circle_session():
+    """Get the process-wide keep-alive session for the Circle REST API"""
+    global _circle_session
+    with _circle_session_lock:
+        if _circle_session is None:
+            _circle_session = _build_circle_session()
+        return _circle_session
+
+
+def _build_circle_session():
+    """Keep-alive session pooled for the transfer dispatcher's workers"""
+    adapter = HTTPAdapter(pool_connections=CIRCLE_TRANSFER_WORKERS, pool_maxsize=CIRCLE_TRANSFER_WORKERS)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_arc_session():
+    """Get the process-wide keep-alive session for Arc JSON-RPC"""
+    global _arc_session
+    with _arc_session_lock:
+        if _arc_session is None:
+            _arc_session = _build_arc_session()
+        return _arc_session
+
+
+def _build_arc_session():
+    """Keep-alive session for batched balance reads"""
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_maxsize=CIRCLE_TRANSFER_WORKERS))
+    session.mount('http://', HTTPAdapter(pool_maxsize=CIRCLE_TRANSFER_WORKERS))
+    return session
+
+
+def transfer_idempotency_key(purpose, case_id, *parts):
+    """
+    Derive a stable idempotency key for a transfer
+
+    The same purpose, case and parts always give the same UUID within one
+    deployment and database, so a resubmitted transfer is recognised by
+    Circle instead of charged again. Keys are salted with
+    CIRCLE_IDEMPOTENCY_SALT or else the database's install ID, so another
+    environment or a reset database (reusing case IDs) gets new keys.
+
+    Args:
+        purpose: What the transfer is for (e.g. 'payment', 'escrow_settlement')
+        case_id: Case the transfer belongs to
+        *parts: Extra distinguishing values (e.g. a billing period)
+
+    Returns:
+        UUID string
+    """
+    name = ':'.join(str(part) for part in (purpose, case_id) + parts)
+    return str(uuid.uuid5(_transfer_key_namespace(), name))
+
+
+def _transfer_key_namespace():
+    """Idempotency key namespace of this deployment (needs an app context unless the salt is set)"""
+    salt = CIRCLE_IDEMPOTENCY_SALT
+    if not salt:
+        from app.services.app_settings import get_install_id
+        salt = get_install_id()
+    return uuid.uuid5(TRANSFER_KEY_NAMESPACE, salt)
 
 
 class CircleWalletAgent:
     """Agent for managing Circle WaaS wallets and transfers"""
 
-    def __init__(self, mock_mode=None):
+    def __init__(self, mock_mode=None, max_workers=CIRCLE_TRANSFER_WORKERS):
         """Initialize Circle Wallet Agent"""
         if mock_mode is None:
             mock_mode = os.environ.get('MOCK_MODE', 'True').lower() in ('true', '1', 'yes')
 
         self.mock_mode = mock_mode
+        self.max_workers = max_workers
+        self.rate_limiter = get_transfer_rate_limiter()
+        self._executor = None
+        self._executor_lock = threading.Lock()
         self.api_key = os.environ.get("CIRCLE_API_KEY")
         self.entity_secret = os.environ.get("CIRCLE_ENTITY_SECRET")
         self.arc_rpc_url = os.environ.get("ARC_RPC_URL", "https://rpc.testnet.arc.network")
         self.arc_chain_id = os.environ.get("ARC_CHAIN_ID", "5042002")
-
-        # Initialize Web3 connection to Arc
-        self.w3 = Web3(Web3.HTTPProvider(self.arc_rpc_url))
+        self._w3 = None
 
         # Initialize Circle SDK client (only if not in mock mode and keys exist)
         if not self.mock_mode and self.api_key and self.entity_secret:
@@ -46,46 +208,103 @@ class CircleWalletAgent:
                 print("⚠️  Missing Circle API credentials, using mock mode")
                 self.mock_mode = True
 
+    def get_wallet_set_id(self, known_id=None):
+        """
+        Get the WalletSet that client wallets are created under
+
+        Uses CIRCLE_WALLET_SET_ID, else the set stored in the database
+        (app_settings), else stores known_id (e.g. from the wallet pool) or
+        a newly created set, so every process shares one set.
+        """
+        if CIRCLE_WALLET_SET_ID:
+            return CIRCLE_WALLET_SET_ID
+
+        from app.services.app_settings import WALLET_SET_ID, setdefault_setting
+        return setdefault_setting(WALLET_SET_ID, known_id or self._create_wallet_set)
+
+    def _create_wallet_set(self):
+        """Create the client WalletSet; returns its ID"""
+        if self.mock_mode:
+            return f'mock_wallet_set_{uuid.uuid4().hex[:8]}'
+        wallet_set = self.client.create_wallet_set(name="agent_ledger_client_wallets")
+        wallet_set_id = wallet_set.data.wallet_set.id
+        print(f"✅ Created Circle WalletSet {wallet_set_id}")
+        return wallet_set_id
+
+    def create_wallets(self, count, wallet_set_id=None):
+        """
+        Create many wallets under one WalletSet
+
+        Uses one create_wallets call per WALLET_CREATE_BATCH_SIZE wallets, so
+        onboarding thousands of clients is a handful of API calls.
+
+        Args:
+            count: Number of wallets to create
+            wallet_set_id: WalletSet to use (default: get_wallet_set_id())
+
+        Returns:
+            List of wallet dicts (id, address, blockchain, state, wallet_set_id);
+            shorter than count if a call failed
+        """
+        wallet_set_id = wallet_set_id or self.get_wallet_set_id()
+        wallets = []
+
+        while len(wallets) < count:
+            batch = min(WALLET_CREATE_BATCH_SIZE, count - len(wallets))
+            if self.mock_mode:
+                wallets.extend({
+                    'id': f'mock_wallet_{uuid.uuid4().hex[:12]}',
+                    'address': f'0x{uuid.uuid4().hex}{uuid.uuid4().hex[:8]}',
+                    'blockchain': 'ARC-TESTNET',
+                    'state': 'LIVE',
+                    'wallet_set_id': wallet_set_id
+                } for _ in range(batch))
+                continue
+
+            try:
+                response = self.client.create_wallets(
+                    wallet_set_id=wallet_set_id,
+                    account_type=self.types.AccountType.SCA,
+                    blockchains=[self.types.Blockchain.ARC_TESTNET],
+                    count=batch
+                )
+            except Exception as e:
+                print(f"❌ Error creating {batch} Circle wallets: {e}")
+                break
+
+            for wallet in response.data.wallets:
+                wallets.append({
+                    'id': wallet.id,
+                    'address': wallet.address,
+                    'blockchain': str(getattr(wallet.blockchain, 'value', wallet.blockchain)),
+                    'state': str(getattr(wallet.state, 'value', wallet.state)),
+                    'wallet_set_id': wallet_set_id
+                })
+
+        # Addresses are known now, so balance reads never need a wallet lookup
+        for wallet in wallets:
+            _wallet_addresses[wallet['id']] = wallet['address']
+
+        print(f"{'🔧 MOCK: ' if self.mock_mode else '✅ '}Created {len(wallets)} Circle wallets")
+        return wallets
+
     def create_wallet(self, user_id):
         """
-        Create a new wallet for a user
+        Create a new wallet for a user (prefer claiming one from the wallet pool)
 
         Args:
             user_id: The user's ID
 
         Returns:
-            Wallet object or mock wallet data
+            List with the wallet dict, or None
         """
-        if self.mock_mode:
-            # Return mock wallet data
-            mock_wallet = {
-                'id': f'mock_wallet_{user_id}_{uuid.uuid4().hex[:8]}',
-                'address': f'0x{uuid.uuid4().hex[:40]}',
-                'blockchain': 'ARC-TESTNET',
-                'state': 'LIVE'
-            }
-            print(f"🔧 MOCK: Created wallet {mock_wallet['id']}")
-            return [mock_wallet]
-
-        try:
-            # Create a WalletSet for the user
-            wallet_set_name = f"user_{user_id}_wallet_set"
-            wallet_set = self.client.create_wallet_set(name=wallet_set_name)
-
-            # Create a wallet on the Arc Testnet
-            response = self.client.create_wallets(
-                wallet_set_id=wallet_set.data.wallet_set.id,
-                account_type=self.types.AccountType.SCA,
-                blockchains=[self.types.Blockchain.ARC_TESTNET],
-                count=1
-            )
-            print(f"✅ Created Circle wallet for user {user_id}")
-            return response.data.wallets
-        except Exception as e:
-            print(f"❌ Error creating Circle wallet: {e}")
+        wallets = self.create_wallets(1)
+        if not wallets:
             return None
+        print(f"✅ Created Circle wallet for user {user_id}")
+        return wallets
 
-    def initiate_gasless_transfer(self, from_wallet_id, to_address, amount_usdc):
+    def initiate_gasless_transfer(self, from_wallet_id, to_address, amount_usdc, idempotency_key=None):
         """
         Initiate a gasless (developer-sponsored) USDC transfer on Arc
 
@@ -93,6 +312,9 @@ class CircleWalletAgent:
             from_wallet_id: Source wallet ID
             to_address: Destination wallet address or ID
             amount_usdc: Amount in USDC (as string)
+            idempotency_key: Stable key from transfer_idempotency_key; failed
+                attempts are retried with it (a random key is used if omitted,
+                in which case the transfer is not retried)
 
         Returns:
             Challenge ID or None if failed
@@ -106,51 +328,320 @@ class CircleWalletAgent:
             print(f"   Challenge ID: {mock_challenge_id}")
             return mock_challenge_id
 
+        # Without a stable key a retry could execute the transfer twice
+        max_attempts = TRANSFER_MAX_ATTEMPTS if idempotency_key else 1
+        idempotency_key = idempotency_key or str(uuid.uuid4())
+
+        for attempt in range(1, max_attempts + 1):
+            self.rate_limiter.acquire()
+            try:
+                challenge_id = self._create_transfer(from_wallet_id, to_address, amount_usdc, idempotency_key)
+                print(f"✅ Transfer initiated: {challenge_id}")
+                self.invalidate_balances([from_wallet_id, to_address])
+                return challenge_id
+
+            except Exception as e:
+                print(f"❌ Error initiating Circle transfer (attempt {attempt}/{max_attempts}): {e}")
+                if attempt < max_attempts:
+                    time.sleep(TRANSFER_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+        return None
+
+    def _create_transfer(self, from_wallet_id, to_address, amount_usdc, idempotency_key):
+        """
+        Submit one transfer to Circle; returns its transaction ID
+
+        Developer-controlled transfers need no user challenge: Circle returns
+        the transaction ID, which is what /transactions/{id} and the
+        transactions webhook (notification.id) refer to. It is stored in the
+        challenge_id columns.
+        """
         # Arc's native USDC address (system contract)
         token_address = "0x3600000000000000000000000000000000000000"
 
+        # Determine destination type (wallet ID vs address)
+        dest_type = "WALLET" if to_address.startswith("0x") else "WALLET"
+
+        response = self.client.create_transfer(
+            source=self.types.WalletLocation(
+                type="WALLET",
+                id=from_wallet_id
+            ),
+            destination=self.types.DestinationLocation(
+                type=dest_type,
+                address=to_address if to_address.startswith("0x") else None,
+                id=to_address if not to_address.startswith("0x") else None,
+                chain=self.arc_chain_id
+            ),
+            amount=self.types.Money(
+                amount=str(amount_usdc),
+                currency="USD"
+            ),
+            fee_level=self.types.FeeLevel.MEDIUM,  # Gas is sponsored by developer
+            idempotency_key=idempotency_key
+        )
+
+        return response.data.id
+
+    def _get_executor(self):
+        """Lazily start the bounded thread pool used by dispatch_transfers"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, self.max_workers),
+                    thread_name_prefix='circle-transfer'
+                )
+        return self._executor
+
+    def dispatch_transfers(self, transfers):
+        """
+        Submit many transfers concurrently
+
+        Transfers run on a bounded thread pool and share the process-wide
+        rate limit; each is retried safely under its idempotency key.
+
+        Args:
+            transfers: Iterable of dicts with from_wallet_id, to_address,
+                amount_usdc and either idempotency_key or purpose + case_id
+                (plus optional key_parts) to derive one
+
+        Returns:
+            List of futures, in input order, each resolving to a challenge ID or None
+        """
+        executor = self._get_executor()
+        futures = []
+
+        for transfer in transfers:
+            idempotency_key = transfer.get('idempotency_key')
+            if idempotency_key is None and transfer.get('purpose'):
+                idempotency_key = transfer_idempotency_key(
+                    transfer['purpose'], transfer.get('case_id'), *transfer.get('key_parts', ())
+                )
+
+            futures.append(executor.submit(
+                self.initiate_gasless_transfer,
+                transfer['from_wallet_id'],
+                transfer['to_address'],
+                transfer['amount_usdc'],
+                idempotency_key
+            ))
+
+        return futures
+
+    def shutdown(self):
+        """Stop the dispatcher pool after in-flight transfers finish"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def get_transfer_state(self, transfer_id):
+        """
+        Look up the current state of one transfer
+
+        Args:
+            transfer_id: Transaction ID returned by initiate_gasless_transfer
+
+        Returns:
+            Circle transaction state (e.g. 'QUEUED', 'COMPLETE', 'FAILED') or None if unknown
+        """
+        if transfer_id.startswith('mock_challenge_'):
+            # Mock transfers settle immediately
+            return 'COMPLETE'
+
+        self.rate_limiter.acquire()
         try:
-            # Determine destination type (wallet ID vs address)
-            dest_type = "WALLET" if to_address.startswith("0x") else "WALLET"
-
-            response = self.client.create_transfer(
-                source=self.types.WalletLocation(
-                    type="WALLET",
-                    id=from_wallet_id
-                ),
-                destination=self.types.DestinationLocation(
-                    type=dest_type,
-                    address=to_address if to_address.startswith("0x") else None,
-                    id=to_address if not to_address.startswith("0x") else None,
-                    chain=self.arc_chain_id
-                ),
-                amount=self.types.Money(
-                    amount=str(amount_usdc),
-                    currency="USD"
-                ),
-                fee_level=self.types.FeeLevel.MEDIUM,  # Gas is sponsored by developer
-                idempotency_key=str(uuid.uuid4())
+            response = get_circle_session().get(
+                f"{CIRCLE_API_BASE_URL}/transactions/{transfer_id}",
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                timeout=CIRCLE_TIMEOUT
             )
+            if response.status_code != 200:
+                print(f"❌ Circle status lookup for {transfer_id} failed: HTTP {response.status_code}")
+                return None
+            return response.json()['data']['transaction']['state']
 
-            challenge_id = response.data.challenge_id
-            print(f"✅ Transfer initiated: {challenge_id}")
-            return challenge_id
+        except Exception as e:
+            print(f"❌ Error looking up Circle transfer {transfer_id}: {e}")
+            return None
+
+    def get_transfer_states(self, transfer_ids):
+        """
+        Look up many transfers concurrently on the dispatcher pool
+
+        Lookups share the transfer rate limit, so a large batch is spread out
+        instead of bursting past the Circle quota.
+
+        Returns:
+            Dict of transfer ID -> state (None where the lookup failed)
+        """
+        transfer_ids = list(transfer_ids)
+        executor = self._get_executor()
+        futures = [executor.submit(self.get_transfer_state, transfer_id) for transfer_id in transfer_ids]
+        return {transfer_id: future.result() for transfer_id, future in zip(transfer_ids, futures)}
+
+    def verify_webhook_signature(self, body, signature, key_id):
+        """
+        Check a Circle webhook notification's signature
+
+        Circle signs the raw body with ECDSA/SHA-256 and names the key in
+        X-Circle-Key-Id; the public key is fetched once per key ID. Mock mode
+        accepts every notification, as there is no Circle to sign them.
+
+        Args:
+            body: Raw request body (bytes)
+            signature: Base64 X-Circle-Signature header
+            key_id: X-Circle-Key-Id header
+
+        Returns:
+            True if the notification was signed by Circle
+        """
+        if self.mock_mode:
+            return True
+        if not signature or not key_id:
+            return False
+
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        public_key = _webhook_keys.get(key_id) or self._fetch_webhook_key(key_id)
+        if public_key is None:
+            return False
+        try:
+            public_key.verify(base64.b64decode(signature), body, ec.ECDSA(hashes.SHA256()))
+            return True
+        except (InvalidSignature, ValueError):
+            return False
+
+    def _fetch_webhook_key(self, key_id):
+        """Fetch and cache a webhook public key; None if the lookup failed"""
+        from cryptography.hazmat.primitives.serialization import load_der_public_key
+
+        self.rate_limiter.acquire()
+        try:
+            response = get_circle_session().get(
+                f"{CIRCLE_WEBHOOK_KEY_URL}/{key_id}",
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                timeout=CIRCLE_TIMEOUT
+            )
+            if response.status_code != 200:
+                print(f"❌ Circle webhook key lookup for {key_id} failed: HTTP {response.status_code}")
+                return None
+            public_key = load_der_public_key(base64.b64decode(response.json()['data']['publicKey']))
 
         except Exception as e:
-            print(f"❌ Error initiating Circle transfer: {e}")
+            print(f"❌ Error looking up Circle webhook key {key_id}: {e}")
             return None
 
-    def get_wallet_balance(self, wallet_id):
-        """Get wallet balance (mock for now)"""
+        _webhook_keys[key_id] = public_key
+        return public_key
+
+    def get_wallet_address(self, wallet_id):
+        """
+        Resolve a Circle wallet ID to its on-chain address (0x addresses pass through)
+
+        Returns:
+            0x address or None if the lookup failed
+        """
+        if wallet_id.startswith('0x'):
+            return wallet_id
+        if wallet_id in _wallet_addresses:
+            return _wallet_addresses[wallet_id]
+
+        self.rate_limiter.acquire()
+        try:
+            response = get_circle_session().get(
+                f"{CIRCLE_API_BASE_URL}/wallets/{wallet_id}",
+                headers={'Authorization': f'Bearer {self.api_key}'},
+                timeout=CIRCLE_TIMEOUT
+            )
+            if response.status_code != 200:
+                print(f"❌ Circle wallet lookup for {wallet_id} failed: HTTP {response.status_code}")
+                return None
+            address = response.json()['data']['wallet']['address']
+
+        except Exception as e:
+            print(f"❌ Error looking up Circle wallet {wallet_id}: {e}")
+            return None
+
+        _wallet_addresses[wallet_id] = address
+        return address
+
+    def _read_balances(self, wallet_ids):
+        """Read balances straight from Arc: one JSON-RPC batch for all wallets"""
         if self.mock_mode:
-            return {
-                'wallet_id': wallet_id,
-                'balance': '1000.00',
-                'currency': 'USDC'
-            }
+            return {wallet_id: '1000.00' for wallet_id in wallet_ids}
 
-        # TODO: Implement real Circle balance check
-        return None
+        addresses = {wallet_id: self.get_wallet_address(wallet_id) for wallet_id in wallet_ids}
+        on_chain = read_usdc_balances(
+            self.arc_rpc_url,
+            [address for address in addresses.values() if address],
+            session=get_arc_session()
+        )
+        return {wallet_id: on_chain.get(address) if address else None
+                for wallet_id, address in addresses.items()}
+
+    def get_wallet_balances(self, wallet_ids):
+        """
+        Get USDC balances for many wallets
+
+        Balances come from the process-wide cache; only missing or expired
+        entries, and those of wallets a tracked transfer moved funds of since
+        they were read (by any process, see wallets_moved_since), are read
+        from Arc, together in one JSON-RPC batch.
+
+        Args:
+            wallet_ids: Circle wallet IDs or 0x addresses
+
+        Returns:
+            Dict of wallet ID -> balance dict (None where the read failed)
+        """
+        wallet_ids = [wallet_id for wallet_id in dict.fromkeys(wallet_ids) if wallet_id]
+        balances = get_balance_cache().get_many(wallet_ids, self._read_balances, self._moved_since)
+        return {
+            wallet_id: {'wallet_id': wallet_id, 'balance': balance, 'currency': 'USDC'}
+            if balance is not None else None
+            for wallet_id, balance in balances.items()
+        }
+
+    def _moved_since(self, wallet_ids, since):
+        """{wallet ID: when a tracked transfer last moved its funds} since a time"""
+        if not has_app_context():
+            return {}
+        from app.services.transfer_tracker import wallets_moved_since
+
+        # Transfers record the recipient by address, so look wallets up by both
+        addresses = {wallet_id: _wallet_addresses.get(wallet_id) for wallet_id in wallet_ids}
+        try:
+            moved = wallets_moved_since(list(wallet_ids) + [a for a in addresses.values() if a], since)
+        except Exception as e:
+            # Cached balances still expire after ARC_BALANCE_CACHE_TTL
+            print(f"❌ Could not check transfers for cached balances: {e}")
+            return {}
+
+        latest = {}
+        for wallet_id, address in addresses.items():
+            times = [moved[key] for key in (wallet_id, address) if key in moved]
+            if times:
+                latest[wallet_id] = max(times)
+        return latest
+
+    def get_wallet_balance(self, wallet_id):
+        """Get one wallet's USDC balance (see get_wallet_balances)"""
+        return self.get_wallet_balances([wallet_id]).get(wallet_id)
+
+    def invalidate_balances(self, wallet_ids):
+        """Forget cached balances of wallets our transfers touched"""
+        get_balance_cache().invalidate(wallet_ids)
+
+    @property
+    def w3(self):
+        """Web3 connection to Arc, created on first use (web3 is slow to import)"""
+        if self._w3 is None:
+            from web3 import Web3
+            self._w3 = Web3(Web3.HTTPProvider(self.arc_rpc_url))
+        return self._w3
 
     def check_arc_connection(self):
         """Check if connected to Arc network"""
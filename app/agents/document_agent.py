@@ -4,8 +4,71 @@ Manages document storage via Microsoft Graph/SharePoint (with local file fallbac
 """
 
 import os
+import io
+import shutil
+import asyncio
+import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from app.agents.graph_token_cache import get_token_cache
+
+
+# Connection pool and retry policy for Graph uploads
+GRAPH_POOL_SIZE = int(os.environ.get('MS_GRAPH_POOL_SIZE', '16'))
+GRAPH_MAX_RETRIES = 3
+GRAPH_BACKOFF_FACTOR = 0.5
+GRAPH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+GRAPH_TIMEOUT = (5, 60)  # (connect, read) seconds
+
+# Graph rejects simple /content uploads above 4 MB; larger files use upload sessions
+SIMPLE_UPLOAD_LIMIT = 4 * 1024 * 1024
+# Upload session chunks must be a multiple of 320 KiB
+UPLOAD_CHUNK_SIZE = int(os.environ.get('MS_GRAPH_UPLOAD_CHUNK_SIZE', str(320 * 1024 * 16)))
+UPLOAD_MAX_RESUMES = 5
+
+_graph_session = None
+_graph_session_lock = threading.Lock()
+
+
+def get_graph_session():
+    """
+    Get the process-wide keep-alive session for Microsoft Graph
+
+    The session reuses TCP/TLS connections across uploads and retries
+    throttled or transient failures with exponential backoff, honouring
+    Graph's Retry-After header.
+    """
+    global _graph_session
+    with _graph_session_lock:
+        if _graph_session is None:
+            _graph_session = _build_graph_session()
+        return _graph_session
+
+
+def _build_graph_session():
+    """Keep-alive session with a pooled adapter and the Graph retry policy"""
+    retry = Retry(
+        total=GRAPH_MAX_RETRIES,
+        backoff_factor=GRAPH_BACKOFF_FACTOR,
+        status_forcelist=GRAPH_RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'PUT', 'POST']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=GRAPH_POOL_SIZE,
+        pool_maxsize=GRAPH_POOL_SIZE,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 class DocumentAgent:
@@ -22,7 +85,10 @@ class DocumentAgent:
         self.client_secret = os.environ.get("MS_CLIENT_SECRET")
         self.site_id = os.environ.get("SHAREPOINT_SITE_ID")
         self.drive_id = os.environ.get("SHAREPOINT_DRIVE_ID")
+        self.graph_base_url = os.environ.get("MS_GRAPH_BASE_URL", "https://graph.microsoft.com/v1.0").rstrip('/')
         self.access_token = None
+        self.token_cache = None
+        self.session = get_graph_session()
 
         # Create local storage directory for mock mode
         self.local_storage_path = os.path.join(
@@ -48,25 +114,18 @@ class DocumentAgent:
                 self.mock_mode = True
 
     def _get_token(self):
-        """Get OAuth access token for Microsoft Graph"""
-        import msal
-
-        authority = f"https://login.microsoftonline.com/{self.tenant_id}"
-        scope = ["https://graph.microsoft.com/.default"]
-
-        app = msal.ConfidentialClientApplication(
-            self.client_id,
-            authority=authority,
-            client_credential=self.client_secret
-        )
+        """Get OAuth access token for Microsoft Graph (cached process-wide)"""
+        if self.token_cache is None:
+            self.token_cache = get_token_cache(self.tenant_id, self.client_id, self.client_secret)
 
-        result = app.acquire_token_for_client(scopes=scope)
+        self.access_token = self.token_cache.get_token()
+        return self.access_token
 
-        if "access_token" in result:
-            self.access_token = result['access_token']
-            print("✅ MS Graph token acquired")
-        else:
-            raise Exception("Could not acquire MS Graph token")
+    def _invalidate_token(self):
+        """Forget the current token after Graph rejects it"""
+        if self.token_cache is not None:
+            self.token_cache.invalidate()
+        self.access_token = None
 
     def upload_document(self, document_content_str, file_name, case_id):
         """
@@ -92,33 +151,34 @@ class DocumentAgent:
             print(f"📄 MOCK: Document saved to {file_path}")
             return file_path
 
+        body = document_content_str.encode('utf-8')
+        if len(body) > SIMPLE_UPLOAD_LIMIT:
+            return self.upload_file(io.BytesIO(body), file_name, case_id)
+
         # Real SharePoint upload
         try:
-            if not self.access_token:
-                self._get_token()
+            self._get_token()
 
-            folder_name = f"Case_{case_id}_Locker"
-            upload_url = (
-                f"https://graph.microsoft.com/v1.0/sites/{self.site_id}"
-                f"/drives/{self.drive_id}/items/root:/{folder_name}/{file_name}:/content"
+            response = self.session.put(
+                self._upload_url(file_name, case_id),
+                headers=self._upload_headers(),
+                data=body,
+                timeout=GRAPH_TIMEOUT
             )
 
-            headers = {
-                'Authorization': f'Bearer {self.access_token}',
-                'Content-Type': 'text/plain'
-            }
-
-            response = requests.put(
-                upload_url,
-                headers=headers,
-                data=document_content_str.encode('utf-8')
-            )
+            if response.status_code == 401:
+                # Token revoked or expired early: refresh once and retry
+                self._invalidate_token()
+                self._get_token()
+                response = self.session.put(
+                    self._upload_url(file_name, case_id),
+                    headers=self._upload_headers(),
+                    data=body,
+                    timeout=GRAPH_TIMEOUT
+                )
 
-            if response.status_code == 201:
-                doc_data = response.json()
-                web_url = doc_data.get('webUrl')
-                print(f"✅ Document uploaded to SharePoint: {web_url}")
-                return web_url
+            if response.status_code in (200, 201):
+                return self._uploaded_url(response.json())
             else:
                 print(f"❌ SharePoint Upload Error: {response.text}")
                 # Fallback to local storage
@@ -129,6 +189,277 @@ class DocumentAgent:
             # Fallback to local storage
             return self._fallback_local_upload(document_content_str, file_name, case_id)
 
+    def upload_file(self, source, file_name, case_id, chunk_size=UPLOAD_CHUNK_SIZE):
+        """
+        Stream a file of any size to the client locker
+
+        Files over the simple-upload limit go through a Graph upload session
+        in fixed-size range PUTs, so memory stays bounded by chunk_size. A
+        failed chunk is resumed from the server's nextExpectedRanges.
+
+        Args:
+            source: File path, binary file object, or iterable of bytes chunks
+            file_name: Name of the file
+            case_id: Case ID for folder organization
+            chunk_size: Bytes per range PUT (multiple of 320 KiB)
+
+        Returns:
+            URL to the uploaded document or local path
+        """
+        with self._open_source(source, chunk_size) as (stream, total_size):
+            if self.mock_mode:
+                return self._store_local_stream(stream, file_name, case_id, "MOCK: Document saved to")
+
+            try:
+                self._get_token()
+
+                if total_size <= SIMPLE_UPLOAD_LIMIT:
+                    # Bytes, not the stream: a retry by the session would re-send a consumed stream
+                    response = self.session.put(
+                        self._upload_url(file_name, case_id),
+                        headers=self._upload_headers('application/octet-stream'),
+                        data=stream.read(),
+                        timeout=GRAPH_TIMEOUT
+                    )
+                    if response.status_code not in (200, 201):
+                        raise Exception(response.text)
+                    return self._uploaded_url(response.json())
+
+                upload_url = self._create_upload_session(file_name, case_id)
+                return self._uploaded_url(
+                    self._upload_session_chunks(upload_url, stream, total_size, chunk_size)
+                )
+
+            except Exception as e:
+                print(f"❌ Error uploading to SharePoint: {e}")
+                stream.seek(0)
+                return self._store_local_stream(stream, file_name, case_id, "Fallback: Document saved locally to")
+
+    @contextmanager
+    def _open_source(self, source, chunk_size):
+        """Yield (seekable binary stream, total size) for an upload source"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as f:
+                yield f, os.path.getsize(source)
+            return
+
+        if hasattr(source, 'read') and hasattr(source, 'seek'):
+            source.seek(0, os.SEEK_END)
+            total_size = source.tell()
+            source.seek(0)
+            yield source, total_size
+            return
+
+        # Generators: spool to disk so the total size is known up front
+        with tempfile.SpooledTemporaryFile(max_size=chunk_size) as spool:
+            for chunk in source:
+                spool.write(chunk)
+            total_size = spool.tell()
+            spool.seek(0)
+            yield spool, total_size
+
+    def _create_upload_session(self, file_name, case_id):
+        """Create a Graph upload session and return its pre-authenticated URL"""
+        session_url = self._upload_url(file_name, case_id).replace(':/content', ':/createUploadSession')
+        response = self.session.post(
+            session_url,
+            headers={'Authorization': f'Bearer {self.access_token}'},
+            json={'item': {'@microsoft.graph.conflictBehavior': 'replace'}},
+            timeout=GRAPH_TIMEOUT
+        )
+
+        if response.status_code == 401:
+            self._invalidate_token()
+            self._get_token()
+            response = self.session.post(
+                session_url,
+                headers={'Authorization': f'Bearer {self.access_token}'},
+                json={'item': {'@microsoft.graph.conflictBehavior': 'replace'}},
+                timeout=GRAPH_TIMEOUT
+            )
+
+        if response.status_code != 200:
+            raise Exception(f"Could not create upload session: {response.text}")
+        return response.json()['uploadUrl']
+
+    def _upload_session_chunks(self, upload_url, stream, total_size, chunk_size):
+        """
+        PUT a stream to an upload session one byte range at a time
+
+        Returns:
+            The driveItem JSON returned by the final chunk
+        """
+        offset = 0
+        resumes = 0
+
+        while True:
+            stream.seek(offset)
+            chunk = stream.read(min(chunk_size, total_size - offset))
+            end = offset + len(chunk) - 1
+
+            # The upload URL is pre-authenticated; Graph rejects an Authorization header here
+            try:
+                response = self.session.put(
+                    upload_url,
+                    headers={
+                        'Content-Length': str(len(chunk)),
+                        'Content-Range': f'bytes {offset}-{end}/{total_size}'
+                    },
+                    data=chunk,
+                    timeout=GRAPH_TIMEOUT
+                )
+                if response.status_code in (200, 201):
+                    return response.json()
+                if response.status_code == 202:
+                    # Every accepted chunk must move the upload forward, or the loop never ends
+                    next_offset = self._next_expected_offset(response.json(), end + 1)
+                    if not offset < next_offset < total_size:
+                        raise Exception(f"Upload session expects byte {next_offset} after accepting "
+                                        f"bytes {offset}-{end} of {total_size}")
+                    offset = next_offset
+                    continue
+                error = response.text
+            except requests.RequestException as e:
+                error = str(e)
+
+            resumes += 1
+            if resumes > UPLOAD_MAX_RESUMES:
+                raise Exception(f"Upload session failed after {UPLOAD_MAX_RESUMES} resumes: {error}")
+
+            print(f"⚠️  Chunk at byte {offset} failed, resuming upload session: {error}")
+            status = self.session.get(upload_url, timeout=GRAPH_TIMEOUT)
+            if status.status_code != 200:
+                raise Exception(f"Upload session expired: {status.text}")
+            offset = self._next_expected_offset(status.json(), offset)
+            if not 0 <= offset < total_size:
+                raise Exception(f"Upload session expects byte {offset} of {total_size}")
+
+    @staticmethod
+    def _next_expected_offset(session_data, default):
+        """First byte the upload session still needs, from nextExpectedRanges"""
+        ranges = session_data.get('nextExpectedRanges') or []
+        if not ranges:
+            return default
+        return int(ranges[0].split('-')[0])
+
+    def _store_local_stream(self, stream, file_name, case_id, message):
+        """Copy a binary stream into the local case locker"""
+        case_folder = os.path.join(self.local_storage_path, f'Case_{case_id}_Locker')
+        os.makedirs(case_folder, exist_ok=True)
+
+        file_path = os.path.join(case_folder, file_name)
+        with open(file_path, 'wb') as f:
+            shutil.copyfileobj(stream, f)
+
+        print(f"📄 {message} {file_path}")
+        return file_path
+
+    def upload_documents(self, documents, max_concurrency=8):
+        """
+        Upload many documents concurrently
+
+        Uses httpx with asyncio when it is installed, otherwise a thread pool
+        over the shared keep-alive session. Each document that fails falls
+        back to local storage individually.
+
+        Args:
+            documents: Iterable of (document_content_str, file_name, case_id) tuples
+            max_concurrency: Maximum uploads in flight at once
+
+        Returns:
+            List of URLs or local paths, in the same order as documents
+        """
+        documents = list(documents)
+        if not documents:
+            return []
+
+        if self.mock_mode:
+            return [self.upload_document(*document) for document in documents]
+
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                return list(executor.map(lambda document: self.upload_document(*document), documents))
+
+        return asyncio.run(self.upload_documents_async(documents, max_concurrency=max_concurrency))
+
+    async def upload_documents_async(self, documents, max_concurrency=8):
+        """
+        Upload many documents concurrently with httpx (requires httpx)
+
+        Args:
+            documents: Iterable of (document_content_str, file_name, case_id) tuples
+            max_concurrency: Maximum uploads in flight at once
+
+        Returns:
+            List of URLs or local paths, in the same order as documents
+        """
+        import httpx
+
+        documents = list(documents)
+        if self.mock_mode:
+            return [self.upload_document(*document) for document in documents]
+
+        self._get_token()
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        transport = httpx.AsyncHTTPTransport(retries=GRAPH_MAX_RETRIES)
+
+        async with httpx.AsyncClient(limits=limits, transport=transport,
+                                     timeout=httpx.Timeout(GRAPH_TIMEOUT[1], connect=GRAPH_TIMEOUT[0])) as client:
+
+            async def upload_one(document_content_str, file_name, case_id):
+                async with semaphore:
+                    try:
+                        for attempt in range(GRAPH_MAX_RETRIES + 1):
+                            response = await client.put(
+                                self._upload_url(file_name, case_id),
+                                headers=self._upload_headers(),
+                                content=document_content_str.encode('utf-8')
+                            )
+                            if response.status_code == 401 and attempt < GRAPH_MAX_RETRIES:
+                                self._invalidate_token()
+                                await asyncio.to_thread(self._get_token)
+                                continue
+                            if response.status_code not in GRAPH_RETRY_STATUSES or attempt == GRAPH_MAX_RETRIES:
+                                break
+                            retry_after = response.headers.get('Retry-After')
+                            delay = float(retry_after) if retry_after and retry_after.isdigit() \
+                                else GRAPH_BACKOFF_FACTOR * (2 ** attempt)
+                            await asyncio.sleep(delay)
+
+                        if response.status_code in (200, 201):
+                            return self._uploaded_url(response.json())
+                        print(f"❌ SharePoint Upload Error: {response.text}")
+                    except Exception as e:
+                        print(f"❌ Error uploading to SharePoint: {e}")
+                    return self._fallback_local_upload(document_content_str, file_name, case_id)
+
+            return await asyncio.gather(*(upload_one(*document) for document in documents))
+
+    def _upload_url(self, file_name, case_id):
+        """Graph simple-upload URL for a file in a case locker"""
+        folder_name = f"Case_{case_id}_Locker"
+        return (
+            f"{self.graph_base_url}/sites/{self.site_id}"
+            f"/drives/{self.drive_id}/items/root:/{folder_name}/{file_name}:/content"
+        )
+
+    def _upload_headers(self, content_type='text/plain'):
+        """Headers for a Graph upload request"""
+        return {
+            'Authorization': f'Bearer {self.access_token}',
+            'Content-Type': content_type
+        }
+
+    def _uploaded_url(self, doc_data):
+        """Extract the web URL from a Graph driveItem response"""
+        web_url = doc_data.get('webUrl')
+        print(f"✅ Document uploaded to SharePoint: {web_url}")
+        return web_url
+
     def _fallback_local_upload(self, content, file_name, case_id):
         """Fallback to local storage if SharePoint fails"""
         case_folder = os.path.join(self.local_storage_path, f'Case_{case_id}_Locker')
@@ -0,0 +1,252 @@
+"""
+Graph Token Cache
+Process-wide Microsoft Graph access tokens with expiry tracking and proactive refresh
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: file cache still works, just without cross-process locking
+    fcntl = None
+
+
+GRAPH_SCOPE = ["https://graph.microsoft.com/.default"]
+
+# Refresh this many seconds before the token expires
+TOKEN_REFRESH_MARGIN = int(os.environ.get('MS_GRAPH_TOKEN_REFRESH_MARGIN', '300'))
+
+# Retry a failed or too-early background refresh after this many seconds
+TOKEN_REFRESH_RETRY_SECONDS = 30
+
+
+class GraphTokenCache:
+    """Thread-safe client-credentials token cache for one Azure AD app"""
+
+    def __init__(self, tenant_id, client_id, client_secret, cache_path=None,
+                 refresh_margin=TOKEN_REFRESH_MARGIN):
+        """
+        Initialize the token cache
+
+        Args:
+            tenant_id: Azure AD tenant ID
+            client_id: App registration client ID
+            client_secret: App registration secret
+            cache_path: Optional JSON file shared by all worker processes
+            refresh_margin: Seconds before expiry at which tokens are refreshed
+        """
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.cache_path = cache_path
+        self.refresh_margin = refresh_margin
+
+        self.access_token = None
+        self.expires_at = 0.0
+
+        self._app = None
+        self._lock = threading.RLock()
+        self._timer = None
+
+    def get_token(self):
+        """
+        Get a valid access token, acquiring one only when needed
+
+        Returns:
+            Access token string
+        """
+        token, expires_at = self.access_token, self.expires_at
+        if token and time.time() < expires_at - self.refresh_margin:
+            return token
+
+        with self._lock:
+            if self.access_token and time.time() < self.expires_at - self.refresh_margin:
+                return self.access_token
+            self._refresh()
+            return self.access_token
+
+    def invalidate(self):
+        """
+        Drop the cached token (e.g. after Graph rejects it with 401)
+
+        The MSAL app is dropped too: it keeps its own token cache and would
+        otherwise hand back the rejected token.
+        """
+        with self._lock:
+            self.access_token = None
+            self.expires_at = 0.0
+            self._app = None
+            self._write_file_cache(None, 0.0)
+
+    def shutdown(self):
+        """Stop the background refresh timer"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _refresh(self):
+        """Load a token from the shared file cache or acquire a new one"""
+        if self._adopt(self._read_file_cache()):
+            return
+
+        with self._file_lock():
+            # Another worker may have refreshed while we waited for the lock
+            if self._adopt(self._read_file_cache()):
+                return
+
+            token, expires_at = self._acquire()
+            self._write_file_cache(token, expires_at)
+            if not self._adopt((token, expires_at)):
+                # Lives shorter than the refresh margin: use it while it lasts and retry soon
+                self.access_token = token
+                self.expires_at = expires_at
+                self._schedule_refresh(TOKEN_REFRESH_RETRY_SECONDS)
+
+    def _adopt(self, entry):
+        """Use a (token, expires_at) entry if it is still fresh"""
+        if not entry:
+            return False
+
+        token, expires_at = entry
+        if not token or time.time() >= expires_at - self.refresh_margin:
+            return False
+
+        self.access_token = token
+        self.expires_at = expires_at
+        self._schedule_refresh()
+        return True
+
+    def _acquire(self):
+        """
+        Acquire a token from Azure AD using the cached MSAL app
+
+        MSAL serves tokens from its own cache until they are about to expire,
+        so a token inside our refresh margin means the app is rebuilt (its
+        cache dropped) and the token acquired again from Azure AD.
+        """
+        result = self._msal_app().acquire_token_for_client(scopes=GRAPH_SCOPE)
+        if "access_token" in result and int(result.get('expires_in', 3600)) <= self.refresh_margin:
+            self._app = None
+            result = self._msal_app().acquire_token_for_client(scopes=GRAPH_SCOPE)
+
+        if "access_token" not in result:
+            raise Exception(f"Could not acquire MS Graph token: {result.get('error_description', result.get('error'))}")
+
+        print("✅ MS Graph token acquired")
+        return result['access_token'], time.time() + int(result.get('expires_in', 3600))
+
+    def _msal_app(self):
+        """MSAL confidential client, built on first use and after invalidate()"""
+        if self._app is None:
+            import msal
+
+            self._app = msal.ConfidentialClientApplication(
+                self.client_id,
+                authority=f"https://login.microsoftonline.com/{self.tenant_id}",
+                client_credential=self.client_secret
+            )
+        return self._app
+
+    def _schedule_refresh(self, delay=None):
+        """Refresh in the background shortly before the token expires (or after delay seconds)"""
+        if self._timer:
+            self._timer.cancel()
+
+        if delay is None:
+            delay = max(self.expires_at - self.refresh_margin - time.time(), 1)
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        """Timer callback: refresh the token off the request path"""
+        with self._lock:
+            try:
+                self._refresh()
+            except Exception as e:
+                print(f"⚠️  Background MS Graph token refresh failed: {e}")
+                if self.access_token and time.time() < self.expires_at:
+                    self._schedule_refresh(TOKEN_REFRESH_RETRY_SECONDS)
+
+    def _read_file_cache(self):
+        """Read (token, expires_at) from the shared file cache"""
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                entry = json.load(f)
+            if entry.get('client_id') != self.client_id:
+                return None
+            return entry.get('access_token'), float(entry.get('expires_at', 0))
+        except (OSError, ValueError):
+            return None
+
+    def _write_file_cache(self, token, expires_at):
+        """Atomically write (token, expires_at) to the shared file cache"""
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({
+                    'client_id': self.client_id,
+                    'access_token': token,
+                    'expires_at': expires_at
+                }, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️  Could not write MS Graph token cache: {e}")
+
+    def _file_lock(self):
+        """Cross-process lock guarding token acquisition"""
+        return _FileLock(f"{self.cache_path}.lock" if self.cache_path and fcntl else None)
+
+
+class _FileLock:
+    """flock-based context manager; a no-op when path is None"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        if self.path:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_token_cache(tenant_id, client_id, client_secret):
+    """
+    Get the process-wide token cache for an app registration
+
+    The file-backed cache is enabled by setting MS_GRAPH_TOKEN_CACHE_PATH.
+    """
+    key = (tenant_id, client_id)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = GraphTokenCache(
+                tenant_id,
+                client_id,
+                client_secret,
+                cache_path=os.environ.get('MS_GRAPH_TOKEN_CACHE_PATH')
+            )
+            _caches[key] = cache
+        return cache
@@ -0,0 +1,192 @@
+"""
+Intent Cache
+Extracted intents keyed on a normalized transcript and the schema they were
+extracted with, in a process-wide LRU or an optional SQLite file shared by
+every worker process
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# Seconds an extracted intent is reused (0 disables expiry)
+INTENT_CACHE_TTL = float(os.environ.get('INTENT_CACHE_TTL', '86400'))
+
+# Entries kept by the in-memory LRU
+INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE', '1024'))
+
+# SQLite file shared by worker processes (in-memory LRU when unset)
+INTENT_CACHE_PATH = os.environ.get('INTENT_CACHE_PATH')
+
+_QUOTES = str.maketrans({'‘': "'", '’': "'", '“': '"', '”': '"'})
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_transcript(transcript):
+    """
+    Normalize a transcript for cache lookups
+
+    Whitespace, curly quotes and trailing punctuation are normalized; case is
+    kept because entity names are copied into filings exactly as spoken.
+    """
+    text = _WHITESPACE.sub(' ', str(transcript).translate(_QUOTES)).strip()
+    return text.rstrip('.!?, ')
+
+
+def intent_cache_key(transcript, schema):
+    """Cache key for a transcript extracted against a schema (string or schema version)"""
+    schema_hash = hashlib.sha256(str(schema).encode('utf-8')).hexdigest()[:16]
+    text_hash = hashlib.sha256(normalize_transcript(transcript).encode('utf-8')).hexdigest()
+    return f"{schema_hash}:{text_hash}"
+
+
+class MemoryIntentCache:
+    """Thread-safe LRU of extracted intents with TTL expiry"""
+
+    def __init__(self, max_size=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Cached intent for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] and entry[1] <= time.time()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, intent):
+        """Store an intent, evicting the least recently used entry when full"""
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[key] = (intent, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None
+            }
+
+
+class SQLiteIntentCache(MemoryIntentCache):
+    """
+    Intent cache in a SQLite file, shared by every process on the host
+
+    The in-memory LRU sits in front of the file, so repeat lookups in one
+    process never touch disk.
+    """
+
+    def __init__(self, path, max_size=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL):
+        super().__init__(max_size=max_size, ttl=ttl)
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS intent_cache "
+                "(key TEXT PRIMARY KEY, intent TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        """One connection per thread (sqlite3 connections are not shareable)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        intent = super().get(key)
+        if intent is not None:
+            return intent
+
+        try:
+            row = self._connect().execute(
+                "SELECT intent, expires_at FROM intent_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️  Intent cache read failed: {e}")
+            return None
+
+        if row is None or (row[1] and row[1] <= time.time()):
+            return None
+
+        intent = json.loads(row[0])
+        with self._lock:
+            # Counted as a miss by the LRU above; it was a hit after all
+            self.misses -= 1
+            self.hits += 1
+        MemoryIntentCache.set(self, key, intent)
+        return intent
+
+    def set(self, key, intent):
+        super().set(key, intent)
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO intent_cache (key, intent, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(intent), expires_at)
+                )
+                # Writes only follow a model call, so pruning here is cheap enough
+                conn.execute("DELETE FROM intent_cache WHERE expires_at > 0 AND expires_at <= ?", (time.time(),))
+        except sqlite3.Error as e:
+            print(f"⚠️  Intent cache write failed: {e}")
+
+    def clear(self):
+        super().clear()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM intent_cache")
+
+    def stats(self):
+        stats = super().stats()
+        stats['backend'] = 'sqlite'
+        return stats
+
+
+_intent_cache = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache():
+    """
+    Get the process-wide intent cache
+
+    The SQLite backend is enabled by setting INTENT_CACHE_PATH.
+    """
+    global _intent_cache
+    with _intent_cache_lock:
+        if _intent_cache is None:
+            _intent_cache = SQLiteIntentCache(INTENT_CACHE_PATH) if INTENT_CACHE_PATH else MemoryIntentCache()
+        return _intent_cache
@@ -0,0 +1,141 @@
+"""
+Intent Prompts
+Versioned extraction prompts and Pydantic schemas, built from the service
+catalog and rebuilt when it is reloaded
+"""
+
+import hashlib
+import threading
+from typing import Optional, Literal
+from pydantic import BaseModel, Field, ValidationError, create_model
+from app.agents.intent_rules import IntentRules
+from app.services.service_catalog import field_description, get_catalog
+
+
+class ReviewTask(BaseModel):
+    """Schema for lawyer review actions"""
+    action: Literal["approve", "reject", "comment"] = Field(
+        description="The action the lawyer is taking"
+    )
+    case_id: int = Field(
+        description="The unique case ID being reviewed"
+    )
+    memo: Optional[str] = Field(
+        default=None,
+        description="The lawyer's comments or suggestions for the client"
+    )
+
+
+def build_order_model(services):
+    """
+    Build the OrderService model for a service catalog
+
+    service_id is restricted to the catalog's IDs and every required field
+    of any service becomes an optional string field.
+    """
+    fields = {}
+    for service in services:
+        for field in service['required_fields']:
+            description = field_description(field)
+            fields.setdefault(field, (Optional[str], Field(default=None, description=description)))
+
+    service_ids = tuple(service['id'] for service in services)
+    return create_model(
+        'OrderService',
+        __doc__="Schema for ordering a legal service",
+        service_id=(Literal[service_ids], Field(description="The ID of the legal service to order")),
+        **fields
+    )
+
+
+def _field_lines(model, overrides=None):
+    """One compact 'name: description' line per model field"""
+    overrides = overrides or {}
+    lines = []
+    for name, field in model.model_fields.items():
+        required = '' if field.is_required() else ' (optional)'
+        lines.append(f"{name}{required}: {overrides.get(name, field.description)}")
+    return lines
+
+
+class IntentPrompt:
+    """A precompiled extraction prompt for one Pydantic model"""
+
+    def __init__(self, name, model, schema_lines):
+        self.name = name
+        self.model = model
+        schema = '\n'.join(schema_lines)
+        # Schema text changes (e.g. a new service) give a new version, which
+        # also retires intent cache entries extracted with the old prompt
+        self.version = f"{name}@{hashlib.sha256(schema.encode('utf-8')).hexdigest()[:12]}"
+        self._prefix = (
+            "Extract the intent from the transcript as one JSON object with these keys "
+            "(omit unknown values):\n" + schema + "\nTranscript: "
+        )
+
+    def render(self, transcript):
+        """Full prompt for a transcript"""
+        return self._prefix + transcript
+
+    def validate(self, data):
+        """
+        Validate extracted data into the prompt's model
+
+        Returns:
+            Model instance, or None if the data does not match the schema
+        """
+        try:
+            return self.model.model_validate(data)
+        except ValidationError as e:
+            print(f"⚠️  Extracted {self.name} intent failed validation: {e.error_count()} errors")
+            return None
+
+
+class PromptRegistry:
+    """Order and review prompts (and the local rule extractor) for one service catalog"""
+
+    def __init__(self, services, catalog_version=None):
+        self.services = services
+        self.catalog_version = catalog_version
+        self.order_model = build_order_model(services)
+        self.rules = IntentRules(services)
+
+        catalog = '; '.join(
+            f"{service['id']} = {service['name']} (needs {', '.join(service['required_fields'])})"
+            for service in services
+        )
+        self.order = IntentPrompt('order', self.order_model, _field_lines(
+            self.order_model, {'service_id': f"one of: {catalog}"}
+        ))
+        self.review = IntentPrompt('review', ReviewTask, _field_lines(ReviewTask, {
+            'action': "approve, reject or comment",
+            'case_id': "case number (integer)",
+            'memo': "the lawyer's comments for the client"
+        }))
+
+    def versions(self):
+        """Current prompt versions (reported by /legal/api/status)"""
+        return {'order': self.order.version, 'review': self.review.version}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_prompt_registry():
+    """
+    Get the process-wide prompt registry for the current service catalog
+
+    Built on first use and rebuilt once per catalog reload; the new prompt
+    versions retire intent cache entries extracted for the old catalog.
+    """
+    global _registry
+    catalog = get_catalog()
+    registry = _registry
+    if registry is not None and registry.catalog_version == catalog.version:
+        return registry
+
+    with _registry_lock:
+        if _registry is None or _registry.catalog_version != catalog.version:
+            _registry = PromptRegistry(catalog.services, catalog.version)
+        return _registry
@@ -0,0 +1,216 @@
+"""
+Intent Rules
+Deterministic local extraction of formulaic orders and reviews, with a
+confidence score deciding whether the LLM is needed at all
+"""
+
+import os
+import re
+
+
+# Rule results at or above this confidence skip the LLM
+INTENT_RULES_MIN_CONFIDENCE = float(os.environ.get('INTENT_RULES_MIN_CONFIDENCE', '0.9'))
+
+# Rule results of a hedged review instruction; below any sensible threshold
+# so the LLM decides what was meant
+HEDGED_CONFIDENCE = 0.5
+
+# Labels that start each field; a spoken value never runs into the next
+# field's label. A field's own label is not a stop ("Wyoming Registered
+# Agent Services" is a registered agent name)
+FIELD_LABELS = {
+    'registered_agent_name': r'registered agent',
+    'authorized_person_name': r'authori[sz]ed person',
+    'secured_party_name': r'secured party',
+    'smart_contract_identifier': r'(?:smart )?contract',
+    'debtor_name': r'debtor',
+    'collateral_description': r'collateral',
+    'management_statement': r'(?:member|manager)[- ]managed|algorithmically managed'
+}
+
+# Labels that can be part of a name or statement and so never end one
+# ("Collateral Partners LLC", "managed via smart contract governance")
+_WORD_LABELS = ('smart_contract_identifier', 'debtor_name', 'collateral_description', 'management_statement')
+
+
+def _next_label(*own_fields, words=True):
+    """Lookahead alternative for the start of any other field"""
+    labels = [label for field, label in FIELD_LABELS.items()
+              if field not in own_fields and (words or field not in _WORD_LABELS)]
+    return r'[,;]?\s+(?:' + '|'.join(labels) + r')\b'
+
+
+# Where a spoken value ends: punctuation or the start of the next clause
+_STOP = r'[,;]|\.(?:\s|$)|$|\s+(?:and|with|whose|where|plus)\s'
+
+
+def _value(*stop_words, field=None, words=True):
+    """Pattern capturing a spoken value (optionally quoted) up to the next clause or field label"""
+    stops = _STOP + '|' + _next_label(field, words=words) + ''.join(r'|\s+' + word + r'\s' for word in stop_words)
+    return r'["\']?(?P<value>[^"\',;]+?)["\']?\s*(?=' + stops + ')'
+
+
+def _labelled(field, label, *stop_words):
+    """Pattern for '<label> [is|will be] [:] <value>'"""
+    return r'\b' + label + r'(?:\s+(?:is|will be|should be))?\s*:?\s+' + _value(*stop_words, field=field)
+
+
+# Field patterns: each captures the spoken value in the 'value' group
+FIELD_PATTERNS = {
+    'entity_name': [r'\b(?:called|named)\s+' + _value(words=False)],
+    'smart_contract_identifier': [r'(?P<value>\b0x[0-9a-fA-F]{4,}\b)'],
+    'registered_agent_name': [_labelled('registered_agent_name', r'registered agent(?:\s+name)?', 'at')],
+    'registered_agent_address': [
+        r'\bregistered agent\b[^,;]*?\s+at\s+(?P<value>[^;]+?)\s*'
+        r'(?=;|\.$|$|\s+(?:and|with|whose|where|plus)\s|' + _next_label('registered_agent_name') + ')',
+        _labelled('registered_agent_name', r'registered agent address')
+    ],
+    'management_statement': [
+        r'(?P<value>\b(?:member[- ]managed|manager[- ]managed|algorithmically managed)\b[^,;.]*?)\s*'
+        r'(?=[,;.]|$|' + _next_label(*_WORD_LABELS) + ')'
+    ],
+    'authorized_person_name': [_labelled('authorized_person_name', r'authori[sz]ed person')],
+    'debtor_name': [_labelled('debtor_name', r'debtor(?:\s+name)?')],
+    'secured_party_name': [_labelled('secured_party_name', r'secured party(?:\s+name)?')],
+    'collateral_description': [
+        r'\bcollateral(?:\s+description)?(?:\s+(?:is|will be))?\s*:?\s+(?P<value>[^;]+?)\s*'
+        r'(?=;|\.$|$|' + _next_label('collateral_description') + ')'
+    ]
+}
+
+REVIEW_ACTIONS = {
+    'approve': r'\b(?:approve[sd]?|approving|lgtm|looks good to me|sign(?:ed)? off)\b',
+    'reject': r'\b(?:reject(?:ed|s)?|rejecting|decline[sd]?|deny|denied)\b',
+    'comment': r'\b(?:comment(?:ed|s)?|add (?:a )?note|note)\b'
+}
+
+# Negations, questions and hedges: the speaker is not (yet) giving the
+# instruction the action words suggest ("Do not approve case 42", "Should I
+# approve case 42?", "approve case 42 once the agent confirms")
+_HEDGE = re.compile(
+    r"\?|\b(?:not|no|never|don'?t|doesn'?t|won'?t|can'?t|cannot|couldn'?t|shouldn'?t|isn'?t|aren'?t|wouldn'?t"
+    r"|yet|should (?:i|we)|shall (?:i|we)|do (?:i|we)|can (?:i|we)|may(?:be)?|might|probably|perhaps|unless|until"
+    r"|once|if|whether|hold off|wait)\b",
+    re.IGNORECASE
+)
+
+_CASE_ID = re.compile(r'\b(?:case|matter)\s*(?:#|number|no\.?|id)?\s*:?\s*(\d+)\b|#(\d+)\b', re.IGNORECASE)
+_MEMO = re.compile(r'\d+\b\s*(?:[,:;\-–]|\s(?:saying|with (?:a |the )?(?:memo|note|comment)|because|memo|note)\s*:?)'
+                   r'\s*(?P<memo>.+)$', re.IGNORECASE)
+
+
+class IntentRules:
+    """Pattern extractor for one service catalog"""
+
+    def __init__(self, services, min_confidence=INTENT_RULES_MIN_CONFIDENCE):
+        self.services = {service['id']: service for service in services}
+        self.min_confidence = min_confidence
+
+        # A service is named by its catalog name or one of its aliases. All
+        # phrases go into one alternation, longest first so 'wyoming dao' is
+        # preferred over 'dao', and a transcript is scanned once however
+        # large the catalog
+        self._phrase_services = {}
+        for service in services:
+            for alias in (service['name'],) + tuple(service.get('aliases', ())):
+                self._phrase_services.setdefault(alias.lower(), service['id'])
+        phrases = sorted(self._phrase_services, key=lambda phrase: -len(phrase))
+        self._service_pattern = re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase in phrases) + r')\b')
+        self._field_patterns = {
+            field: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+            for field, patterns in FIELD_PATTERNS.items()
+        }
+        self._actions = {action: re.compile(pattern, re.IGNORECASE) for action, pattern in REVIEW_ACTIONS.items()}
+
+    def _match_service(self, text):
+        """Service IDs named in text; phrases inside a longer match are not counted again"""
+        found = []
+        for match in self._service_pattern.finditer(text.lower()):
+            service_id = self._phrase_services[match.group(0)]
+            if service_id not in found:
+                found.append(service_id)
+        return found
+
+    def _match_field(self, field, text):
+        """First value captured for a field, or None"""
+        for pattern in self._field_patterns.get(field, ()):
+            match = pattern.search(text)
+            if match:
+                value = match.group('value').strip().strip('"\'').strip()
+                if value:
+                    return value
+        return None
+
+    def extract_order(self, text):
+        """
+        Extract an order
+
+        Returns:
+            Tuple of (data dict, confidence 0-1); confidence only reaches the
+            threshold when one service is named and all its required fields
+            were found
+        """
+        # Names can contain service words ("Delaware LLC called Acme DAO"), so
+        # the entity name is masked before looking for the service
+        service_text = text
+        for pattern in self._field_patterns['entity_name']:
+            match = pattern.search(text)
+            if match:
+                start, end = match.span('value')
+                service_text = text[:start] + ' ' * (end - start) + text[end:]
+                break
+
+        service_ids = self._match_service(service_text)
+        if len(service_ids) != 1:
+            return {}, 0.2 if service_ids else 0.0
+
+        service = self.services[service_ids[0]]
+        data = {'service_id': service['id']}
+        for field in service['required_fields']:
+            value = self._match_field(field, text)
+            if value:
+                data[field] = value
+
+        required = service['required_fields']
+        coverage = sum(1 for field in required if field in data) / len(required) if required else 1.0
+        return data, round(0.5 + 0.45 * coverage, 3)
+
+    def extract_review(self, text):
+        """
+        Extract a review action
+
+        Returns:
+            Tuple of (data dict, confidence 0-1)
+        """
+        actions = [action for action, pattern in self._actions.items() if pattern.search(text)]
+        # "approve ... with a note" is an approval, not a comment
+        if len(actions) > 1 and 'comment' in actions:
+            actions.remove('comment')
+
+        # "approve case 42 and case 43" names two cases: left to the LLM
+        case_ids = {int(number or hashed) for number, hashed in _CASE_ID.findall(text)}
+        if len(case_ids) != 1 or len(actions) != 1:
+            return {}, 0.4 if case_ids or actions else 0.0
+
+        case_match = _CASE_ID.search(text)
+        data = {'action': actions[0], 'case_id': case_ids.pop()}
+        instruction = text
+        memo_match = _MEMO.search(text[case_match.start():])
+        if memo_match and memo_match.group('memo').strip(' .'):
+            data['memo'] = memo_match.group('memo').strip()
+            instruction = text[:case_match.start() + memo_match.start('memo')]
+
+        # Only the instruction is checked; a memo may ask questions or say "not"
+        if _HEDGE.search(instruction):
+            return data, HEDGED_CONFIDENCE
+        return data, 0.95
+
+    def extract(self, kind, text):
+        """Extract an 'order' or 'review' intent; returns (data, confidence)"""
+        if kind == 'review':
+            return self.extract_review(text)
+        return self.extract_order(text)
+
+    def is_confident(self, confidence):
+        """True if a rule result is trusted without the LLM"""
+        return confidence >= self.min_confidence
@@ -0,0 +1,205 @@
+"""
+Agent Registry
+Per-app, thread-safe agent singletons with lifecycle hooks and health/latency metrics
+"""
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+
+def _build_wallet_agent(registry):
+    from app.agents.circle_wallet_agent import CircleWalletAgent
+    return CircleWalletAgent()
+
+
+def _build_intent_agent(registry):
+    from app.agents.ai_intent_agent import AiIntentAgent
+    return AiIntentAgent()
+
+
+def _build_doc_agent(registry):
+    from app.agents.document_agent import DocumentAgent
+    return DocumentAgent()
+
+
+def _build_schedule_agent(registry):
+    from app.agents.scheduling_agent import SchedulingAgent
+    return SchedulingAgent(wallet_agent=registry.get('wallet'))
+
+
+def _build_factory(registry):
+    from app.services.legal_factory import LegalFactory
+    return LegalFactory()
+
+
+# Agents are built one at a time on first use (heavy SDK imports included),
+# so a request pays only for the agents it touches and a cold start for none
+AGENT_BUILDERS = {
+    'wallet': _build_wallet_agent,
+    'intent': _build_intent_agent,
+    'document': _build_doc_agent,
+    'scheduler': _build_schedule_agent,
+    'factory': _build_factory
+}
+
+# Optional health probes: name -> callable(agent) returning True when healthy
+AGENT_PROBES = {
+    'wallet': lambda agent: agent.mock_mode or agent.check_arc_connection()
+}
+
+
+class AgentRegistry:
+    """Builds each agent at most once per process and shuts them down on exit"""
+
+    def __init__(self, builders=None, probes=None):
+        """
+        Initialize the registry
+
+        Args:
+            builders: Dict of agent name -> callable(registry) returning the agent
+            probes: Dict of agent name -> callable(agent) returning health
+        """
+        self.builders = dict(builders or AGENT_BUILDERS)
+        self.probes = dict(probes or AGENT_PROBES)
+        self._reset()
+
+        # A forked worker (e.g. gunicorn with preload_app) must not reuse
+        # agents whose threads and connections belong to the parent
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.shutdown)
+
+    def _reset(self):
+        """Forget every agent without shutting it down (used in forked children)"""
+        self._agents = {}
+        self._lock = threading.Lock()
+        self._name_locks = {name: threading.Lock() for name in self.builders}
+        self._metrics = {name: self._empty_metrics() for name in self.builders}
+
+    @staticmethod
+    def _empty_metrics():
+        return {
+            'state': 'not initialized',
+            'init_seconds': None,
+            'initialized_at': None,
+            'init_failures': 0,
+            'last_error': None,
+            'healthy': None,
+            'probe_seconds': None,
+            'checked_at': None
+        }
+
+    def get(self, name):
+        """
+        Get an agent, building it on first use
+
+        Concurrent first requests wait on a per-agent lock, so exactly one
+        instance is built; agents that are already built are returned
+        without locking.
+        """
+        agent = self._agents.get(name)
+        if agent is not None:
+            return agent
+
+        with self._name_locks[name]:
+            agent = self._agents.get(name)
+            if agent is not None:
+                return agent
+
+            metrics = self._metrics[name]
+            started = time.perf_counter()
+            try:
+                agent = self.builders[name](self)
+            except Exception as e:
+                metrics['state'] = 'failed'
+                metrics['init_failures'] += 1
+                metrics['last_error'] = str(e)
+                raise
+
+            metrics.update(
+                state='initialized',
+                init_seconds=round(time.perf_counter() - started, 4),
+                initialized_at=datetime.utcnow().isoformat(),
+                last_error=None
+            )
+            self._agents[name] = agent
+            return agent
+
+    def is_initialized(self, name):
+        """True if the agent has been built in this process"""
+        return name in self._agents
+
+    def startup(self, names=None):
+        """
+        Build agents ahead of the first request (e.g. from gunicorn post_worker_init)
+
+        Args:
+            names: Agents to build (default: all)
+
+        Returns:
+            Dict of agent name -> build error for agents that failed
+        """
+        errors = {}
+        for name in names or self.builders:
+            try:
+                self.get(name)
+            except Exception as e:
+                errors[name] = str(e)
+        return errors
+
+    def shutdown(self):
+        """Shut down every built agent that holds threads or pools, then forget them"""
+        with self._lock:
+            agents, self._agents = self._agents, {}
+
+        for name, agent in agents.items():
+            shutdown = getattr(agent, 'shutdown', None)
+            if callable(shutdown):
+                try:
+                    shutdown()
+                except Exception as e:
+                    print(f"⚠️  Error shutting down {name} agent: {e}")
+            self._metrics[name]['state'] = 'not initialized'
+
+    def check_health(self, names=None):
+        """Run the health probes of built agents, recording result and latency"""
+        for name in names or self.builders:
+            agent = self._agents.get(name)
+            probe = self.probes.get(name)
+            if agent is None:
+                continue
+
+            metrics = self._metrics[name]
+            started = time.perf_counter()
+            try:
+                healthy = bool(probe(agent)) if probe else True
+            except Exception as e:
+                healthy = False
+                metrics['last_error'] = str(e)
+            metrics.update(
+                healthy=healthy,
+                probe_seconds=round(time.perf_counter() - started, 4),
+                checked_at=datetime.utcnow().isoformat()
+            )
+
+    def metrics(self):
+        """Snapshot of per-agent state, init latency and last health check"""
+        return {name: dict(metrics) for name, metrics in self._metrics.items()}
+
+
+def init_agents(app):
+    """Attach a new AgentRegistry to the app (called from create_app)"""
+    registry = AgentRegistry()
+    app.extensions['agents'] = registry
+    return registry
+
+
+def get_registry(app=None):
+    """Get the agent registry of the given or current Flask app"""
+    if app is None:
+        from flask import current_app
+        app = current_app
+    return app.extensions['agents']
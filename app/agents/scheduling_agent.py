@@ -1,12 +1,28 @@
 """
 Scheduling Agent
-Manages recurring payments using APScheduler
+Manages recurring payments stored in the app database and billed by scheduler.py
 """
 
 import os
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-from datetime import datetime
+import socket
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import RecurringFee, SchedulerLease
+from app.money import Money
+from app.services.billing_run import run_billing, format_report, FEE_RETRY_DELAY
+from app.services.transfer_tracker import poll_transfers, TRANSFER_POLL_SECONDS
+from app.services.escrow_settlement import settle_releases, ESCROW_SETTLEMENT_POLL_SECONDS
+
+
+# Lease that makes a single scheduler process the active biller
+SCHEDULER_LEASE_NAME = 'recurring_fees'
+SCHEDULER_LEASE_TTL = timedelta(seconds=90)
+
+# Time between billing runs; as often as failed fees are retried, so a retry
+# is not held until the next day (a run with nothing due is one indexed query)
+BILLING_RUN_INTERVAL = FEE_RETRY_DELAY
 
 
 class SchedulingAgent:
@@ -16,71 +32,49 @@ class SchedulingAgent:
         """
         Initialize Scheduling Agent
 
+        Subscriptions live in the recurring_fees table, so web workers only
+        record them; billing happens in the scheduler process (scheduler.py).
+
         Args:
             wallet_agent: CircleWalletAgent instance for executing payments
         """
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+        self.scheduler = None
         self.wallet_agent = wallet_agent
         self.law_firm_main_wallet = os.environ.get("LAW_FIRM_MAIN_WALLET_ID")
+        self.holder_id = f"{socket.gethostname()}:{os.getpid()}"
 
         print("✅ Scheduling Agent initialized")
 
-    def _execute_annual_payment(self, case_id, client_fee_wallet_id, amount):
-        """
-        Execute a scheduled annual payment
-
-        Args:
-            case_id: The case ID
-            client_fee_wallet_id: Source wallet (client's fee wallet)
-            amount: Amount in USDC
-        """
-        print(f"⏰ Executing scheduled annual payment for Case {case_id}...")
-        print(f"   Amount: ${amount} USDC")
-        print(f"   From: {client_fee_wallet_id}")
-        print(f"   To: {self.law_firm_main_wallet}")
-
-        if self.wallet_agent:
-            try:
-                challenge_id = self.wallet_agent.initiate_gasless_transfer(
-                    from_wallet_id=client_fee_wallet_id,
-                    to_address=self.law_firm_main_wallet,
-                    amount_usdc=amount
-                )
-
-                if challenge_id:
-                    print(f"✅ Scheduled payment submitted. Challenge ID: {challenge_id}")
-                else:
-                    print(f"❌ Scheduled payment failed for Case {case_id}")
-
-            except Exception as e:
-                print(f"❌ Error executing scheduled payment: {e}")
-        else:
-            print("⚠️  No wallet agent configured, payment not executed")
-
     def schedule_annual_payment(self, case_id, client_fee_wallet_id, amount):
         """
         Schedule a recurring annual payment
 
+        Calling it again for the same case only updates the amount and
+        wallet of the existing subscription. The subscription is added to
+        the current session; the caller's commit makes it durable together
+        with its case update.
+
         Args:
             case_id: The case ID
             client_fee_wallet_id: Source wallet ID
-            amount: Amount in USDC
+            amount: Amount in USDC (Money or decimal string)
 
         Returns:
             Job ID
         """
         job_id = f"case_{case_id}_annual_fee"
+        now = datetime.utcnow()
 
-        # Schedule job to run once per year (365 days)
-        self.scheduler.add_job(
-            self._execute_annual_payment,
-            trigger=IntervalTrigger(days=365),
-            id=job_id,
-            replace_existing=True,
-            args=[case_id, client_fee_wallet_id, amount],
-            next_run_time=datetime.now()  # First payment happens immediately for demo
-        )
+        fee = RecurringFee.query.filter_by(case_id=case_id).first()
+        if fee is None:
+            # First payment is due immediately (billed by the next billing run)
+            fee = RecurringFee(case_id=case_id, interval_days=365, status='ACTIVE',
+                               next_due_at=now, next_run_at=now)
+            db.session.add(fee)
+
+        # An existing subscription keeps its due dates: periods already paid stay paid
+        fee.client_fee_wallet_id = client_fee_wallet_id
+        fee.amount_usdc = Money.parse(amount, allow_negative=False)
 
         print(f"📅 Job {job_id} scheduled: ${amount} USDC annual fee")
         return job_id
@@ -89,27 +83,198 @@ class SchedulingAgent:
         """Cancel a scheduled payment"""
         job_id = f"case_{case_id}_annual_fee"
 
-        try:
-            self.scheduler.remove_job(job_id)
-            print(f"🗑️  Cancelled scheduled payment for Case {case_id}")
-            return True
-        except Exception as e:
-            print(f"⚠️  Could not cancel job {job_id}: {e}")
+        fee = RecurringFee.query.filter_by(case_id=case_id, status='ACTIVE').first()
+        if fee is None:
+            print(f"⚠️  Could not cancel job {job_id}: not scheduled")
             return False
 
-    def get_scheduled_jobs(self):
-        """Get all scheduled jobs"""
-        jobs = self.scheduler.get_jobs()
+        fee.status = 'CANCELLED'
+        db.session.commit()
+        print(f"🗑️  Cancelled scheduled payment for Case {case_id}")
+        return True
+
+    def get_scheduled_jobs(self, limit=100):
+        """Get the next active scheduled jobs"""
+        fees = RecurringFee.query.filter_by(status='ACTIVE')\
+            .order_by(RecurringFee.next_run_at).limit(limit).all()
         return [
             {
-                'id': job.id,
-                'next_run': job.next_run_time,
-                'trigger': str(job.trigger)
+                'id': f"case_{fee.case_id}_annual_fee",
+                'next_run': fee.next_run_at,
+                'trigger': f"interval[{fee.interval_days} days]"
             }
-            for job in jobs
+            for fee in fees
         ]
 
+    def acquire_lease(self):
+        """
+        Take or renew the scheduler lease
+
+        Only the holder of an unexpired lease bills fees, so extra scheduler
+        processes stand by until the active one stops renewing.
+
+        Returns:
+            True if this process holds the lease
+        """
+        now = datetime.utcnow()
+        renewed = SchedulerLease.query.filter(
+            SchedulerLease.name == SCHEDULER_LEASE_NAME,
+            or_(SchedulerLease.holder == self.holder_id, SchedulerLease.expires_at < now)
+        ).update({
+            SchedulerLease.holder: self.holder_id,
+            SchedulerLease.expires_at: now + SCHEDULER_LEASE_TTL
+        }, synchronize_session=False)
+        db.session.commit()
+        if renewed == 1:
+            return True
+
+        if db.session.get(SchedulerLease, SCHEDULER_LEASE_NAME) is not None:
+            return False
+
+        db.session.add(SchedulerLease(
+            name=SCHEDULER_LEASE_NAME,
+            holder=self.holder_id,
+            expires_at=now + SCHEDULER_LEASE_TTL
+        ))
+        try:
+            db.session.commit()
+            return True
+        except IntegrityError:
+            # Another scheduler created the lease first
+            db.session.rollback()
+            return False
+
+    def release_lease(self):
+        """Give up the scheduler lease so a standby process can take over"""
+        SchedulerLease.query.filter_by(name=SCHEDULER_LEASE_NAME, holder=self.holder_id)\
+            .delete(synchronize_session=False)
+        db.session.commit()
+
+    def run_pending_payments(self, dry_run=False, **options):
+        """
+        Run one billing run over every due recurring fee
+
+        Due fees are billed in pages with one transfer per client fee wallet
+        (see app/services/billing_run.py). The lease is renewed before each
+        page, and the run stops if another scheduler has taken it over.
+
+        Args:
+            dry_run: Report what would be billed without transferring
+            **options: page_size for run_billing
+
+        Returns:
+            Billing run report dict
+        """
+        report = run_billing(
+            self.wallet_agent,
+            self.law_firm_main_wallet,
+            dry_run=dry_run,
+            should_continue=None if dry_run else self.acquire_lease,
+            **options
+        )
+        print(format_report(report))
+        return report
+
+    def tick(self, **options):
+        """One scheduled billing run, if this process holds the lease"""
+        try:
+            self.run_pending_payments(**options)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Scheduler tick failed: {e}")
+        finally:
+            db.session.remove()
+
+    def poll_transfers(self):
+        """Check unsettled Circle transfers, if this process holds the lease"""
+        try:
+            poll_transfers(self.wallet_agent, should_continue=self.acquire_lease)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Transfer poll failed: {e}")
+        finally:
+            db.session.remove()
+
+    def settle_escrow(self):
+        """Net and settle escrow releases whose window has closed, if this process holds the lease"""
+        try:
+            if self.acquire_lease():
+                settle_releases(self.wallet_agent)
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Escrow settlement failed: {e}")
+        finally:
+            db.session.remove()
+
+    def run_forever(self, app, every_seconds=None, **options):
+        """
+        Run a billing run every BILLING_RUN_INTERVAL in this process until interrupted
+
+        A run also starts immediately, catching up on fees that fell due
+        while no scheduler was running. Unsettled Circle transfers are
+        polled every TRANSFER_POLL_SECONDS and netted escrow releases are
+        settled every ESCROW_SETTLEMENT_POLL_SECONDS.
+
+        Args:
+            app: Flask app providing the database context
+            every_seconds: Run on this interval instead of every BILLING_RUN_INTERVAL
+            **options: Passed to run_pending_payments
+        """
+        # Only the scheduler process needs APScheduler; web workers never import it
+        from apscheduler.schedulers.blocking import BlockingScheduler
+        from apscheduler.triggers.interval import IntervalTrigger
+
+        def run_tick():
+            with app.app_context():
+                self.tick(**options)
+
+        seconds = every_seconds or int(BILLING_RUN_INTERVAL.total_seconds())
+        trigger = IntervalTrigger(seconds=seconds)
+        description = f"every {seconds}s"
+
+        self.scheduler = BlockingScheduler()
+        self.scheduler.add_job(
+            run_tick,
+            trigger=trigger,
+            id='recurring_fee_billing_run',
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now()
+        )
+
+        def run_transfer_poll():
+            with app.app_context():
+                self.poll_transfers()
+
+        self.scheduler.add_job(
+            run_transfer_poll,
+            trigger=IntervalTrigger(seconds=TRANSFER_POLL_SECONDS),
+            id='circle_transfer_poll',
+            max_instances=1,
+            coalesce=True
+        )
+
+        def run_escrow_settlement():
+            with app.app_context():
+                self.settle_escrow()
+
+        self.scheduler.add_job(
+            run_escrow_settlement,
+            trigger=IntervalTrigger(seconds=ESCROW_SETTLEMENT_POLL_SECONDS),
+            id='escrow_settlement',
+            max_instances=1,
+            coalesce=True
+        )
+
+        print(f"⏰ Scheduler {self.holder_id} started (billing run {description})")
+        try:
+            self.scheduler.start()
+        finally:
+            with app.app_context():
+                self.release_lease()
+
     def shutdown(self):
         """Shutdown the scheduler"""
-        self.scheduler.shutdown()
+        if self.scheduler is not None and self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
         print("⏹️  Scheduler shut down")
@@ -0,0 +1,159 @@
+"""
+Wallet Balance Cache
+Process-wide USDC balances read from Arc in JSON-RPC batches, with TTL expiry
+and invalidation when our own transfers move funds
+"""
+
+import datetime
+import os
+import threading
+import time
+from decimal import Decimal
+import requests
+
+
+# Arc's native USDC system contract (ERC-20 interface, 6 decimals)
+USDC_CONTRACT_ADDRESS = "0x3600000000000000000000000000000000000000"
+USDC_DECIMALS = 6
+
+# keccak256("balanceOf(address)")[:4]
+BALANCE_OF_SELECTOR = "0x70a08231"
+
+# Seconds a balance is served from cache before it is read again
+BALANCE_CACHE_TTL = float(os.environ.get('ARC_BALANCE_CACHE_TTL', '30'))
+
+# Addresses per JSON-RPC batch request
+BALANCE_BATCH_SIZE = 100
+
+ARC_RPC_TIMEOUT = (5, 15)  # (connect, read) seconds
+
+
+def _balance_of_call(address):
+    """eth_call params for USDC balanceOf(address)"""
+    data = BALANCE_OF_SELECTOR + address.lower().replace('0x', '').rjust(64, '0')
+    return [{'to': USDC_CONTRACT_ADDRESS, 'data': data}, 'latest']
+
+
+def read_usdc_balances(rpc_url, addresses, session=None):
+    """
+    Read USDC balances for many addresses in JSON-RPC batch round trips
+
+    Args:
+        rpc_url: Arc (or local anvil-style) JSON-RPC endpoint
+        addresses: 0x addresses to read
+        session: Optional requests session to reuse connections
+
+    Returns:
+        Dict of address -> balance as a Decimal string (None where the call failed)
+    """
+    session = session or requests
+    addresses = list(dict.fromkeys(addresses))
+    balances = {}
+
+    for start in range(0, len(addresses), BALANCE_BATCH_SIZE):
+        chunk = addresses[start:start + BALANCE_BATCH_SIZE]
+        payload = [
+            {'jsonrpc': '2.0', 'id': i, 'method': 'eth_call', 'params': _balance_of_call(address)}
+            for i, address in enumerate(chunk)
+        ]
+
+        try:
+            response = session.post(rpc_url, json=payload, timeout=ARC_RPC_TIMEOUT)
+            response.raise_for_status()
+            results = {item.get('id'): item for item in response.json()}
+        except Exception as e:
+            print(f"❌ Arc balance batch failed: {e}")
+            results = {}
+
+        for i, address in enumerate(chunk):
+            result = results.get(i, {}).get('result')
+            if result is None:
+                balances[address] = None
+                continue
+            raw = int(result, 16) if result not in ('0x', '') else 0
+            balances[address] = str(Decimal(raw).scaleb(-USDC_DECIMALS).quantize(Decimal('0.000001')))
+
+    return balances
+
+
+class WalletBalanceCache:
+    """Thread-safe TTL cache of balances keyed by wallet ID or address"""
+
+    def __init__(self, ttl=BALANCE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}  # key -> (balance, monotonic expiry, UTC time of the read)
+        self._lock = threading.Lock()
+
+    def get_many(self, keys, fetch, moved_since=None):
+        """
+        Get balances for keys, fetching only the missing, expired or moved ones
+
+        Args:
+            keys: Wallet IDs or addresses
+            fetch: Callable taking a list of keys and returning {key: balance}
+            moved_since: Optional callable taking (keys, since) and returning
+                {key: UTC time funds last moved}; cached balances read before
+                that time are fetched again. This is how transfers settled by
+                another process (scheduler.py) reach this process's cache.
+
+        Returns:
+            Dict of key -> balance
+        """
+        now = time.monotonic()
+        cached = {}
+        missing = []
+
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry and entry[1] > now:
+                    cached[key] = entry
+                else:
+                    missing.append(key)
+
+        if cached and moved_since is not None:
+            oldest = min(entry[2] for entry in cached.values())
+            for key, moved_at in moved_since(list(cached), oldest).items():
+                if key in cached and cached[key][2] <= moved_at:
+                    del cached[key]
+                    missing.append(key)
+
+        found = {key: entry[0] for key, entry in cached.items()}
+        if missing:
+            # Taken before the read, so funds moved during it count as newer
+            read_at = datetime.datetime.utcnow()
+            fetched = fetch(missing)
+            expires_at = time.monotonic() + self.ttl
+            with self._lock:
+                for key, balance in fetched.items():
+                    # Failed reads are not cached, so the next render retries them
+                    if balance is not None:
+                        self._entries[key] = (balance, expires_at, read_at)
+            found.update(fetched)
+
+        return found
+
+    def invalidate(self, keys):
+        """Drop cached balances (e.g. after one of our transfers moved funds)"""
+        with self._lock:
+            for key in keys:
+                if key:
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached balance"""
+        with self._lock:
+            self._entries.clear()
+
+
+_balance_cache = None
+_balance_cache_lock = threading.Lock()
+
+
+def get_balance_cache():
+    """Get the process-wide wallet balance cache"""
+    global _balance_cache
+    with _balance_cache_lock:
+        if _balance_cache is None:
+            _balance_cache = WalletBalanceCache()
+        return _balance_cache
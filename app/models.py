@@ -4,8 +4,22 @@ Database Models for Agent-Ledger
 
 import datetime
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import JSONB
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
+from app.money import MoneyType
+
+
+# form_data keys copied into case_search_terms so lawyers can search on them
+SEARCHABLE_FORM_FIELDS = ('entity_name', 'debtor_name', 'smart_contract_identifier')
+
+# Longest indexed search value; longer values are truncated
+SEARCH_TERM_MAX_LENGTH = 255
+
+
+def normalize_search_value(value):
+    """Lowercase and trim a form value or search query for the search index"""
+    return str(value).strip().lower()[:SEARCH_TERM_MAX_LENGTH]
 
 
 class User(UserMixin, db.Model):
@@ -17,6 +31,7 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(255))
     is_lawyer = db.Column(db.Boolean, default=False)  # True if user is a lawyer/reviewer
+    wallet_id = db.Column(db.String(100))  # Circle wallet claimed from the wallet pool
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
     # Relationships
@@ -37,22 +52,27 @@ class User(UserMixin, db.Model):
 class LegalCase(db.Model):
     """Legal case model tracking the entire A-to-Z workflow"""
     __tablename__ = 'legal_cases'
+    __table_args__ = (
+        # Keyset pagination on the /legal/cases listing (client view / lawyer status filter)
+        db.Index('ix_legal_cases_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_legal_cases_status_created_at', 'status', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     service_id = db.Column(db.String(50), nullable=False)  # WY_DAO_LLC, DE_LLC, UCC1_FILING
 
     # Status tracking (Step A-J workflow)
-    # PENDING_PAYMENT -> PENDING_REVIEW -> IN_PROGRESS -> PENDING_APPROVAL -> COMPLETE
+    # PENDING_PAYMENT -> PAYMENT_SUBMITTED -> PENDING_REVIEW -> IN_PROGRESS -> PENDING_APPROVAL -> COMPLETE
     status = db.Column(db.String(50), default='PENDING_PAYMENT')
 
-    # Form data (stored as JSON string)
-    form_data = db.Column(db.Text)  # JSON string of submitted form fields
+    # Form data (JSONB on Postgres, JSON text on SQLite; see migrate_form_data.py)
+    form_data = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))  # Submitted form fields
 
     # Wallet & Payment Info
     client_wallet_id = db.Column(db.String(100))
-    total_price_usdc = db.Column(db.String(50))
-    recurring_fee_usdc = db.Column(db.String(50))
+    total_price_usdc = db.Column(MoneyType)
+    recurring_fee_usdc = db.Column(MoneyType)
 
     # Payment tracking
     payment_challenge_id = db.Column(db.String(100))  # Circle transfer challenge ID
@@ -67,14 +87,309 @@ class LegalCase(db.Model):
     lawyer_memo = db.Column(db.Text)  # Lawyer's notes/comments
     reviewed_at = db.Column(db.DateTime)
 
+    # Background approval pipeline (see app/services/job_queue.py)
+    # QUEUED -> GENERATING -> UPLOADING -> UPLOADED -> DONE (or FAILED)
+    pipeline_stage = db.Column(db.String(20))
+    pipeline_error = db.Column(db.Text)
+
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
+    search_terms = db.relationship('CaseSearchTerm', backref='case', lazy=True,
+                                   cascade='all, delete-orphan')
+
+    @db.validates('form_data')
+    def _index_form_data(self, key, form_data):
+        """Rebuild the search index rows whenever form_data is assigned"""
+        form_data = form_data or {}
+        self.search_terms = [
+            CaseSearchTerm(field=field, value=normalize_search_value(form_data[field]))
+            for field in SEARCHABLE_FORM_FIELDS
+            if form_data.get(field)
+        ]
+        return form_data
+
     def __repr__(self):
         return f'<LegalCase {self.id} - {self.service_id} - {self.status}>'
 
 
+class CaseSearchTerm(db.Model):
+    """Normalized copy of a searchable form_data field, one row per case and field"""
+    __tablename__ = 'case_search_terms'
+    __table_args__ = (
+        # Prefix search (value LIKE 'abc%'), optionally narrowed by field
+        db.Index('ix_case_search_terms_value_field', 'value', 'field',
+                 postgresql_ops={'value': 'varchar_pattern_ops'}),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), nullable=False, index=True)
+    field = db.Column(db.String(50), nullable=False)  # One of SEARCHABLE_FORM_FIELDS
+    value = db.Column(db.String(SEARCH_TERM_MAX_LENGTH), nullable=False)
+
+    def __repr__(self):
+        return f'<CaseSearchTerm {self.case_id} - {self.field}={self.value}>'
+
+
+class Job(db.Model):
+    """Durable background job, claimed and executed by worker.py"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. approve_case
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), index=True)
+    payload = db.Column(db.Text)  # JSON string of handler arguments
+
+    # Re-enqueuing with the same key returns the existing job instead of a duplicate
+    idempotency_key = db.Column(db.String(100), unique=True)
+
+    # PENDING -> RUNNING -> DONE, or back to PENDING for a retry, or FAILED
+    status = db.Column(db.String(20), default='PENDING', nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=5, nullable=False)
+    run_after = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+    # Progress and outcome reported to pollers (e.g. voice jobs: TRANSCRIBING -> EXTRACTING)
+    stage = db.Column(db.String(20))
+    result = db.Column(db.Text)  # JSON string set by the handler
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Job {self.id} - {self.kind} - {self.status}>'
+
+
+class CircleTransfer(db.Model):
+    """Circle transfer awaiting settlement, tracked by app/services/transfer_tracker.py"""
+    __tablename__ = 'circle_transfers'
+    __table_args__ = (
+        # Only unsettled transfers have a next check, so the poller's scan stays small
+        db.Index('ix_circle_transfers_pending_next_check_at', 'next_check_at',
+                 postgresql_where=db.text('next_check_at IS NOT NULL'),
+                 sqlite_where=db.text('next_check_at IS NOT NULL')),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.String(100), unique=True, nullable=False)
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), index=True)
+    purpose = db.Column(db.String(30), nullable=False)  # payment, escrow_settlement, recurring_fee
+
+    # Wallets whose cached balances are dropped when the transfer settles
+    # (indexed for wallets_moved_since, which every process checks on read)
+    from_wallet_id = db.Column(db.String(100), index=True)
+    to_address = db.Column(db.String(100), index=True)
+
+    # Circle transaction state: INITIATED ... COMPLETE / FAILED / CANCELLED / DENIED
+    state = db.Column(db.String(20), default='INITIATED', nullable=False)
+    checks = db.Column(db.Integer, default=0, nullable=False)
+    next_check_at = db.Column(db.DateTime)  # NULL once the state is terminal
+    last_checked_at = db.Column(db.DateTime)
+    settled_at = db.Column(db.DateTime)  # when the terminal state was first seen
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<CircleTransfer {self.challenge_id} - {self.purpose} - {self.state}>'
+
+
+class EscrowRelease(db.Model):
+    """A case's escrow release, netted into an EscrowSettlement by app/services/escrow_settlement.py"""
+    __tablename__ = 'escrow_releases'
+    __table_args__ = (
+        db.Index('ix_escrow_releases_status_created_at', 'status', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), unique=True, nullable=False)
+    amount_usdc = db.Column(MoneyType, nullable=False)
+    from_wallet_id = db.Column(db.String(100), nullable=False)  # Escrow wallet
+    to_wallet_id = db.Column(db.String(100), nullable=False)    # Law firm main wallet
+
+    # PENDING -> SETTLING -> SETTLED, or back to PENDING if its settlement failed
+    status = db.Column(db.String(20), default='PENDING', nullable=False)
+    settlement_id = db.Column(db.Integer, db.ForeignKey('escrow_settlements.id'), index=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    settled_at = db.Column(db.DateTime)
+
+    case = db.relationship('LegalCase', backref=db.backref('escrow_release', uselist=False))
+
+    def __repr__(self):
+        return f'<EscrowRelease {self.case_id} - ${self.amount_usdc} - {self.status}>'
+
+
+class EscrowSettlement(db.Model):
+    """One on-chain transfer settling many netted escrow releases"""
+    __tablename__ = 'escrow_settlements'
+
+    id = db.Column(db.Integer, primary_key=True)
+    from_wallet_id = db.Column(db.String(100), nullable=False)
+    to_wallet_id = db.Column(db.String(100), nullable=False)
+    total_usdc = db.Column(MoneyType)
+    release_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # CREATED (retried under the same idempotency key until Circle accepts it) -> SUBMITTED ->
+    # COMPLETE, or FAILED when the transfer fails on-chain (its releases return to PENDING)
+    state = db.Column(db.String(20), default='CREATED', nullable=False)
+    challenge_id = db.Column(db.String(100), unique=True)
+    last_error = db.Column(db.Text)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+    settled_at = db.Column(db.DateTime)
+
+    releases = db.relationship('EscrowRelease', backref='settlement', lazy=True)
+
+    def __repr__(self):
+        return f'<EscrowSettlement {self.id} - ${self.total_usdc} - {self.state}>'
+
+
+class LedgerTransaction(db.Model):
+    """One balanced posting to the internal double-entry ledger (app/services/ledger.py)"""
+    __tablename__ = 'ledger_transactions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(150), unique=True, nullable=False)  # Posting the same key twice is a no-op
+    kind = db.Column(db.String(50), nullable=False)  # e.g. 'payment', 'escrow_release', 'recurring_fee'
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), index=True)
+    reference = db.Column(db.String(100))  # Circle challenge ID, if any
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    entries = db.relationship('LedgerEntry', backref='transaction', lazy=True)
+
+    def __repr__(self):
+        return f'<LedgerTransaction {self.key}>'
+
+
+class LedgerEntry(db.Model):
+    """Append-only ledger line; the amounts of a transaction's entries sum to zero"""
+    __tablename__ = 'ledger_entries'
+    __table_args__ = (
+        # Account statements and point-in-time balances
+        db.Index('ix_ledger_entries_account_created_at', 'account', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey('ledger_transactions.id'), nullable=False, index=True)
+    account = db.Column(db.String(150), nullable=False)
+    amount_micros = db.Column(db.BigInteger, nullable=False)  # Signed micro-USDC (1 USDC = 1,000,000)
+    balance_after_micros = db.Column(db.BigInteger, nullable=False)  # Account balance including this entry
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LedgerEntry {self.account} {self.amount_micros:+d}>'
+
+
+class LedgerAccount(db.Model):
+    """Running balance of a ledger account, updated with every entry posted to it"""
+    __tablename__ = 'ledger_accounts'
+
+    name = db.Column(db.String(150), primary_key=True)
+    balance_micros = db.Column(db.BigInteger, default=0, nullable=False)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LedgerAccount {self.name} {self.balance_micros}>'
+
+
+class RecurringFee(db.Model):
+    """Recurring fee subscription for a completed case, billed by scheduler.py"""
+    __tablename__ = 'recurring_fees'
+    __table_args__ = (
+        db.Index('ix_recurring_fees_status_next_run_at', 'status', 'next_run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    case_id = db.Column(db.Integer, db.ForeignKey('legal_cases.id'), unique=True, nullable=False)
+    client_fee_wallet_id = db.Column(db.String(100), nullable=False)
+    amount_usdc = db.Column(MoneyType, nullable=False)
+    interval_days = db.Column(db.Integer, default=365, nullable=False)
+
+    # ACTIVE or CANCELLED
+    status = db.Column(db.String(20), default='ACTIVE', nullable=False)
+
+    # Start of the next unpaid billing period; advances by interval_days per payment
+    next_due_at = db.Column(db.DateTime, nullable=False)
+    # When the scheduler will next try to bill (next_due_at, a retry time, or a claim lease)
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    claimed_by = db.Column(db.String(50))  # Billing run currently charging this fee
+
+    last_run_at = db.Column(db.DateTime)
+    last_challenge_id = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+
+    # A grouped transfer whose submission failed (Circle may still have accepted it):
+    # the retry resends exactly that transfer under the same key, whatever else changed
+    pending_transfer_key = db.Column(db.String(100))
+    pending_transfer_usdc = db.Column(MoneyType)  # amount of the whole group
+    pending_periods = db.Column(db.Integer)  # periods of this fee it covers
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    case = db.relationship('LegalCase', backref=db.backref('recurring_fee', uselist=False))
+
+    def __repr__(self):
+        return f'<RecurringFee {self.case_id} - ${self.amount_usdc} - {self.status}>'
+
+
+class PooledWallet(db.Model):
+    """Pre-created Circle wallet, claimed by a user from the pool in app/services/wallet_pool.py"""
+    __tablename__ = 'wallet_pool'
+    __table_args__ = (
+        db.Index('ix_wallet_pool_status_id', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    wallet_id = db.Column(db.String(100), unique=True, nullable=False)
+    address = db.Column(db.String(100))
+    wallet_set_id = db.Column(db.String(100))
+    blockchain = db.Column(db.String(50))
+
+    # READY -> CLAIMED
+    status = db.Column(db.String(20), default='READY', nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    claimed_at = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PooledWallet {self.wallet_id} - {self.status}>'
+
+
+class SchedulerLease(db.Model):
+    """Named lease held by at most one scheduler process at a time"""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} - {self.holder}>'
+
+
+class AppSetting(db.Model):
+    """Value generated once per database (e.g. the install ID), see app/services/app_settings.py"""
+    __tablename__ = 'app_settings'
+
+    key = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<AppSetting {self.key}>'
+
+
 @login_manager.user_loader
 def load_user(user_id):
     """Flask-Login user loader"""
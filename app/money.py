@@ -0,0 +1,160 @@
+"""
+Money
+Fixed-point USDC amounts held as integer micro-USDC (USDC has 6 decimals),
+a column type storing them as BIGINT so the database can sum and index
+them, and SQL aggregation helpers for reports
+"""
+
+from decimal import Decimal, InvalidOperation
+from functools import total_ordering
+from sqlalchemy import BigInteger, func, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+
+# Micro-USDC per USDC
+MICROS_PER_USDC = 1000000
+
+
+@total_ordering
+class Money:
+    """
+    Immutable USDC amount in integer micro-USDC
+
+    Only Money, int multipliers and exact decimal strings mix with it;
+    floats are rejected everywhere so binary rounding never reaches a
+    payment.
+    """
+
+    __slots__ = ('micros',)
+
+    def __init__(self, micros=0):
+        if not isinstance(micros, int) or isinstance(micros, bool):
+            raise TypeError(f"Money takes integer micro-USDC, not {type(micros).__name__}")
+        object.__setattr__(self, 'micros', micros)
+
+    @classmethod
+    def parse(cls, value, allow_negative=True):
+        """
+        Parse a USDC amount (decimal string, Decimal, int or Money)
+
+        Raises:
+            ValueError: Not an exact amount of at most 6 decimal places, a
+                float, or negative when allow_negative is False
+        """
+        if isinstance(value, Money):
+            money = value
+        else:
+            if isinstance(value, (float, bool)) or not isinstance(value, (str, Decimal, int)):
+                raise ValueError(f"Invalid USDC amount: {value!r} (use a decimal string)")
+            try:
+                micros = Decimal(value.strip() if isinstance(value, str) else value) * MICROS_PER_USDC
+            except InvalidOperation:
+                raise ValueError(f"Invalid USDC amount: {value!r}")
+            if not micros.is_finite() or micros != micros.to_integral_value():
+                raise ValueError(f"Invalid USDC amount: {value!r} (at most 6 decimal places)")
+            money = cls(int(micros))
+
+        if not allow_negative and money.micros < 0:
+            raise ValueError(f"Invalid USDC amount: {value!r} (must not be negative)")
+        return money
+
+    @classmethod
+    def total(cls, amounts):
+        """Sum of an iterable of Money (Money(0) if empty)"""
+        return cls(sum(amount.micros for amount in amounts))
+
+    def to_decimal(self):
+        """Exact Decimal value in USDC"""
+        return Decimal(self.micros).scaleb(-6)
+
+    def __str__(self):
+        """Decimal string with at least 2 places (e.g. '150.00', '0.000001')"""
+        sign = '-' if self.micros < 0 else ''
+        whole, fraction = divmod(abs(self.micros), MICROS_PER_USDC)
+        digits = f"{fraction:06d}".rstrip('0')
+        return f"{sign}{whole}.{digits.ljust(2, '0')}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Money is immutable")
+
+    def __reduce__(self):
+        return (Money, (self.micros,))
+
+    def __hash__(self):
+        return hash(self.micros)
+
+    def __bool__(self):
+        return self.micros != 0
+
+    def __eq__(self, other):
+        if isinstance(other, Money):
+            return self.micros == other.micros
+        return NotImplemented
+
+    def __lt__(self, other):
+        if isinstance(other, Money):
+            return self.micros < other.micros
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money(self.micros + other.micros)
+        return NotImplemented
+
+    def __radd__(self, other):
+        # sum() starts from 0
+        if other == 0 and isinstance(other, int):
+            return self
+        return NotImplemented
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money(self.micros - other.micros)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money(-self.micros)
+
+    def __mul__(self, factor):
+        if isinstance(factor, int) and not isinstance(factor, bool):
+            return Money(self.micros * factor)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+
+ZERO = Money(0)
+
+
+class MoneyType(TypeDecorator):
+    """
+    Money column stored as BIGINT micro-USDC
+
+    Accepts Money or anything Money.parse accepts. Columns created before
+    this type held decimal strings and must be converted with
+    migrate_money_columns.py.
+    """
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return Money.parse(value).micros
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return Money(int(value))
+        except ValueError:
+            raise ValueError(f"Amount {value!r} is not micro-USDC (run migrate_money_columns.py)")
+
+
+def money_sum(column):
+    """SUM of a Money column computed by the database, read back as Money (Money(0) if no rows)"""
+    return type_coerce(func.coalesce(func.sum(column), 0), MoneyType())
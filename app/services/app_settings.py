@@ -0,0 +1,66 @@
+"""
+App Settings
+Values generated once per database and shared by every process using it
+(install ID, Circle WalletSet), cached per database URL
+"""
+
+import threading
+import uuid
+from datetime import datetime
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import AppSetting
+
+
+# Random ID of this database; a reset or a second environment gets a new one
+INSTALL_ID = 'install_id'
+
+# Circle WalletSet client wallets are created under (when CIRCLE_WALLET_SET_ID is unset)
+WALLET_SET_ID = 'circle_wallet_set_id'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_setting(key):
+    """Stored value of a setting, or None"""
+    cache_key = (str(db.engine.url), key)
+    value = _cache.get(cache_key)
+    if value is None:
+        with db.engine.connect() as conn:
+            value = conn.execute(select(AppSetting.value).where(AppSetting.key == key)).scalar()
+        if value is not None:
+            with _cache_lock:
+                _cache[cache_key] = value
+    return value
+
+
+def setdefault_setting(key, default):
+    """
+    Store a setting unless one exists, and return the stored value
+
+    Runs on its own connection, so the caller's session is not committed
+    or rolled back. When processes race, the first insert wins and every
+    process returns its value.
+
+    Args:
+        key: Setting name
+        default: Value to store, or a callable producing it (only called if needed)
+    """
+    value = get_setting(key)
+    if value is not None:
+        return value
+
+    value = default() if callable(default) else default
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(insert(AppSetting).values(key=key, value=value, created_at=datetime.utcnow()))
+    except IntegrityError:
+        pass
+    return get_setting(key)
+
+
+def get_install_id():
+    """Random ID generated the first time this database is used"""
+    return setdefault_setting(INSTALL_ID, lambda: uuid.uuid4().hex)
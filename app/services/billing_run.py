@@ -0,0 +1,287 @@
+"""
+Billing Run
+Bills due recurring fees in pages: one transfer per client fee wallet,
+submitted through the wallet agent's rate-limited dispatcher, with results
+written back and booked in the ledger in bulk
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import db
+from app.models import RecurringFee
+from app.money import ZERO
+from app.agents.circle_wallet_agent import transfer_idempotency_key
+from app.services.transfer_tracker import track_transfers
+from app.services.ledger import post_many, recurring_fee_transaction
+
+
+# Due fees loaded, claimed and written back per transaction
+BILLING_PAGE_SIZE = 1000
+
+# A claimed fee is billed again after this long if its run died mid-page
+FEE_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+# Delay before retrying a failed payment
+FEE_RETRY_DELAY = timedelta(hours=1)
+
+
+def periods_due(fee, now):
+    """Number of billing periods of a fee that have started by now (catch-up included)"""
+    if fee.next_due_at > now:
+        return 0
+    return 1 + int((now - fee.next_due_at) / timedelta(days=fee.interval_days))
+
+
+def group_fees(fees, now):
+    """
+    Group due fees into one transfer per client fee wallet
+
+    Fees whose last transfer failed are regrouped exactly as they were
+    sent, under the stored key and amount, so a retry never becomes a
+    different transfer (see RecurringFee.pending_transfer_key); fees that
+    fell due since are billed in a transfer of their own.
+
+    Returns:
+        List of dicts with wallet_id, amount_usdc (Money), fees, periods
+        (fee id -> periods billed) and idempotency_key
+    """
+    groups = {}
+    for fee in fees:
+        if fee.pending_transfer_key:
+            group = groups.setdefault(('pending', fee.pending_transfer_key), {
+                'wallet_id': fee.client_fee_wallet_id,
+                'amount_usdc': fee.pending_transfer_usdc,
+                'fees': [],
+                'periods': {},
+                'idempotency_key': fee.pending_transfer_key
+            })
+            group['fees'].append(fee)
+            group['periods'][fee.id] = fee.pending_periods
+            continue
+
+        periods = periods_due(fee, now)
+        if not periods:
+            continue
+
+        group = groups.setdefault(('new', fee.client_fee_wallet_id), {
+            'wallet_id': fee.client_fee_wallet_id,
+            'amount_usdc': ZERO,
+            'fees': [],
+            'periods': {},
+            'idempotency_key': None
+        })
+        group['amount_usdc'] += fee.amount_usdc * periods
+        group['fees'].append(fee)
+        group['periods'][fee.id] = periods
+
+    for group in groups.values():
+        if group['idempotency_key'] is None:
+            group['idempotency_key'] = _group_key(group)
+    return list(groups.values())
+
+
+def _group_key(group):
+    """Idempotency key of a new group: the wallet and every fee period in it"""
+    key_parts = [group['wallet_id']] + [
+        f"{fee.id}@{fee.next_due_at:%Y%m%d%H%M%S%f}x{group['periods'][fee.id]}"
+        for fee in sorted(group['fees'], key=lambda fee: fee.id)
+    ]
+    return transfer_idempotency_key('recurring_fee', None, *key_parts)
+
+
+def _claim_page(fee_ids, run_id, now):
+    """Mark due fees as claimed by this run; returns the fees it won"""
+    db.session.execute(
+        update(RecurringFee)
+        .where(
+            RecurringFee.id.in_(fee_ids),
+            RecurringFee.status == 'ACTIVE',
+            RecurringFee.next_run_at <= now
+        )
+        .values(claimed_by=run_id, next_run_at=now + FEE_CLAIM_TIMEOUT),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    return RecurringFee.query.filter(
+        RecurringFee.id.in_(fee_ids),
+        RecurringFee.claimed_by == run_id
+    ).all()
+
+
+def _group_transfer(group, to_wallet):
+    """
+    Dispatcher request for one grouped transfer
+
+    A failed group keeps its key (stored on its fees) until it succeeds, so
+    resubmitting it can never charge it twice.
+    """
+    return {
+        'from_wallet_id': group['wallet_id'],
+        'to_address': to_wallet,
+        'amount_usdc': str(group['amount_usdc']),
+        'idempotency_key': group['idempotency_key']
+    }
+
+
+def _result_rows(group, challenge_id, error, finished_at):
+    """Bulk UPDATE parameters recording one group's outcome on its fees"""
+    rows = []
+    for fee in group['fees']:
+        row = {
+            'id': fee.id,
+            'claimed_by': None,
+            'last_run_at': finished_at,
+            'last_error': error
+        }
+        if challenge_id:
+            next_due_at = fee.next_due_at + timedelta(days=fee.interval_days * group['periods'][fee.id])
+            row.update(
+                next_due_at=next_due_at,
+                next_run_at=next_due_at,
+                last_challenge_id=challenge_id,
+                pending_transfer_key=None,
+                pending_transfer_usdc=None,
+                pending_periods=None
+            )
+        else:
+            row.update(
+                next_run_at=finished_at + FEE_RETRY_DELAY,
+                pending_transfer_key=group['idempotency_key'],
+                pending_transfer_usdc=group['amount_usdc'],
+                pending_periods=group['periods'][fee.id]
+            )
+        rows.append(row)
+    return rows
+
+
+def run_billing(wallet_agent, to_wallet, dry_run=False, page_size=BILLING_PAGE_SIZE,
+                should_continue=None):
+    """
+    Bill every active recurring fee that is due
+
+    Each page of due fees is claimed, grouped into one transfer per client
+    fee wallet (covering every missed period), submitted concurrently via
+    CircleWalletAgent.dispatch_transfers, and its results written back in a
+    single bulk UPDATE.
+
+    Args:
+        wallet_agent: CircleWalletAgent used to submit transfers
+        to_wallet: Law firm wallet receiving the fees
+        dry_run: Report what would be billed without claiming, transferring or writing
+        page_size: Fees per page
+        should_continue: Optional callable checked before each page (e.g. lease renewal)
+
+    Returns:
+        Report dict with counts, total amount and throughput
+    """
+    run_id = f"billing-{uuid.uuid4().hex[:12]}"
+    report = {
+        'run_id': run_id,
+        'dry_run': dry_run,
+        'pages': 0,
+        'fees_billed': 0,
+        'fees_failed': 0,
+        'transfers_submitted': 0,
+        'transfers_failed': 0,
+        'amount_usdc': ZERO,
+        'stopped_early': False
+    }
+    started = time.perf_counter()
+    last_id = 0
+
+    while True:
+        if should_continue is not None and not should_continue():
+            report['stopped_early'] = True
+            break
+
+        now = datetime.utcnow()
+        page = RecurringFee.query.filter(
+            RecurringFee.status == 'ACTIVE',
+            RecurringFee.next_run_at <= now,
+            RecurringFee.id > last_id
+        ).order_by(RecurringFee.id).limit(page_size).all()
+        if not page:
+            break
+
+        last_id = page[-1].id
+        report['pages'] += 1
+
+        # A failed group is retried whole, even where it now straddles a page boundary
+        pending_keys = {fee.pending_transfer_key for fee in page if fee.pending_transfer_key}
+        if pending_keys:
+            page += RecurringFee.query.filter(
+                RecurringFee.status == 'ACTIVE',
+                RecurringFee.next_run_at <= now,
+                RecurringFee.id > last_id,
+                RecurringFee.pending_transfer_key.in_(pending_keys)
+            ).all()
+
+        fees = page if dry_run else _claim_page([fee.id for fee in page], run_id, now)
+        groups = group_fees(fees, now)
+
+        if dry_run:
+            for group in groups:
+                report['transfers_submitted'] += 1
+                report['fees_billed'] += len(group['fees'])
+                report['amount_usdc'] += group['amount_usdc']
+            db.session.expunge_all()
+            continue
+
+        futures = wallet_agent.dispatch_transfers(_group_transfer(group, to_wallet) for group in groups)
+
+        outcomes = []
+        for future in futures:
+            try:
+                challenge_id = future.result()
+                outcomes.append((challenge_id, None if challenge_id else "Transfer was not submitted"))
+            except Exception as e:
+                outcomes.append((None, str(e)))
+
+        rows = []
+        submitted = []
+        finished_at = datetime.utcnow()
+        for group, (challenge_id, error) in zip(groups, outcomes):
+            if challenge_id:
+                submitted.append({'challenge_id': challenge_id, 'from_wallet_id': group['wallet_id'],
+                                  'to_address': to_wallet, 'amount_usdc': group['amount_usdc']})
+                report['transfers_submitted'] += 1
+                report['fees_billed'] += len(group['fees'])
+                report['amount_usdc'] += group['amount_usdc']
+            else:
+                report['transfers_failed'] += 1
+                report['fees_failed'] += len(group['fees'])
+                print(f"❌ Recurring fee transfer from {group['wallet_id']} failed: {error}")
+            rows.extend(_result_rows(group, challenge_id, error, finished_at))
+
+        if rows:
+            db.session.execute(update(RecurringFee), rows)
+        track_transfers(submitted, 'recurring_fee')
+        post_many(recurring_fee_transaction(transfer['from_wallet_id'], transfer['amount_usdc'],
+                                            transfer['challenge_id']) for transfer in submitted)
+        db.session.commit()
+        db.session.expunge_all()
+
+    elapsed = time.perf_counter() - started
+    report['elapsed_seconds'] = round(elapsed, 3)
+    report['fees_per_second'] = round(report['fees_billed'] / elapsed, 1) if elapsed else 0.0
+    report['transfers_per_second'] = round(report['transfers_submitted'] / elapsed, 1) if elapsed else 0.0
+    report['amount_usdc'] = str(report['amount_usdc'])
+    return report
+
+
+def format_report(report):
+    """One-line summary of a billing run report"""
+    prefix = "🔎 DRY RUN: would bill" if report['dry_run'] else "✅ Billed"
+    summary = (
+        f"{prefix} {report['fees_billed']} fees (${report['amount_usdc']} USDC) in "
+        f"{report['transfers_submitted']} transfers, {report['elapsed_seconds']:.2f}s "
+        f"({report['fees_per_second']} fees/s, {report['transfers_per_second']} transfers/s)"
+    )
+    if report['transfers_failed']:
+        summary += f"; {report['transfers_failed']} transfers ({report['fees_failed']} fees) failed, retrying later"
+    if report['stopped_early']:
+        summary += "; stopped early (scheduler lease lost)"
+    return summary
@@ -0,0 +1,99 @@
+"""
+Case Pipeline
+Background approve -> generate -> upload pipeline run through the job queue
+"""
+
+from datetime import datetime
+from app import db
+from app.models import LegalCase
+from app.agents.registry import get_registry
+from app.services.job_queue import job_handler, enqueue, PermanentJobError
+
+
+def _get_agents():
+    """Agents the pipeline needs, from the current app's registry"""
+    registry = get_registry()
+    return registry.get('document'), registry.get('factory')
+
+
+def _set_stage(case, stage):
+    """Record a pipeline stage and commit so it is visible to the web app"""
+    case.pipeline_stage = stage
+    case.pipeline_error = None
+    db.session.commit()
+
+
+def enqueue_approval(case, memo=''):
+    """
+    Queue document generation and upload for an approved case
+
+    Re-approving a case whose pipeline is already queued, running or done
+    returns the existing job rather than starting a second one; the memo is
+    stored on the case here, so a corrected memo still replaces the old one.
+
+    Args:
+        case: The LegalCase being approved
+        memo: Lawyer's notes to store on the case
+
+    Returns:
+        The Job
+    """
+    if case.pipeline_stage in (None, 'FAILED'):
+        case.pipeline_stage = 'QUEUED'
+        case.pipeline_error = None
+    case.lawyer_memo = memo
+
+    return enqueue(
+        'approve_case',
+        case_id=case.id,
+        payload={'memo': memo},
+        idempotency_key=f"approve_case:{case.id}"
+    )
+
+
+@job_handler('approve_case')
+def approve_case(job, memo=''):
+    """
+    Step E/F: Generate the case document and upload it to the client locker
+
+    Each stage is committed as it completes, so a retry after a crash
+    resumes where it stopped: an already uploaded document is not
+    generated or uploaded again.
+    """
+    case = db.session.get(LegalCase, job.case_id)
+    if case is None:
+        raise PermanentJobError(f"Case {job.case_id} not found")
+
+    if case.pipeline_stage == 'DONE':
+        return
+
+    if not case.document_url:
+        doc_agent, factory = _get_agents()
+
+        # Step E: Generate the document
+        _set_stage(case, 'GENERATING')
+        form_data = dict(case.form_data or {})
+        form_data['case_id'] = case.id  # Add case_id for template
+
+        try:
+            doc_content, doc_filename = factory.generate_document(case.service_id, form_data)
+        except ValueError as e:
+            raise PermanentJobError(f"Error generating document: {e}")
+
+        # Step F: Upload to client locker
+        _set_stage(case, 'UPLOADING')
+        doc_url = doc_agent.upload_document(doc_content, doc_filename, case.id)
+        if not doc_url:
+            raise RuntimeError("Document upload failed")
+
+        case.document_url = doc_url
+        case.generated_document_path = doc_url
+        _set_stage(case, 'UPLOADED')
+
+    # Step G: Hand over to the client for final approval
+    case.status = 'PENDING_APPROVAL'
+    if memo and not case.lawyer_memo:
+        case.lawyer_memo = memo  # queued before enqueue_approval stored the memo
+    case.reviewed_at = datetime.utcnow()
+    case.pipeline_stage = 'DONE'
+    case.pipeline_error = None
@@ -0,0 +1,257 @@
+"""
+Escrow Settlement
+Per-case escrow releases recorded instantly in the escrow_releases ledger and
+netted into one escrow -> main wallet transfer per window, with per-case
+attribution and reconciliation
+"""
+
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from app import db
+from app.models import EscrowRelease, EscrowSettlement, LegalCase
+from app.money import ZERO, Money, money_sum
+from app.agents.circle_wallet_agent import transfer_idempotency_key
+from app.services.transfer_tracker import track_transfer, on_transfer_settled
+from app.services.ledger import post_many, release_transaction
+
+
+# Releases are netted for this long before being settled together
+ESCROW_NETTING_WINDOW = timedelta(seconds=int(os.environ.get('ESCROW_NETTING_WINDOW', '300')))
+
+# Most releases settled by one transfer
+ESCROW_SETTLEMENT_MAX_RELEASES = 500
+
+# How often the scheduler process looks for windows ready to settle
+ESCROW_SETTLEMENT_POLL_SECONDS = 30
+
+# CREATED settlements older than this were interrupted or refused at submission and are
+# resubmitted under the same idempotency key
+ESCROW_SUBMIT_GRACE = timedelta(minutes=2)
+
+
+def record_release(case, from_wallet_id, to_wallet_id):
+    """
+    Record a case's escrow release in the ledger (caller commits)
+
+    The case counts as released immediately (and is booked from escrow to
+    service revenue in the ledger); the funds move with the next settlement
+    of its escrow -> main wallet pair. Recording the same case twice returns
+    the existing release.
+
+    Returns:
+        The EscrowRelease
+    """
+    release = EscrowRelease.query.filter_by(case_id=case.id).first()
+    if release is None:
+        release = EscrowRelease(
+            case_id=case.id,
+            amount_usdc=case.total_price_usdc,
+            from_wallet_id=from_wallet_id,
+            to_wallet_id=to_wallet_id,
+            status='PENDING',
+            created_at=datetime.utcnow()
+        )
+        db.session.add(release)
+        post_many([release_transaction(release)])
+    return release
+
+
+def _submit(wallet_agent, settlement):
+    """
+    Submit a settlement's transfer and record the outcome (commits)
+
+    The idempotency key is derived from the settlement, so resubmitting an
+    interrupted settlement never moves the funds twice. A failed submission
+    may still have reached Circle (e.g. a timeout), so the settlement stays
+    CREATED with its releases attached and is retried under the same key;
+    releases only return to PENDING when Circle reports the transfer FAILED.
+    """
+    challenge_id = wallet_agent.initiate_gasless_transfer(
+        from_wallet_id=settlement.from_wallet_id,
+        to_address=settlement.to_wallet_id,
+        amount_usdc=settlement.total_usdc,
+        idempotency_key=transfer_idempotency_key('escrow_settlement', settlement.id)
+    )
+
+    if not challenge_id:
+        settlement.last_error = "Transfer submission failed, will retry"
+        db.session.commit()
+        print(f"⚠️  Escrow settlement {settlement.id} not submitted, retrying after {ESCROW_SUBMIT_GRACE}")
+        return False
+
+    settlement.state = 'SUBMITTED'
+    settlement.challenge_id = challenge_id
+    track_transfer(challenge_id, 'escrow_settlement',
+                   from_wallet_id=settlement.from_wallet_id, to_address=settlement.to_wallet_id)
+
+    # Per-case attribution: every netted case points at the settling transfer
+    LegalCase.query.filter(
+        LegalCase.id.in_(db.session.query(EscrowRelease.case_id).filter_by(settlement_id=settlement.id))
+    ).update({LegalCase.escrow_challenge_id: challenge_id}, synchronize_session=False)
+    db.session.commit()
+    return True
+
+
+def _fail(settlement, error):
+    """Mark a settlement whose transfer failed FAILED and return its releases to the next window (caller commits)"""
+    settlement.state = 'FAILED'
+    settlement.last_error = error
+    EscrowRelease.query.filter_by(settlement_id=settlement.id, status='SETTLING').update({
+        EscrowRelease.status: 'PENDING',
+        EscrowRelease.settlement_id: None
+    }, synchronize_session=False)
+
+
+def _open_settlement(from_wallet_id, to_wallet_id, release_ids):
+    """
+    Claim PENDING releases into a new settlement and net their amounts (commits)
+
+    Returns:
+        The EscrowSettlement, or None if every release was claimed elsewhere
+    """
+    settlement = EscrowSettlement(from_wallet_id=from_wallet_id, to_wallet_id=to_wallet_id, state='CREATED')
+    db.session.add(settlement)
+    db.session.flush()
+
+    claimed = EscrowRelease.query.filter(
+        EscrowRelease.id.in_(release_ids), EscrowRelease.status == 'PENDING'
+    ).update({
+        EscrowRelease.status: 'SETTLING',
+        EscrowRelease.settlement_id: settlement.id
+    }, synchronize_session=False)
+    if not claimed:
+        db.session.rollback()
+        return None
+
+    settlement.total_usdc = db.session.query(money_sum(EscrowRelease.amount_usdc))\
+        .filter_by(settlement_id=settlement.id).scalar()
+    settlement.release_count = claimed
+    db.session.commit()
+    return settlement
+
+
+def settle_releases(wallet_agent, window=ESCROW_NETTING_WINDOW, force=False):
+    """
+    Settle every wallet pair whose oldest pending release is older than window
+
+    Each pair's releases (up to ESCROW_SETTLEMENT_MAX_RELEASES per transfer)
+    are netted into one transfer. Settlements interrupted before submission
+    are resubmitted first.
+
+    Args:
+        wallet_agent: CircleWalletAgent
+        window: Netting window
+        force: Settle everything pending now (e.g. RUN_JOBS_INLINE deployments)
+
+    Returns:
+        Dict with settlements submitted, releases settled and failures
+    """
+    report = {'settlements': 0, 'releases': 0, 'failed': 0}
+    now = datetime.utcnow()
+
+    interrupted = EscrowSettlement.query.filter(
+        EscrowSettlement.state == 'CREATED',
+        EscrowSettlement.created_at <= now - ESCROW_SUBMIT_GRACE
+    ).all()
+    for settlement in interrupted:
+        report['settlements' if _submit(wallet_agent, settlement) else 'failed'] += 1
+
+    pairs = db.session.query(
+        EscrowRelease.from_wallet_id, EscrowRelease.to_wallet_id, func.min(EscrowRelease.created_at)
+    ).filter(EscrowRelease.status == 'PENDING')\
+        .group_by(EscrowRelease.from_wallet_id, EscrowRelease.to_wallet_id).all()
+
+    for from_wallet_id, to_wallet_id, oldest in pairs:
+        if not force and oldest > now - window:
+            continue
+
+        while True:
+            release_ids = [release_id for (release_id,) in db.session.query(EscrowRelease.id).filter(
+                EscrowRelease.status == 'PENDING',
+                EscrowRelease.from_wallet_id == from_wallet_id,
+                EscrowRelease.to_wallet_id == to_wallet_id,
+                EscrowRelease.created_at <= now
+            ).order_by(EscrowRelease.id).limit(ESCROW_SETTLEMENT_MAX_RELEASES)]
+            if not release_ids:
+                break
+
+            settlement = _open_settlement(from_wallet_id, to_wallet_id, release_ids)
+            if settlement is None:
+                continue
+            if _submit(wallet_agent, settlement):
+                report['settlements'] += 1
+                report['releases'] += settlement.release_count
+            else:
+                report['failed'] += 1
+                break
+
+    if report['settlements'] or report['failed']:
+        print(f"🏦 Escrow settlement: {report['releases']} releases in {report['settlements']} transfers"
+              + (f", {report['failed']} failed" if report['failed'] else ""))
+    return report
+
+
+@on_transfer_settled('escrow_settlement')
+def apply_settlement_outcomes(outcomes):
+    """Mark settled releases SETTLED, or return a failed settlement's releases to PENDING"""
+    now = datetime.utcnow()
+    for settlement in EscrowSettlement.query.filter(EscrowSettlement.challenge_id.in_(outcomes)).all():
+        if outcomes[settlement.challenge_id] == 'COMPLETE':
+            settlement.state = 'COMPLETE'
+            settlement.settled_at = now
+            EscrowRelease.query.filter_by(settlement_id=settlement.id).update({
+                EscrowRelease.status: 'SETTLED',
+                EscrowRelease.settled_at: now
+            }, synchronize_session=False)
+        else:
+            _fail(settlement, "Transfer failed on-chain")
+
+
+def reconcile(settlement_ids=None, limit=100):
+    """
+    Check that each settlement's total equals the sum of its releases
+
+    Args:
+        settlement_ids: Settlements to check (default: the latest `limit`)
+        limit: Settlements checked when settlement_ids is not given
+
+    Returns:
+        List of dicts per settlement with the per-case attribution, whether
+        it balances, and whether releases are stuck SETTLING under a
+        FAILED settlement
+    """
+    query = EscrowSettlement.query
+    if settlement_ids:
+        query = query.filter(EscrowSettlement.id.in_(settlement_ids))
+    else:
+        query = query.order_by(EscrowSettlement.id.desc()).limit(limit)
+
+    report = []
+    for settlement in sorted(query.all(), key=lambda settlement: settlement.id):
+        releases = settlement.releases
+        attributed = Money.total(release.amount_usdc for release in releases)
+        total = settlement.total_usdc or ZERO
+        report.append({
+            'settlement_id': settlement.id,
+            'state': settlement.state,
+            'challenge_id': settlement.challenge_id,
+            'total_usdc': str(total),
+            'attributed_usdc': str(attributed),
+            'balanced': attributed == total and len(releases) == settlement.release_count,
+            'cases': {release.case_id: str(release.amount_usdc) for release in releases},
+            'stuck': settlement.state == 'FAILED' and any(release.status == 'SETTLING' for release in releases)
+        })
+    return report
+
+
+def pending_summary():
+    """Pending (released but not yet settled) totals per wallet pair, summed by the database"""
+    rows = db.session.query(
+        EscrowRelease.from_wallet_id, EscrowRelease.to_wallet_id,
+        func.count(EscrowRelease.id), money_sum(EscrowRelease.amount_usdc)
+    ).filter(EscrowRelease.status.in_(['PENDING', 'SETTLING']))\
+        .group_by(EscrowRelease.from_wallet_id, EscrowRelease.to_wallet_id).all()
+
+    return {f"{from_wallet_id}->{to_wallet_id}": {'releases': count, 'total_usdc': str(total)}
+            for from_wallet_id, to_wallet_id, count, total in rows}
@@ -0,0 +1,240 @@
+"""
+Job Queue
+Durable background jobs stored in the application database and run by worker.py
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import Job, LegalCase
+
+
+# RUNNING jobs whose worker has been silent this long are reclaimed
+JOB_VISIBILITY_TIMEOUT = timedelta(minutes=10)
+
+# A running job's locked_at is refreshed this often, so long jobs are not reclaimed
+JOB_HEARTBEAT_SECONDS = JOB_VISIBILITY_TIMEOUT.total_seconds() / 3
+
+# Retry delay is JOB_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+JOB_RETRY_BASE_SECONDS = 5
+
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. invalid form data)"""
+
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, case_id=None, payload=None, idempotency_key=None, max_attempts=5):
+    """
+    Add a job to the queue, committing the current session
+
+    Any pending changes in the session (e.g. case status updates) are
+    committed in the same transaction as the job.
+
+    Args:
+        kind: Registered handler name
+        case_id: LegalCase the job works on (optional)
+        payload: JSON-serializable dict passed to the handler as kwargs
+        idempotency_key: Enqueuing the same key again returns the existing job;
+            a FAILED job with that key is reset and retried
+        max_attempts: Attempts before the job is marked FAILED
+
+    Returns:
+        The Job
+    """
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            if existing.status == 'FAILED':
+                existing.status = 'PENDING'
+                existing.attempts = 0
+                existing.run_after = datetime.utcnow()
+                existing.payload = json.dumps(payload or {})
+            db.session.commit()
+            return existing
+
+    job = Job(
+        kind=kind,
+        case_id=case_id,
+        payload=json.dumps(payload or {}),
+        idempotency_key=idempotency_key,
+        max_attempts=max_attempts,
+        run_after=datetime.utcnow()
+    )
+    db.session.add(job)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Lost a race with another request enqueuing the same key
+        db.session.rollback()
+        return Job.query.filter_by(idempotency_key=idempotency_key).one()
+
+    return job
+
+
+def _claimable(now):
+    """Filter for jobs that are due, or whose worker died mid-run"""
+    return or_(
+        and_(Job.status == 'PENDING', Job.run_after <= now),
+        and_(Job.status == 'RUNNING', Job.locked_at < now - JOB_VISIBILITY_TIMEOUT)
+    )
+
+
+def _claim(job_id, worker_id, now):
+    """Atomically mark one job RUNNING; returns True if this worker won it"""
+    claimed = Job.query.filter(Job.id == job_id, _claimable(now)).update({
+        Job.status: 'RUNNING',
+        Job.locked_by: worker_id,
+        Job.locked_at: now,
+        Job.attempts: Job.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+    return claimed == 1
+
+
+def claim_next(worker_id):
+    """
+    Claim the next due job
+
+    Uses a conditional UPDATE so concurrent workers never run the same job,
+    on both SQLite and Postgres.
+
+    Returns:
+        The claimed Job or None
+    """
+    now = datetime.utcnow()
+    candidates = db.session.query(Job.id).filter(_claimable(now))\
+        .order_by(Job.run_after).limit(10).all()
+
+    for (job_id,) in candidates:
+        if _claim(job_id, worker_id, now):
+            return db.session.get(Job, job_id)
+
+    return None
+
+
+def _heartbeat(engine, job_id, worker_id, stopped):
+    """Refresh locked_at of a job this worker still holds until stopped is set"""
+    while not stopped.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            with engine.begin() as conn:
+                conn.execute(update(Job).where(
+                    Job.id == job_id, Job.status == 'RUNNING', Job.locked_by == worker_id
+                ).values(locked_at=datetime.utcnow()))
+        except Exception as e:
+            print(f"❌ Job {job_id} heartbeat failed: {e}")
+
+
+def run_job(job):
+    """
+    Execute a claimed job and record the outcome
+
+    A heartbeat thread keeps the claim fresh while the handler runs.
+    Failures are retried with exponential backoff until max_attempts, then
+    the job (and its case's pipeline stage) is marked FAILED.
+
+    Returns:
+        True if the job completed
+    """
+    job_id = job.id
+    handler = _handlers.get(job.kind)
+
+    # Its own connection, so heartbeats commit independently of the handler's session
+    stopped = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(db.engine, job_id, job.locked_by, stopped),
+        name=f"job-{job_id}-heartbeat", daemon=True
+    )
+    heartbeat.start()
+
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler registered for job kind '{job.kind}'")
+
+        handler(job, **json.loads(job.payload or '{}'))
+
+        job.status = 'DONE'
+        job.last_error = None
+        job.locked_by = None
+        db.session.commit()
+        print(f"✅ Job {job_id} ({job.kind}) complete")
+        return True
+
+    except Exception as e:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        job.last_error = str(e)
+        job.locked_by = None
+
+        final = isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts
+        if final:
+            job.status = 'FAILED'
+        else:
+            job.status = 'PENDING'
+            job.run_after = datetime.utcnow() + timedelta(
+                seconds=JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1)
+            )
+
+        if job.case_id:
+            case = db.session.get(LegalCase, job.case_id)
+            if case:
+                case.pipeline_error = str(e)
+                if final:
+                    case.pipeline_stage = 'FAILED'
+
+        db.session.commit()
+        print(f"❌ Job {job_id} ({job.kind}) attempt {job.attempts} failed: {e}"
+              + ("" if final else f" (retrying at {job.run_after:%H:%M:%S})"))
+        return False
+
+    finally:
+        stopped.set()
+        heartbeat.join()
+
+
+def run_inline(job):
+    """Claim and run a specific job in the current process (no worker needed)"""
+    if _claim(job.id, f"inline-{os.getpid()}", datetime.utcnow()):
+        return run_job(db.session.get(Job, job.id))
+    return False
+
+
+def run_worker(poll_interval=1.0, worker_id=None, once=False):
+    """
+    Process jobs until interrupted
+
+    Args:
+        poll_interval: Seconds to sleep when the queue is empty
+        worker_id: Identifier recorded on claimed jobs (default host:pid)
+        once: Drain the currently due jobs and return instead of looping
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"👷 Job worker {worker_id} started")
+
+    while True:
+        job = claim_next(worker_id)
+        if job is not None:
+            run_job(job)
+            continue
+
+        if once:
+            return
+
+        db.session.remove()
+        time.sleep(poll_interval)
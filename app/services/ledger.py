@@ -0,0 +1,333 @@
+"""
+Ledger
+Append-only double-entry ledger of the money the platform moves, in integer
+micro-USDC, with per-account running balances kept up to date as entries are
+posted so escrow and revenue totals are single-row reads
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import EscrowRelease, LedgerAccount, LedgerEntry, LedgerTransaction, LegalCase
+from app.money import Money
+from app.services.transfer_tracker import on_transfer_settled
+
+
+# Client funds held until the client approves the delivered document
+ESCROW_ACCOUNT = 'escrow'
+
+# Earned by the firm: released escrow, and recurring fees
+SERVICE_REVENUE_ACCOUNT = 'revenue:services'
+FEE_REVENUE_ACCOUNT = 'revenue:recurring_fees'
+
+# Transactions posted per flush by backfill_cases
+LEDGER_BACKFILL_BATCH_SIZE = 500
+
+
+def client_account(wallet_id):
+    """Ledger account of a client wallet (negative: paid into the platform)"""
+    return f"client:{wallet_id}"
+
+
+def _usdc(micros):
+    """USDC string for a micro-USDC amount (e.g. 150000000 -> '150.00')"""
+    return str(Money(int(micros)))
+
+
+def _ensure_accounts(names, now):
+    """Create missing ledger accounts at a zero balance (caller commits)"""
+    existing = {name for (name,) in db.session.query(LedgerAccount.name).filter(LedgerAccount.name.in_(names))}
+    for name in sorted(set(names) - existing):
+        try:
+            with db.session.begin_nested():
+                db.session.add(LedgerAccount(name=name, balance_micros=0, entry_count=0, updated_at=now))
+        except IntegrityError:
+            pass  # Created by a concurrent posting
+
+
+def post_many(transactions):
+    """
+    Post balanced transactions to the ledger (caller commits)
+
+    Each account's running balance is moved once per call with an
+    UPDATE ... SET balance = balance + delta (accounts in name order, so
+    concurrent postings lock them in the same order), and every entry
+    records the balance it left its account at. Transactions whose key is
+    already in the ledger are skipped.
+
+    Args:
+        transactions: Iterable of dicts with key, kind, lines (list of
+            (account, amount_micros); must sum to zero) and optional
+            case_id and reference
+
+    Returns:
+        Dict of key -> LedgerTransaction for every given key (new or existing)
+
+    Raises:
+        ValueError: A transaction is empty or does not balance
+    """
+    transactions = list(transactions)
+    for transaction in transactions:
+        lines = transaction['lines']
+        if not lines or any(not isinstance(amount, int) for _, amount in lines):
+            raise ValueError(f"Ledger transaction {transaction['key']} needs integer micro-USDC lines")
+        if sum(amount for _, amount in lines) != 0:
+            raise ValueError(f"Ledger transaction {transaction['key']} does not balance")
+
+    keys = [transaction['key'] for transaction in transactions]
+    posted = {row.key: row for row in LedgerTransaction.query.filter(LedgerTransaction.key.in_(keys))} if keys else {}
+    new = []
+    for transaction in transactions:
+        if transaction['key'] not in posted:
+            posted[transaction['key']] = None
+            new.append(transaction)
+    if not new:
+        return posted
+
+    now = datetime.utcnow()
+    rows = []
+    for transaction in new:
+        row = LedgerTransaction(key=transaction['key'], kind=transaction['kind'], case_id=transaction.get('case_id'),
+                                reference=transaction.get('reference'), created_at=now)
+        posted[transaction['key']] = row
+        rows.append(row)
+    db.session.add_all(rows)
+    db.session.flush()
+
+    deltas = defaultdict(int)
+    counts = defaultdict(int)
+    for transaction in new:
+        for account, amount in transaction['lines']:
+            deltas[account] += amount
+            counts[account] += 1
+
+    _ensure_accounts(list(deltas), now)
+    for account in sorted(deltas):
+        db.session.execute(
+            update(LedgerAccount).where(LedgerAccount.name == account).values(
+                balance_micros=LedgerAccount.balance_micros + deltas[account],
+                entry_count=LedgerAccount.entry_count + counts[account],
+                updated_at=now
+            ),
+            execution_options={'synchronize_session': False}
+        )
+
+    # Walk forward from each account's balance before this call
+    current = dict(db.session.query(LedgerAccount.name, LedgerAccount.balance_micros)
+                   .filter(LedgerAccount.name.in_(list(deltas))))
+    running = {account: current[account] - delta for account, delta in deltas.items()}
+    entries = []
+    for transaction in new:
+        for account, amount in transaction['lines']:
+            running[account] += amount
+            entries.append({
+                'transaction_id': posted[transaction['key']].id,
+                'account': account,
+                'amount_micros': amount,
+                'balance_after_micros': running[account],
+                'created_at': now
+            })
+    db.session.execute(insert(LedgerEntry), entries)
+    return posted
+
+
+def post(key, kind, lines, case_id=None, reference=None):
+    """
+    Post one balanced transaction (caller commits); see post_many
+
+    Returns:
+        The LedgerTransaction (the existing one if key was already posted)
+    """
+    return post_many([{'key': key, 'kind': kind, 'lines': lines,
+                       'case_id': case_id, 'reference': reference}])[key]
+
+
+def reverse(key):
+    """
+    Post the opposite of an earlier transaction (caller commits)
+
+    Entries are never edited; a transfer that fails after it was booked is
+    corrected by a reversal keyed 'reversal:<key>'.
+
+    Returns:
+        The reversing LedgerTransaction, or None if key was never posted
+    """
+    original = LedgerTransaction.query.filter_by(key=key).first()
+    if original is None:
+        return None
+    lines = [(entry.account, -entry.amount_micros) for entry in sorted(original.entries, key=lambda e: e.id)]
+    return post(f"reversal:{key}", 'reversal', lines, case_id=original.case_id, reference=original.reference)
+
+
+def balance(account):
+    """Current balance of an account as Money (one primary key lookup)"""
+    micros = db.session.query(LedgerAccount.balance_micros).filter(LedgerAccount.name == account).scalar()
+    return Money(micros or 0)
+
+
+def balances(accounts):
+    """Current balances of several accounts as USDC strings"""
+    rows = dict(db.session.query(LedgerAccount.name, LedgerAccount.balance_micros)
+                .filter(LedgerAccount.name.in_(accounts)))
+    return {account: _usdc(rows.get(account, 0)) for account in accounts}
+
+
+def balance_at(account, when):
+    """Balance of an account as of a point in time, from its latest entry at or before then"""
+    row = db.session.query(LedgerEntry.balance_after_micros).filter(
+        LedgerEntry.account == account, LedgerEntry.created_at <= when
+    ).order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc()).first()
+    return Money(row[0] if row else 0)
+
+
+def statement(account, since=None, limit=100):
+    """Most recent entries of an account, newest first"""
+    query = db.session.query(LedgerEntry, LedgerTransaction).join(LedgerTransaction)\
+        .filter(LedgerEntry.account == account)
+    if since is not None:
+        query = query.filter(LedgerEntry.created_at >= since)
+
+    return [{
+        'at': entry.created_at.isoformat(),
+        'key': transaction.key,
+        'kind': transaction.kind,
+        'case_id': transaction.case_id,
+        'amount_usdc': _usdc(entry.amount_micros),
+        'balance_usdc': _usdc(entry.balance_after_micros)
+    } for entry, transaction in query.order_by(LedgerEntry.created_at.desc(), LedgerEntry.id.desc()).limit(limit)]
+
+
+def ledger_summary():
+    """Escrow and revenue balances (O(1) reads, no case scan)"""
+    return balances([ESCROW_ACCOUNT, SERVICE_REVENUE_ACCOUNT, FEE_REVENUE_ACCOUNT])
+
+
+def verify_balances(repair=False):
+    """
+    Recompute every running balance from the entries and compare
+
+    Args:
+        repair: Overwrite drifted running balances with the recomputed ones (caller commits)
+
+    Returns:
+        Dict with the accounts whose running balance drifted, the sum of
+        all entries and whether that sum is zero (as in a balanced ledger)
+    """
+    totals = {account: (int(total), count) for account, total, count in db.session.query(
+        LedgerEntry.account, func.sum(LedgerEntry.amount_micros), func.count(LedgerEntry.id)
+    ).group_by(LedgerEntry.account)}
+
+    drifted = {}
+    for row in LedgerAccount.query.all():
+        total, count = totals.pop(row.name, (0, 0))
+        if row.balance_micros != total or row.entry_count != count:
+            drifted[row.name] = {'running_usdc': _usdc(row.balance_micros), 'entries_usdc': _usdc(total)}
+            if repair:
+                row.balance_micros = total
+                row.entry_count = count
+    for name, (total, count) in totals.items():
+        drifted[name] = {'running_usdc': None, 'entries_usdc': _usdc(total)}
+        if repair:
+            db.session.add(LedgerAccount(name=name, balance_micros=total, entry_count=count,
+                                         updated_at=datetime.utcnow()))
+
+    net = db.session.query(func.coalesce(func.sum(LedgerEntry.amount_micros), 0)).scalar()
+    return {'drifted': drifted, 'net_usdc': _usdc(net), 'net_zero': int(net) == 0}
+
+
+# ============================================================================
+# Postings
+# ============================================================================
+
+def payment_transaction(case):
+    """Ledger transaction for a settled case payment (client -> escrow)"""
+    micros = Money.parse(case.total_price_usdc).micros
+    return {
+        'key': f"payment:{case.payment_challenge_id}",
+        'kind': 'payment',
+        'lines': [(client_account(case.client_wallet_id), -micros), (ESCROW_ACCOUNT, micros)],
+        'case_id': case.id,
+        'reference': case.payment_challenge_id
+    }
+
+
+def release_transaction(release):
+    """Ledger transaction for a case's escrow release (escrow -> service revenue)"""
+    micros = Money.parse(release.amount_usdc).micros
+    return {
+        'key': f"escrow_release:{release.case_id}",
+        'kind': 'escrow_release',
+        'lines': [(ESCROW_ACCOUNT, -micros), (SERVICE_REVENUE_ACCOUNT, micros)],
+        'case_id': release.case_id
+    }
+
+
+def recurring_fee_transaction(wallet_id, amount_usdc, challenge_id):
+    """Ledger transaction for one grouped recurring fee transfer (client -> fee revenue)"""
+    micros = Money.parse(amount_usdc).micros
+    return {
+        'key': f"recurring_fee:{challenge_id}",
+        'kind': 'recurring_fee',
+        'lines': [(client_account(wallet_id), -micros), (FEE_REVENUE_ACCOUNT, micros)],
+        'reference': challenge_id
+    }
+
+
+@on_transfer_settled('payment')
+def book_payments(outcomes):
+    """Book settled case payments into escrow"""
+    completed = [challenge_id for challenge_id, outcome in outcomes.items() if outcome == 'COMPLETE']
+    if completed:
+        cases = LegalCase.query.filter(LegalCase.payment_challenge_id.in_(completed)).all()
+        post_many(payment_transaction(case) for case in cases)
+
+
+@on_transfer_settled('recurring_fee')
+def reverse_failed_fees(outcomes):
+    """Recurring fees are booked when submitted; reverse the ones that failed on-chain"""
+    for challenge_id, outcome in outcomes.items():
+        if outcome != 'COMPLETE':
+            reverse(f"recurring_fee:{challenge_id}")
+
+
+def backfill_cases(batch_size=LEDGER_BACKFILL_BATCH_SIZE):
+    """
+    Book payments and escrow releases recorded before the ledger existed (commits)
+
+    Postings are keyed like the live ones, so running this again (or after
+    live postings) books nothing twice. Recurring fees billed before the
+    ledger are not booked: their grouped amounts were never stored.
+
+    Returns:
+        Dict with payments and releases examined
+    """
+    report = {'payments': 0, 'releases': 0}
+
+    last_id = 0
+    while True:
+        cases = LegalCase.query.filter(
+            LegalCase.id > last_id,
+            LegalCase.payment_challenge_id.isnot(None),
+            LegalCase.status.notin_(['PENDING_PAYMENT', 'PAYMENT_SUBMITTED'])
+        ).order_by(LegalCase.id).limit(batch_size).all()
+        if not cases:
+            break
+        last_id = cases[-1].id
+        post_many(payment_transaction(case) for case in cases)
+        db.session.commit()
+        report['payments'] += len(cases)
+
+    last_id = 0
+    while True:
+        releases = EscrowRelease.query.filter(EscrowRelease.id > last_id)\
+            .order_by(EscrowRelease.id).limit(batch_size).all()
+        if not releases:
+            break
+        last_id = releases[-1].id
+        post_many(release_transaction(release) for release in releases)
+        db.session.commit()
+        report['releases'] += len(releases)
+
+    return report
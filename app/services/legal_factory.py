@@ -3,28 +3,56 @@ Legal Service Factory
 Generates deterministic legal documents from templates and structured data
 """
 
-import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from app.services.service_catalog import TEMPLATES_DIR, get_catalog
+from app.services.template_engine import template_cache
+
+
+# Rows below this size are rendered in-process; a pool costs more than it saves
+BATCH_POOL_THRESHOLD = 32
+
+# Per-process factory used by batch render workers
+_worker_factory = None
+
+
+def _render_batch_row(task):
+    """
+    Render one batch row inside a worker process
+
+    Args:
+        task: Tuple of (service_id, row_index, data)
+
+    Returns:
+        Result dict for the row
+    """
+    global _worker_factory
+    if _worker_factory is None:
+        _worker_factory = LegalFactory()
+
+    return _worker_factory._render_batch_task(task)
 
 
 class LegalFactory:
     """Factory class for legal document generation"""
 
     def __init__(self):
-        """Load service definitions from services.json"""
-        services_path = os.path.join(os.path.dirname(__file__), 'services.json')
-        with open(services_path, 'r') as f:
-            services_list = json.load(f)
-            self.services = {s['id']: s for s in services_list}
+        """Load the service catalog (fails fast if services.json is invalid)"""
+        get_catalog()
+
+    @property
+    def services(self):
+        """Service definitions by ID, from the current catalog snapshot"""
+        return get_catalog().by_id
 
     def get_service(self, service_id):
         """Get service definition by ID"""
-        return self.services.get(service_id)
+        return get_catalog().get(service_id)
 
     def get_all_services(self):
         """Get all available services"""
-        return self.services.values()
+        return get_catalog().services
 
     def validate_fields(self, service_id, data):
         """
@@ -63,20 +91,134 @@ class LegalFactory:
         # Validate required fields
         self.validate_fields(service_id, data)
 
-        # Load template
-        template_path = os.path.join(
-            os.path.dirname(__file__),
-            'templates',
-            service['template_file']
-        )
+        return self._render_document(service_id, data)
 
-        with open(template_path, 'r') as f:
-            template_content = f.read()
+    def _render_document(self, service_id, data, row_index=None):
+        """
+        Render a validated document
+
+        Args:
+            service_id: The service ID
+            data: Dictionary containing all required fields
+            row_index: Batch row number, appended to the filename so rows
+                rendered in the same second never collide
 
-        # Add metadata to data
+        Returns:
+            Tuple of (document_content, filename)
+        """
+        service = self.get_service(service_id)
+
+        # Load compiled template (parsed once, re-parsed only when the file changes)
+        template = self._get_template(service)
+
+        enhanced_data = self._enhance_data(service_id, data)
+
+        # Single-pass render over the precompiled segment list
+        template_content, missing = template.render(enhanced_data)
+        if missing:
+            print(f"⚠️  Unresolved placeholders in {service['template_file']}: {', '.join(missing)}")
+
+        # Generate filename
+        case_id = data.get('case_id', 'new')
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        if row_index is None:
+            filename = f"{service_id}_case_{case_id}_{timestamp}.txt"
+        else:
+            filename = f"{service_id}_case_{case_id}_{timestamp}_row{row_index:05d}.txt"
+
+        return template_content, filename
+
+    def validate_rows(self, service_id, rows):
+        """
+        Validate many form rows against a service in one pass
+
+        Args:
+            service_id: The service ID
+            rows: List of form data dictionaries
+
+        Returns:
+            List with one entry per row: None if valid, otherwise an error message
+        """
+        service = self.get_service(service_id)
+        if not service:
+            raise ValueError(f"Service '{service_id}' not found")
+
+        required = service['required_fields']
+        errors = []
+        for data in rows:
+            if not isinstance(data, dict):
+                errors.append("Row is not an object")
+                continue
+            missing_fields = [field for field in required if not data.get(field)]
+            errors.append(
+                f"Missing required fields: {', '.join(missing_fields)}" if missing_fields else None
+            )
+
+        return errors
+
+    def generate_batch(self, service_id, rows, max_workers=None):
+        """
+        Generate documents for many rows of the same service
+
+        Rows are validated up front, then valid rows are rendered on a process
+        pool. Results are yielded in row order as soon as they are ready so
+        callers can stream them to the document store; a bad row produces an
+        error result instead of failing the batch.
+
+        Args:
+            service_id: The service ID (e.g., 'DE_LLC')
+            rows: List of form data dictionaries
+            max_workers: Process pool size (None = CPU count, 0 = render in-process)
+
+        Yields:
+            Dict per row with keys 'row', 'ok', 'content', 'filename', 'error'
+        """
+        rows = list(rows)
+        errors = self.validate_rows(service_id, rows)
+
+        tasks = [
+            (service_id, index, data)
+            for index, (data, error) in enumerate(zip(rows, errors))
+            if error is None
+        ]
+
+        if max_workers == 0 or len(tasks) < BATCH_POOL_THRESHOLD:
+            rendered = map(self._render_batch_task, tasks)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 4))
+            rendered = executor.map(_render_batch_row, tasks, chunksize=chunksize)
+
+        try:
+            for index, error in enumerate(errors):
+                if error is not None:
+                    yield {'row': index, 'ok': False, 'content': None, 'filename': None, 'error': error}
+                else:
+                    yield next(rendered)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def _render_batch_task(self, task):
+        """Render one batch row in the current process"""
+        service_id, row_index, data = task
+        try:
+            content, filename = self._render_document(service_id, data, row_index=row_index)
+            return {'row': row_index, 'ok': True, 'content': content, 'filename': filename, 'error': None}
+        except Exception as e:
+            return {'row': row_index, 'ok': False, 'content': None, 'filename': None, 'error': str(e)}
+
+    def _get_template(self, service):
+        """Get the compiled template for a service definition"""
+        return template_cache.get(os.path.join(TEMPLATES_DIR, service['template_file']))
+
+    def _enhance_data(self, service_id, data):
+        """Add generation metadata and service-specific defaults to form data"""
         enhanced_data = data.copy()
-        enhanced_data['generation_date'] = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
-        enhanced_data['filing_date'] = datetime.utcnow().strftime('%Y-%m-%d')
+        now = datetime.utcnow()
+        enhanced_data['generation_date'] = now.strftime('%Y-%m-%d %H:%M:%S UTC')
+        enhanced_data['filing_date'] = now.strftime('%Y-%m-%d')
 
         # Add default values for optional fields in UCC-1
         if service_id == 'UCC1_FILING':
@@ -86,30 +228,43 @@ class LegalFactory:
             enhanced_data.setdefault('secured_party_address', 'See Secured Party Name')
             enhanced_data.setdefault('filing_office', 'State Filing Office')
 
-        # Simple template replacement
-        for key, value in enhanced_data.items():
-            placeholder = f"{{{{{key}}}}}"
-            template_content = template_content.replace(placeholder, str(value))
+        return enhanced_data
 
-        # Generate filename
-        case_id = data.get('case_id', 'new')
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{service_id}_case_{case_id}_{timestamp}.txt"
+    def check_template(self, service_id, data):
+        """
+        Report placeholder coverage for a service template without rendering
 
-        return template_content, filename
+        Args:
+            service_id: The service ID
+            data: Dictionary of form fields
+
+        Returns:
+            Dict with 'missing' (placeholders without a value) and
+            'unknown' (data keys the template never uses)
+        """
+        service = self.get_service(service_id)
+        if not service:
+            raise ValueError(f"Service '{service_id}' not found")
+
+        template = self._get_template(service)
+        enhanced_data = self._enhance_data(service_id, data)
+        return {
+            'missing': template.missing_fields(enhanced_data),
+            'unknown': template.unknown_fields(enhanced_data)
+        }
 
     def calculate_total_fee(self, service_id):
-        """Calculate total fee for a service"""
+        """Calculate total fee for a service (Money)"""
         service = self.get_service(service_id)
         if not service:
             raise ValueError(f"Service '{service_id}' not found")
 
-        return float(service['price_usdc'])
+        return service['price_usdc']
 
     def get_recurring_fee(self, service_id):
-        """Get recurring annual fee for a service"""
+        """Get recurring annual fee for a service (Money)"""
         service = self.get_service(service_id)
         if not service:
             raise ValueError(f"Service '{service_id}' not found")
 
-        return float(service['recurring_fee_usdc'])
+        return service['recurring_fee_usdc']
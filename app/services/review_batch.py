@@ -0,0 +1,216 @@
+"""
+Review Batch
+Clears many lawyer reviews (voice clips or text directives) in one job:
+concurrent transcription and intent extraction, one render pass per
+service, one upload wave and a single database commit
+"""
+
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from app import db
+from app.models import LegalCase
+from app.agents.registry import get_registry
+from app.services.job_queue import job_handler, enqueue
+from app.services.voice_pipeline import VOICE_JOB_MAX_ATTEMPTS, discard_upload
+
+
+# Most reviews accepted in one batch
+REVIEW_BATCH_MAX_ITEMS = int(os.environ.get('REVIEW_BATCH_MAX_ITEMS', '50'))
+
+# Transcriptions/extractions (and document uploads) in flight at once
+REVIEW_BATCH_WORKERS = int(os.environ.get('REVIEW_BATCH_WORKERS', '8'))
+
+# Pipeline stages of a case whose approval job is already under way
+_PIPELINE_BUSY = ('QUEUED', 'GENERATING', 'UPLOADING', 'UPLOADED')
+
+
+def enqueue_review_batch(items, user_id, use_cache=True):
+    """
+    Queue a batch of reviews
+
+    Args:
+        items: List of {'text': directive} or {'path': spooled audio} dicts
+        user_id: Lawyer who submitted the batch
+        use_cache: Set False to bypass the intent cache
+
+    Returns:
+        The Job
+    """
+    return enqueue(
+        'review_batch',
+        payload={'items': items, 'user_id': user_id, 'use_cache': use_cache},
+        max_attempts=VOICE_JOB_MAX_ATTEMPTS
+    )
+
+
+def extract_reviews(intent_agent, items, use_cache=True, max_workers=REVIEW_BATCH_WORKERS):
+    """
+    Transcribe and extract every item concurrently
+
+    Args:
+        intent_agent: AiIntentAgent
+        items: List of {'text': ...} or {'path': ...} dicts
+        use_cache: Set False to bypass the intent cache
+        max_workers: Thread pool size
+
+    Returns:
+        List (in item order) of dicts with 'item', 'transcript', 'review'
+        (ReviewTask or None) and 'error'
+    """
+    # Build the SDK clients once here rather than racing to build them in the pool
+    if any('path' in item for item in items):
+        intent_agent.eleven_client
+    intent_agent.gemini_model
+
+    def extract_one(index):
+        item = items[index]
+        outcome = {'item': index, 'transcript': item.get('text'), 'review': None, 'error': None}
+        if 'path' in item:
+            if not os.path.exists(item['path']):
+                outcome['error'] = "Audio upload not found"
+                return outcome
+            outcome['transcript'] = intent_agent.transcribe_file(item['path'])
+            if not outcome['transcript']:
+                outcome['error'] = "Transcription failed"
+                return outcome
+
+        outcome['review'] = intent_agent.get_intent_from_text_review(outcome['transcript'], use_cache=use_cache)
+        if outcome['review'] is None:
+            outcome['error'] = "Could not understand review"
+        return outcome
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(items)))) as executor:
+        return list(executor.map(extract_one, range(len(items))))
+
+
+def apply_reviews(extracted, factory, doc_agent, max_workers=REVIEW_BATCH_WORKERS):
+    """
+    Apply extracted reviews to their cases (the caller commits)
+
+    Cases are loaded with one query. Approved documents are rendered one
+    service at a time with LegalFactory.generate_batch and uploaded in one
+    concurrent wave; rejections are recorded directly.
+
+    Args:
+        extracted: Output of extract_reviews
+        factory: LegalFactory
+        doc_agent: DocumentAgent
+        max_workers: Maximum uploads in flight at once
+
+    Returns:
+        List of per-item result dicts, in item order
+    """
+    results = [
+        {'item': outcome['item'], 'transcript': outcome['transcript'], 'ok': False, 'error': outcome['error']}
+        for outcome in extracted
+    ]
+    reviews = {outcome['item']: outcome['review'] for outcome in extracted if outcome['review'] is not None}
+
+    case_ids = {review.case_id for review in reviews.values()}
+    cases = {case.id: case for case in LegalCase.query.filter(LegalCase.id.in_(case_ids))} if case_ids else {}
+
+    seen = set()
+    approvals = defaultdict(list)  # service_id -> [(item, case, memo)]
+    for item, review in reviews.items():
+        result = results[item]
+        result.update(case_id=review.case_id, action=review.action)
+        case = cases.get(review.case_id)
+
+        if case is None:
+            result['error'] = f"Case {review.case_id} not found"
+        elif case.id in seen:
+            result['error'] = f"Case {case.id} appears more than once in the batch"
+        elif review.action == 'reject':
+            case.status = 'REJECTED'
+            case.lawyer_memo = review.memo or 'Rejected by lawyer'
+            result.update(ok=True, message="Case rejected.")
+        elif review.action != 'approve':
+            result['error'] = "Unknown action"
+        elif case.pipeline_stage == 'DONE':
+            result.update(ok=True, message="Case already approved.")
+        elif case.pipeline_stage in _PIPELINE_BUSY:
+            result['error'] = f"Case {case.id} is already being processed"
+        elif case.document_url:
+            # Uploaded by an earlier attempt; uploading again would duplicate it
+            result['error'] = f"Case {case.id} already has an uploaded document"
+        else:
+            approvals[case.service_id].append((item, case, review.memo or ''))
+        seen.add(review.case_id)
+
+    # Step E: one render pass per service
+    documents = []
+    for service_id, group in approvals.items():
+        rows = [dict(case.form_data or {}, case_id=case.id) for _, case, _ in group]
+        try:
+            rendered = list(factory.generate_batch(service_id, rows))
+        except ValueError as e:
+            rendered = [{'ok': False, 'error': str(e)}] * len(group)
+
+        for (item, case, memo), render in zip(group, rendered):
+            if render['ok']:
+                documents.append((item, case, memo, render['content'], render['filename']))
+            else:
+                results[item]['error'] = f"Error generating document: {render['error']}"
+
+    # Step F: one upload wave for every approved document
+    urls = doc_agent.upload_documents(
+        [(content, filename, case.id) for _, case, _, content, filename in documents],
+        max_concurrency=max_workers
+    )
+
+    # Step G: hand the uploaded cases over to the client
+    reviewed_at = datetime.utcnow()
+    for (item, case, memo, _, _), url in zip(documents, urls):
+        if not url:
+            results[item]['error'] = "Document upload failed"
+            continue
+        case.document_url = url
+        case.generated_document_path = url
+        case.status = 'PENDING_APPROVAL'
+        case.lawyer_memo = memo
+        case.reviewed_at = reviewed_at
+        case.pipeline_stage = 'DONE'
+        case.pipeline_error = None
+        results[item].update(ok=True, message="Case approved, document uploaded.")
+
+    return results
+
+
+@job_handler('review_batch')
+def review_batch(job, items, user_id, use_cache=True):
+    """
+    Step D/E/F (batch): Apply a lawyer's queue of reviews
+
+    Per-item problems (unclear audio, unknown case) are reported in the
+    result rather than failing the job; every case change is committed
+    together with the job.
+    """
+    paths = [item['path'] for item in items if 'path' in item]
+    try:
+        registry = get_registry()
+        job.stage = 'EXTRACTING'
+        db.session.commit()
+        extracted = extract_reviews(registry.get('intent'), items, use_cache=use_cache)
+
+        job.stage = 'APPLYING'
+        db.session.commit()
+        results = apply_reviews(extracted, registry.get('factory'), registry.get('document'))
+    except Exception:
+        if job.attempts >= job.max_attempts:
+            for path in paths:
+                discard_upload(path)
+        raise
+
+    succeeded = sum(1 for result in results if result['ok'])
+    job.result = json.dumps({
+        'message': f"{succeeded} of {len(results)} reviews applied.",
+        'reviews': results
+    })
+    job.stage = 'DONE'
+    for path in paths:
+        discard_upload(path)
@@ -0,0 +1,282 @@
+"""
+Service Catalog
+services.json validated at load and indexed by id, jurisdiction and category;
+the file is polled for changes and a new snapshot swapped in whole, so
+readers never take a lock or see a half-loaded catalog
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from app.money import Money
+
+
+# Service definitions (the factory, order form and intent schemas all read them from here)
+SERVICES_PATH = os.path.join(os.path.dirname(__file__), 'services.json')
+
+# Document templates named by each service's template_file
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+# How often services.json is checked for changes (0 = on every lookup)
+SERVICE_CATALOG_POLL_SECONDS = float(os.environ.get('SERVICE_CATALOG_POLL_SECONDS', '2'))
+
+# Keys every service definition must have
+SERVICE_REQUIRED_KEYS = ('id', 'name', 'jurisdiction', 'category', 'template_file', 'required_fields',
+                         'price_usdc', 'recurring_fee_usdc')
+
+# Money fields of a service definition, parsed strictly at load
+SERVICE_MONEY_FIELDS = ('price_usdc', 'recurring_fee_usdc')
+
+# Descriptions of known form fields; any other field in services.json gets a
+# description derived from its name (see field_description)
+FIELD_DESCRIPTIONS = {
+    'entity_name': "Name of the company, DAO or LLC",
+    'smart_contract_identifier': "Public smart contract address of the DAO",
+    'registered_agent_name': "Name of the registered agent",
+    'registered_agent_address': "Address of the registered agent",
+    'management_statement': "Management structure (member-managed or algorithmically managed)",
+    'authorized_person_name': "Authorized person (Delaware LLC)",
+    'debtor_name': "Legal name of the debtor",
+    'secured_party_name': "Name of the secured party/creditor",
+    'collateral_description': "Description of the collateral"
+}
+
+_SERVICE_ID = re.compile(r'^[A-Z][A-Z0-9_]*$')
+_FIELD_NAME = re.compile(r'^[a-z][a-z0-9_]*$')
+
+
+def field_description(field):
+    """Description of a form field, shown on the order form and in the order prompt"""
+    return FIELD_DESCRIPTIONS.get(field, field.replace('_', ' ').capitalize())
+
+
+class CatalogError(ValueError):
+    """Raised when services.json cannot be loaded; lists every problem found"""
+
+
+def parse_service(entry):
+    """
+    Validate one services.json entry
+
+    Amounts are parsed into Money and must be decimal strings (e.g.
+    "150.00"): a JSON number would already have gone through a float.
+    List fields become tuples so a loaded catalog cannot be changed.
+
+    Returns:
+        Tuple of (service dict or None, list of problems)
+    """
+    if not isinstance(entry, dict):
+        return None, [f"entry is not an object: {entry!r}"]
+
+    label = entry.get('id') or '?'
+    problems = [f"{label}: missing '{key}'" for key in SERVICE_REQUIRED_KEYS if key not in entry]
+    if problems:
+        return None, problems
+
+    service = dict(entry)
+    if not isinstance(service['id'], str) or not _SERVICE_ID.match(service['id']):
+        problems.append(f"{label}: id must be UPPER_SNAKE_CASE")
+    for key in ('name', 'jurisdiction', 'category'):
+        if not isinstance(service[key], str) or not service[key].strip():
+            problems.append(f"{label}: {key} must be a non-empty string")
+
+    for field in SERVICE_MONEY_FIELDS:
+        value = service[field]
+        if not isinstance(value, str):
+            problems.append(f"{label}: {field} must be a decimal string, got {value!r}")
+            continue
+        try:
+            service[field] = Money.parse(value, allow_negative=False)
+        except ValueError as e:
+            problems.append(f"{label}: {field}: {e}")
+
+    fields = service['required_fields']
+    if not isinstance(fields, list) or not all(isinstance(f, str) and _FIELD_NAME.match(f) for f in fields):
+        problems.append(f"{label}: required_fields must be a list of snake_case field names")
+    else:
+        service['required_fields'] = tuple(fields)
+
+    aliases = service.get('aliases', [])
+    if not isinstance(aliases, list) or not all(isinstance(alias, str) and alias.strip() for alias in aliases):
+        problems.append(f"{label}: aliases must be a list of phrases")
+    else:
+        service['aliases'] = tuple(alias.strip() for alias in aliases)
+
+    template = service['template_file']
+    if not isinstance(template, str) or os.path.basename(template) != template:
+        problems.append(f"{label}: template_file must be a file name in {TEMPLATES_DIR}")
+    elif not os.path.isfile(os.path.join(TEMPLATES_DIR, template)):
+        problems.append(f"{label}: template {template} not found")
+
+    return (None if problems else service), problems
+
+
+class ServiceCatalog:
+    """Immutable, indexed snapshot of services.json"""
+
+    def __init__(self, services, version, stamp=None):
+        """
+        Args:
+            services: Validated service dicts, in file order
+            version: Content hash identifying this snapshot
+            stamp: (mtime_ns, size) of the file it was loaded from
+        """
+        self.services = tuple(services)
+        self.version = version
+        self.stamp = stamp
+        self.by_id = {service['id']: service for service in self.services}
+
+        by_jurisdiction = {}
+        by_category = {}
+        fields = {}
+        for service in self.services:
+            by_jurisdiction.setdefault(service['jurisdiction'], []).append(service)
+            by_category.setdefault(service['category'], []).append(service)
+            for field in service['required_fields']:
+                fields.setdefault(field, []).append(service['id'])
+        self.by_jurisdiction = {key: tuple(group) for key, group in by_jurisdiction.items()}
+        self.by_category = {key: tuple(group) for key, group in by_category.items()}
+        # Form field -> IDs of the services requiring it, in first-use order
+        self.fields = {field: tuple(service_ids) for field, service_ids in fields.items()}
+
+    @classmethod
+    def load(cls, path=SERVICES_PATH):
+        """
+        Load and validate a services file
+
+        Raises:
+            CatalogError: The file is not valid JSON or any service is invalid
+            OSError: The file cannot be read
+        """
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        try:
+            entries = json.loads(raw)
+        except ValueError as e:
+            raise CatalogError(f"services.json is not valid JSON: {e}")
+        if not isinstance(entries, list) or not entries:
+            raise CatalogError("services.json must be a non-empty list of services")
+
+        services = []
+        problems = []
+        seen = set()
+        phrases = {}  # lowercased name or alias -> service ID (how intent rules match them)
+        for entry in entries:
+            service, entry_problems = parse_service(entry)
+            problems.extend(entry_problems)
+            if service is not None:
+                if service['id'] in seen:
+                    problems.append(f"{service['id']}: duplicate id")
+                seen.add(service['id'])
+                for phrase in (service['name'],) + service['aliases']:
+                    owner = phrases.setdefault(phrase.lower(), service['id'])
+                    if owner != service['id']:
+                        problems.append(f"{service['id']}: name or alias '{phrase}' is already used by {owner}")
+                services.append(service)
+        if problems:
+            raise CatalogError("Invalid services.json: " + "; ".join(problems))
+
+        version = hashlib.sha256(raw).hexdigest()[:12]
+        return cls(services, version, stamp=(stat.st_mtime_ns, stat.st_size))
+
+    def get(self, service_id):
+        """Service by ID, or None"""
+        return self.by_id.get(service_id)
+
+    def in_jurisdiction(self, jurisdiction):
+        """Services of a jurisdiction (e.g. 'WY')"""
+        return self.by_jurisdiction.get(jurisdiction, ())
+
+    def in_category(self, category):
+        """Services of a category (e.g. 'entity_formation')"""
+        return self.by_category.get(category, ())
+
+    def __len__(self):
+        return len(self.services)
+
+    def __iter__(self):
+        return iter(self.services)
+
+
+_catalog = None
+_checked_at = 0.0
+_rejected_stamp = None
+_stat_failing = False
+_load_lock = threading.Lock()
+
+
+def _file_stamp():
+    """(mtime_ns, size) of services.json"""
+    stat = os.stat(SERVICES_PATH)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _check_for_changes():
+    """
+    Swap in a new snapshot if services.json changed
+
+    One thread checks at a time; the others carry on with the current
+    snapshot instead of waiting. An invalid file, or one that cannot be
+    stat'ed, is reported once and the current snapshot kept until the file
+    changes again.
+    """
+    global _catalog, _checked_at, _rejected_stamp, _stat_failing
+    if not _load_lock.acquire(blocking=False):
+        return
+    try:
+        _checked_at = time.monotonic()
+        try:
+            stamp = _file_stamp()
+        except OSError as e:
+            if not _stat_failing:
+                print(f"⚠️  Cannot stat services.json, keeping catalog {_catalog.version}: {e}")
+            _stat_failing = True
+            return
+        _stat_failing = False
+        if stamp == _catalog.stamp or stamp == _rejected_stamp:
+            return
+
+        try:
+            catalog = ServiceCatalog.load()
+        except (OSError, CatalogError) as e:
+            _rejected_stamp = stamp
+            print(f"❌ services.json reload rejected, keeping catalog {_catalog.version}: {e}")
+            return
+
+        _rejected_stamp = None
+        previous, _catalog = _catalog, catalog
+        print(f"📚 Service catalog reloaded: {len(previous)} -> {len(catalog)} services ({catalog.version})")
+    finally:
+        _load_lock.release()
+
+
+def get_catalog():
+    """
+    Get the current service catalog, loading it on first use
+
+    Lookups on the returned snapshot are dict reads. Every
+    SERVICE_CATALOG_POLL_SECONDS one caller also checks services.json
+    and, if it changed and is valid, swaps in a new snapshot for later calls.
+
+    Raises:
+        CatalogError: The first load failed (later failures keep the old catalog)
+    """
+    global _catalog, _checked_at
+    catalog = _catalog
+    if catalog is None:
+        with _load_lock:
+            if _catalog is None:
+                _catalog = ServiceCatalog.load()
+                _checked_at = time.monotonic()
+            return _catalog
+
+    if time.monotonic() - _checked_at >= SERVICE_CATALOG_POLL_SECONDS:
+        _check_for_changes()
+        return _catalog
+    return catalog
+
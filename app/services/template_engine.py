@@ -0,0 +1,111 @@
+"""
+Template Engine
+Compiles {{placeholder}} templates once and renders them with a single join
+"""
+
+import os
+import re
+import threading
+
+
+PLACEHOLDER_PATTERN = re.compile(r'\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}')
+
+
+class CompiledTemplate:
+    """A template parsed into alternating literal and placeholder segments"""
+
+    def __init__(self, source):
+        """
+        Parse template source into a segment list
+
+        Args:
+            source: Raw template text containing {{placeholder}} markers
+        """
+        self.source = source
+        self.literals = []      # literal text before each placeholder, plus the tail
+        self.fields = []        # placeholder name following each literal
+        self.raw_fields = []    # original marker text, used when a value is missing
+
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.fields.append(match.group(1))
+            self.raw_fields.append(match.group(0))
+            position = match.end()
+        self.literals.append(source[position:])
+
+        self.placeholders = frozenset(self.fields)
+
+    def missing_fields(self, data):
+        """Placeholders in the template that have no value in data"""
+        return sorted(name for name in self.placeholders if name not in data)
+
+    def unknown_fields(self, data):
+        """Keys in data that the template never references"""
+        return sorted(key for key in data if key not in self.placeholders)
+
+    def render(self, data):
+        """
+        Render the template with one pass over the segment list
+
+        Args:
+            data: Dictionary of placeholder values
+
+        Returns:
+            Tuple of (rendered_text, missing_fields). Missing placeholders are
+            left in the output verbatim, matching the old str.replace behaviour.
+        """
+        parts = []
+        missing = set()
+        for literal, name, raw in zip(self.literals, self.fields, self.raw_fields):
+            parts.append(literal)
+            if name in data:
+                parts.append(str(data[name]))
+            else:
+                parts.append(raw)
+                missing.add(name)
+        parts.append(self.literals[-1])
+
+        return ''.join(parts), sorted(missing)
+
+
+class TemplateCache:
+    """Process-wide cache of compiled templates keyed on path and mtime"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, template_path):
+        """
+        Return the compiled template for a path, recompiling if the file changed
+
+        Args:
+            template_path: Absolute path to the template file
+
+        Returns:
+            CompiledTemplate instance
+        """
+        mtime = os.stat(template_path).st_mtime_ns
+        entry = self._entries.get(template_path)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+
+        with self._lock:
+            entry = self._entries.get(template_path)
+            if entry is not None and entry[0] == mtime:
+                return entry[1]
+
+            with open(template_path, 'r') as f:
+                compiled = CompiledTemplate(f.read())
+            self._entries[template_path] = (mtime, compiled)
+            return compiled
+
+    def clear(self):
+        """Drop all compiled templates"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared cache used by LegalFactory instances
+template_cache = TemplateCache()
@@ -0,0 +1,254 @@
+"""
+Transfer Tracker
+Follows Circle transfers to settlement: batched status polling with adaptive
+backoff, webhook-triggered rechecks, and bulk case status updates
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import insert, or_, update
+from app import db
+from app.models import CircleTransfer, LegalCase
+from app.agents.circle_wallet_agent import TERMINAL_TRANSFER_STATES
+
+
+# Unsettled transfers looked up per batch
+TRANSFER_POLL_BATCH_SIZE = 200
+
+# Delay before the next lookup doubles per check, from the base up to the max
+TRANSFER_POLL_BASE_DELAY = timedelta(seconds=5)
+TRANSFER_POLL_MAX_DELAY = timedelta(minutes=30)
+
+# How often the scheduler process polls for due lookups
+TRANSFER_POLL_SECONDS = 5
+
+# Case status changes when a transfer settles:
+# purpose -> outcome -> (required current status, new status)
+CASE_TRANSITIONS = {
+    'payment': {
+        'COMPLETE': ('PAYMENT_SUBMITTED', 'PENDING_REVIEW'),  # Step D
+        'FAILED': ('PAYMENT_SUBMITTED', 'PENDING_PAYMENT')
+    }
+}
+
+# Purpose -> function(outcomes) called when transfers of that purpose settle,
+# for transfers that do not map to a single case (see on_transfer_settled)
+_settle_hooks = {}
+
+
+def on_transfer_settled(purpose):
+    """
+    Register a function called with {challenge_id: 'COMPLETE' | 'FAILED'}
+    when tracked transfers of a purpose settle (in the same transaction)
+    """
+    def decorator(func):
+        _settle_hooks[purpose] = func
+        return func
+    return decorator
+
+
+def track_transfer(challenge_id, purpose, case_id=None, from_wallet_id=None, to_address=None):
+    """
+    Start tracking a submitted transfer
+
+    The row is added to the current session; the caller's commit records
+    it together with the case update that submitted the transfer. The
+    wallets are recorded so their cached balances can be dropped once the
+    transfer settles.
+
+    Returns:
+        The CircleTransfer
+    """
+    transfer = CircleTransfer.query.filter_by(challenge_id=challenge_id).first()
+    if transfer is None:
+        transfer = CircleTransfer(
+            challenge_id=challenge_id,
+            purpose=purpose,
+            case_id=case_id,
+            from_wallet_id=from_wallet_id,
+            to_address=to_address,
+            state='INITIATED',
+            next_check_at=datetime.utcnow() + TRANSFER_POLL_BASE_DELAY
+        )
+        db.session.add(transfer)
+    return transfer
+
+
+def track_transfers(transfers, purpose):
+    """
+    Start tracking many new transfers with one bulk INSERT (caller commits)
+
+    Args:
+        transfers: Iterable of dicts with challenge_id and optional
+            from_wallet_id and to_address
+        purpose: What the transfers are for (e.g. 'recurring_fee')
+    """
+    next_check_at = datetime.utcnow() + TRANSFER_POLL_BASE_DELAY
+    rows = [
+        {'challenge_id': transfer['challenge_id'], 'purpose': purpose,
+         'from_wallet_id': transfer.get('from_wallet_id'), 'to_address': transfer.get('to_address'),
+         'state': 'INITIATED', 'checks': 0, 'next_check_at': next_check_at}
+        for transfer in transfers
+    ]
+    if rows:
+        db.session.execute(insert(CircleTransfer), rows)
+
+
+def mark_for_check(challenge_ids):
+    """
+    Make unsettled transfers due for an immediate lookup (e.g. from a webhook)
+
+    Returns:
+        Number of tracked transfers marked
+    """
+    challenge_ids = [challenge_id for challenge_id in challenge_ids if challenge_id]
+    if not challenge_ids:
+        return 0
+
+    marked = CircleTransfer.query.filter(
+        CircleTransfer.challenge_id.in_(challenge_ids),
+        CircleTransfer.next_check_at.isnot(None)
+    ).update({CircleTransfer.next_check_at: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return marked
+
+
+def _next_check_delay(checks):
+    """Adaptive backoff: recent transfers are checked often, stuck ones rarely"""
+    return min(TRANSFER_POLL_MAX_DELAY, TRANSFER_POLL_BASE_DELAY * 2 ** checks)
+
+
+def _outcome(state):
+    """Collapse terminal Circle states to COMPLETE or FAILED"""
+    return 'COMPLETE' if state == 'COMPLETE' else 'FAILED'
+
+
+def refresh_transfers(wallet_agent, transfers):
+    """
+    Look up a batch of tracked transfers and record what changed
+
+    Transfer rows are written back in one bulk UPDATE, and each kind of
+    case transition in one UPDATE ... WHERE id IN (...). Cached balances
+    of the wallets a settled transfer touched are dropped.
+
+    Args:
+        wallet_agent: CircleWalletAgent used for status lookups
+        transfers: CircleTransfer rows to refresh
+
+    Returns:
+        Number of transfers that settled
+    """
+    if not transfers:
+        return 0
+
+    states = wallet_agent.get_transfer_states(transfer.challenge_id for transfer in transfers)
+    now = datetime.utcnow()
+    rows = []
+    transitions = {}
+    hook_outcomes = {}
+    settled_wallets = set()
+    settled = 0
+
+    for transfer in transfers:
+        state = states.get(transfer.challenge_id) or transfer.state
+        checks = transfer.checks + 1
+        terminal = state in TERMINAL_TRANSFER_STATES
+
+        rows.append({
+            'id': transfer.id,
+            'state': state,
+            'checks': checks,
+            'last_checked_at': now,
+            'settled_at': transfer.settled_at or (now if terminal else None),
+            'next_check_at': None if terminal else now + _next_check_delay(checks)
+        })
+
+        if terminal:
+            settled += 1
+            settled_wallets.update((transfer.from_wallet_id, transfer.to_address))
+            transition = CASE_TRANSITIONS.get(transfer.purpose, {}).get(_outcome(state))
+            if transition and transfer.case_id:
+                transitions.setdefault(transition, []).append(transfer.case_id)
+            if transfer.purpose in _settle_hooks:
+                hook_outcomes.setdefault(transfer.purpose, {})[transfer.challenge_id] = _outcome(state)
+
+    db.session.execute(update(CircleTransfer), rows)
+    for (from_status, to_status), case_ids in transitions.items():
+        LegalCase.query.filter(
+            LegalCase.id.in_(case_ids),
+            LegalCase.status == from_status
+        ).update({LegalCase.status: to_status}, synchronize_session=False)
+    for purpose, outcomes in hook_outcomes.items():
+        _settle_hooks[purpose](outcomes)
+    db.session.commit()
+
+    wallet_agent.invalidate_balances(settled_wallets)
+    return settled
+
+
+def wallets_moved_since(wallet_keys, since):
+    """
+    When tracked transfers last moved funds of the given wallets
+
+    A transfer moves funds when it is submitted and again when it settles.
+    Balance caches in other processes (web workers, while the scheduler
+    settles transfers) compare this with the time they read a balance.
+
+    Args:
+        wallet_keys: Circle wallet IDs and/or 0x addresses
+        since: Only transfers submitted or settled at or after this UTC time
+
+    Returns:
+        Dict of wallet key -> latest submit/settle time (only wallets that moved)
+    """
+    wallet_keys = {key for key in wallet_keys if key}
+    if not wallet_keys:
+        return {}
+
+    rows = db.session.query(
+        CircleTransfer.from_wallet_id, CircleTransfer.to_address,
+        CircleTransfer.created_at, CircleTransfer.settled_at
+    ).filter(
+        or_(CircleTransfer.from_wallet_id.in_(list(wallet_keys)), CircleTransfer.to_address.in_(list(wallet_keys))),
+        or_(CircleTransfer.created_at >= since, CircleTransfer.settled_at >= since)
+    ).all()
+
+    moved = {}
+    for from_wallet_id, to_address, created_at, settled_at in rows:
+        moved_at = max(t for t in (created_at, settled_at) if t is not None)
+        for key in (from_wallet_id, to_address):
+            if key in wallet_keys and (key not in moved or moved[key] < moved_at):
+                moved[key] = moved_at
+    return moved
+
+
+def poll_transfers(wallet_agent, batch_size=TRANSFER_POLL_BATCH_SIZE, should_continue=None):
+    """
+    Refresh every tracked transfer whose next check is due
+
+    Args:
+        wallet_agent: CircleWalletAgent used for status lookups
+        batch_size: Transfers looked up per batch
+        should_continue: Optional callable checked before each batch (e.g. lease renewal)
+
+    Returns:
+        Dict with checked and settled counts
+    """
+    report = {'checked': 0, 'settled': 0}
+
+    while True:
+        if should_continue is not None and not should_continue():
+            break
+
+        batch = CircleTransfer.query.filter(
+            CircleTransfer.next_check_at <= datetime.utcnow()
+        ).order_by(CircleTransfer.next_check_at).limit(batch_size).all()
+        if not batch:
+            break
+
+        report['settled'] += refresh_transfers(wallet_agent, batch)
+        report['checked'] += len(batch)
+        db.session.expunge_all()
+
+    if report['checked']:
+        print(f"🔄 Checked {report['checked']} transfers, {report['settled']} settled")
+    return report
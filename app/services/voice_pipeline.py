@@ -0,0 +1,260 @@
+"""
+Voice Pipeline
+Voice orders and reviews as background jobs: the upload is spooled to disk
+under a size cap, then transcribed and turned into a case or review decision
+by worker.py instead of inside the web request
+"""
+
+import json
+import os
+import tempfile
+from flask import current_app
+from app import db
+from app.models import LegalCase, User
+from app.agents.registry import get_registry
+from app.services.case_pipeline import enqueue_approval
+from app.services.job_queue import job_handler, enqueue, PermanentJobError
+from app.services.wallet_pool import client_wallet_for, request_refill
+
+
+# Spool directory when config VOICE_UPLOAD_DIR is unset
+DEFAULT_VOICE_UPLOAD_DIR = os.path.join(tempfile.gettempdir(), 'agent_ledger_voice')
+
+# Bytes copied per read while spooling an upload
+VOICE_UPLOAD_CHUNK_BYTES = 64 * 1024
+
+# Transcription is retried a few times (ElevenLabs timeouts), then the job fails
+VOICE_JOB_MAX_ATTEMPTS = 3
+
+# Jobs reported by /legal/voice/jobs/<id> (review_batch is in review_batch.py)
+VOICE_JOB_KINDS = ('voice_order', 'voice_review', 'review_batch')
+
+
+class UploadTooLarge(ValueError):
+    """Raised when an upload exceeds VOICE_MAX_UPLOAD_BYTES"""
+
+
+def voice_upload_dir():
+    """Spool directory from config VOICE_UPLOAD_DIR (shared with worker.py)"""
+    return current_app.config.get('VOICE_UPLOAD_DIR') or DEFAULT_VOICE_UPLOAD_DIR
+
+
+def spool_upload(audio_file, max_bytes=None):
+    """
+    Copy an uploaded audio file to VOICE_UPLOAD_DIR chunk by chunk
+
+    Args:
+        audio_file: Werkzeug FileStorage from request.files
+        max_bytes: Size cap (default config VOICE_MAX_UPLOAD_BYTES); larger
+            uploads are rejected part-way through
+
+    Returns:
+        Path of the spooled file
+
+    Raises:
+        UploadTooLarge: The upload exceeds max_bytes
+        ValueError: The upload is empty
+    """
+    if max_bytes is None:
+        max_bytes = current_app.config['VOICE_MAX_UPLOAD_BYTES']
+    upload_dir = voice_upload_dir()
+    os.makedirs(upload_dir, exist_ok=True)
+    extension = os.path.splitext(audio_file.filename or '')[1]
+    suffix = extension if extension[1:].isalnum() and len(extension) <= 10 else ''
+    fd, path = tempfile.mkstemp(prefix='voice_', suffix=suffix, dir=upload_dir)
+
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as spooled:
+            while True:
+                chunk = audio_file.stream.read(VOICE_UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Audio file exceeds {max_bytes // (1024 * 1024)} MB limit")
+                spooled.write(chunk)
+        if size == 0:
+            raise ValueError("Audio file is empty")
+    except BaseException:
+        discard_upload(path)
+        raise
+
+    return path
+
+
+def discard_upload(path):
+    """Delete a spooled upload, ignoring one that is already gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def enqueue_voice(kind, path, user_id, use_cache=True):
+    """
+    Queue transcription and intent extraction of a spooled upload
+
+    Args:
+        kind: 'voice_order' or 'voice_review'
+        path: Spooled file from spool_upload (deleted once the job finishes)
+        user_id: User who submitted the recording
+        use_cache: Set False to bypass the intent cache
+
+    Returns:
+        The Job
+    """
+    return enqueue(
+        kind,
+        payload={'path': path, 'user_id': user_id, 'use_cache': use_cache},
+        max_attempts=VOICE_JOB_MAX_ATTEMPTS
+    )
+
+
+def _set_stage(job, stage):
+    """Record a voice job stage and commit so pollers see it"""
+    job.stage = stage
+    db.session.commit()
+
+
+def _transcribe(job, intent_agent, path):
+    """Transcribe the spooled upload of a job"""
+    if not os.path.exists(path):
+        raise PermanentJobError("Audio upload not found (is VOICE_UPLOAD_DIR shared with worker.py?)")
+
+    _set_stage(job, 'TRANSCRIBING')
+    transcript = intent_agent.transcribe_file(path)
+    if not transcript:
+        # transcribe_audio swallows API errors, so this may be transient
+        raise RuntimeError("Transcription failed")
+    return transcript
+
+
+def _run_voice_job(job, path, work):
+    """
+    Run a voice job body, deleting the upload once the job will not run again
+
+    Retryable failures keep the file so the next attempt can transcribe it.
+    """
+    try:
+        result = work()
+    except Exception as e:
+        if isinstance(e, PermanentJobError) or job.attempts >= job.max_attempts:
+            discard_upload(path)
+        raise
+
+    job.result = json.dumps(result)
+    job.stage = 'DONE'
+    discard_upload(path)
+
+
+@job_handler('voice_order')
+def voice_order(job, path, user_id, use_cache=True):
+    """
+    Step A/B (voice): Transcribe an order and create its case
+
+    The case and the job's case_id are committed together, so a retry
+    after a crash does not create a second case.
+    """
+    if job.case_id:
+        discard_upload(path)
+        return
+
+    def work():
+        registry = get_registry()
+        intent_agent = registry.get('intent')
+        factory = registry.get('factory')
+
+        transcript = _transcribe(job, intent_agent, path)
+
+        _set_stage(job, 'EXTRACTING')
+        order = intent_agent.get_intent_from_text_order(transcript, use_cache=use_cache)
+        if order is None:
+            raise PermanentJobError("Could not understand audio")
+        form_data = order.model_dump(exclude_none=True)
+
+        service_id = form_data.get('service_id')
+        service = factory.get_service(service_id)
+        if not service:
+            raise PermanentJobError("Invalid service in voice command")
+
+        try:
+            factory.validate_fields(service_id, form_data)
+        except ValueError as e:
+            raise PermanentJobError(str(e))
+
+        # Claimed from the wallet pool (and committed with any refill request);
+        # a retry finds the wallet already on the user
+        client_wallet_id = client_wallet_for(db.session.get(User, user_id))
+        request_refill()
+
+        new_case = LegalCase(
+            user_id=user_id,
+            service_id=service_id,
+            status='PENDING_PAYMENT',
+            form_data=form_data,
+            client_wallet_id=client_wallet_id,
+            total_price_usdc=service['price_usdc'],
+            recurring_fee_usdc=service['recurring_fee_usdc']
+        )
+        db.session.add(new_case)
+        db.session.flush()
+        job.case_id = new_case.id
+
+        return {
+            'transcript': transcript,
+            'case_id': new_case.id,
+            'message': f"Voice order processed! Case {new_case.id} created."
+        }
+
+    _run_voice_job(job, path, work)
+
+
+@job_handler('voice_review')
+def voice_review(job, path, user_id, use_cache=True):
+    """
+    Step D/E/F (voice): Transcribe a lawyer's review and apply it
+
+    Approvals queue the document pipeline as a job of its own; rejections
+    are recorded on the case directly.
+    """
+    def work():
+        intent_agent = get_registry().get('intent')
+        transcript = _transcribe(job, intent_agent, path)
+
+        _set_stage(job, 'EXTRACTING')
+        review = intent_agent.get_intent_from_text_review(transcript, use_cache=use_cache)
+        if review is None:
+            raise PermanentJobError("Could not understand audio")
+
+        case = db.session.get(LegalCase, review.case_id)
+        if case is None:
+            raise PermanentJobError(f"Case {review.case_id} not found")
+
+        result = {'transcript': transcript, 'case_id': case.id, 'action': review.action}
+        if review.action == 'approve':
+            approval = enqueue_approval(case, review.memo or '')
+            result.update(approval_job_id=approval.id,
+                          message="Case approved via voice, document is being generated.")
+        elif review.action == 'reject':
+            case.status = 'REJECTED'
+            case.lawyer_memo = review.memo or 'Rejected by lawyer'
+            result['message'] = "Case rejected."
+        else:
+            raise PermanentJobError("Unknown action")
+        return result
+
+    _run_voice_job(job, path, work)
+
+
+def voice_job_status(job):
+    """JSON-serializable progress of a voice job (for polling and server-sent events)"""
+    return {
+        'job_id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'stage': job.stage,
+        'attempts': job.attempts,
+        'error': job.last_error if job.status in ('FAILED', 'PENDING') else None,
+        'result': json.loads(job.result) if job.result else None
+    }
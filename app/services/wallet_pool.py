@@ -0,0 +1,274 @@
+"""
+Wallet Pool
+Client wallets pre-created in bulk under one WalletSet and kept above a low
+watermark, so orders claim a ready wallet instead of waiting on Circle
+"""
+
+import os
+from datetime import datetime
+from sqlalchemy import insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models import Job, LegalCase, PooledWallet, User
+from app.agents.registry import get_registry
+from app.services.job_queue import job_handler, enqueue
+
+
+# A refill is queued when fewer READY wallets than this remain
+WALLET_POOL_LOW_WATERMARK = int(os.environ.get('WALLET_POOL_LOW_WATERMARK', '20'))
+
+# READY wallets after a refill
+WALLET_POOL_TARGET = int(os.environ.get('WALLET_POOL_TARGET', '100'))
+
+# READY rows tried per claim before giving up on a contended pool
+_CLAIM_CANDIDATES = 10
+
+# The one refill job row, re-armed for each refill so concurrent orders never queue several
+REFILL_JOB_KEY = 'refill_wallet_pool'
+
+
+class WalletPoolShortfall(Exception):
+    """Raised when Circle created fewer wallets than a refill needed (the job is retried)"""
+
+
+def ready_count():
+    """Number of unclaimed wallets in the pool"""
+    return PooledWallet.query.filter_by(status='READY').count()
+
+
+def _known_wallet_set_id():
+    """WalletSet of the most recently pooled wallet, if any"""
+    row = db.session.query(PooledWallet.wallet_set_id)\
+        .filter(PooledWallet.wallet_set_id.isnot(None))\
+        .order_by(PooledWallet.id.desc()).first()
+    return row[0] if row else None
+
+
+def _insert_wallets(wallet_agent, count, user_ids=None):
+    """
+    Create wallets in batched Circle calls and insert them into the pool (caller commits)
+
+    Args:
+        wallet_agent: CircleWalletAgent
+        count: Wallets to create
+        user_ids: If given, the wallets are inserted CLAIMED by these users
+
+    Returns:
+        List of created wallet dicts
+    """
+    if count <= 0:
+        return []
+
+    wallet_set_id = wallet_agent.get_wallet_set_id(_known_wallet_set_id())
+    wallets = wallet_agent.create_wallets(count, wallet_set_id=wallet_set_id)
+    now = datetime.utcnow()
+
+    rows = []
+    for index, wallet in enumerate(wallets):
+        user_id = user_ids[index] if user_ids else None
+        rows.append({
+            'wallet_id': wallet['id'],
+            'address': wallet['address'],
+            'wallet_set_id': wallet['wallet_set_id'],
+            'blockchain': wallet['blockchain'],
+            'status': 'CLAIMED' if user_id else 'READY',
+            'user_id': user_id,
+            'claimed_at': now if user_id else None,
+            'created_at': now
+        })
+    if rows:
+        db.session.execute(insert(PooledWallet), rows)
+    return wallets
+
+
+def replenish(wallet_agent, target=WALLET_POOL_TARGET, low_watermark=WALLET_POOL_LOW_WATERMARK, force=False):
+    """
+    Top the pool up to target once it drops below the low watermark (commits)
+
+    Args:
+        wallet_agent: CircleWalletAgent
+        target: READY wallets after the refill
+        low_watermark: Refill only below this many READY wallets
+        force: Refill to target regardless of the watermark
+
+    Returns:
+        Number of wallets created
+
+    Raises:
+        WalletPoolShortfall: Circle created fewer wallets than needed; the
+            ones it did create are pooled (and committed) first
+    """
+    ready = ready_count()
+    if ready >= low_watermark and not force:
+        return 0
+
+    wanted = target - ready
+    wallets = _insert_wallets(wallet_agent, wanted)
+    db.session.commit()
+    if wallets:
+        print(f"👛 Wallet pool refilled: {ready} -> {ready + len(wallets)} ready")
+    if len(wallets) < max(wanted, 0):
+        raise WalletPoolShortfall(f"Circle created {len(wallets)} of {wanted} wallets")
+    return len(wallets)
+
+
+def claim_wallet(user_id):
+    """
+    Atomically claim a READY wallet for a user (caller commits)
+
+    Uses the same conditional UPDATE as the job queue, so two requests
+    never claim the same wallet, on both SQLite and Postgres.
+
+    Returns:
+        The PooledWallet, or None if the pool is empty
+    """
+    candidates = db.session.query(PooledWallet.id).filter_by(status='READY')\
+        .order_by(PooledWallet.id).limit(_CLAIM_CANDIDATES).all()
+
+    for (pool_id,) in candidates:
+        claimed = PooledWallet.query.filter(
+            PooledWallet.id == pool_id, PooledWallet.status == 'READY'
+        ).update({
+            PooledWallet.status: 'CLAIMED',
+            PooledWallet.user_id: user_id,
+            PooledWallet.claimed_at: datetime.utcnow()
+        }, synchronize_session=False)
+        if claimed == 1:
+            return db.session.get(PooledWallet, pool_id)
+
+    return None
+
+
+def client_wallet_for(user):
+    """
+    The user's client wallet, claimed from the pool on first use (caller commits)
+
+    If a concurrent order assigned the user a wallet first, the one claimed
+    here goes back to the pool and the user's wallet is returned.
+
+    Returns:
+        Circle wallet ID, or None while the pool is empty (the case is
+        given a wallet by the next refill, see assign_waiting_cases)
+    """
+    if user.wallet_id:
+        return user.wallet_id
+
+    wallet = claim_wallet(user.id)
+    if wallet is None:
+        return None
+
+    # Conditional like the claim: a concurrent first order may have given the user a wallet
+    assigned = User.query.filter(User.id == user.id, User.wallet_id.is_(None))\
+        .update({User.wallet_id: wallet.wallet_id}, synchronize_session=False)
+    if assigned != 1:
+        _release_wallet(wallet)
+        db.session.refresh(user, ['wallet_id'])
+        return user.wallet_id
+
+    set_committed_value(user, 'wallet_id', wallet.wallet_id)
+    return user.wallet_id
+
+
+def _release_wallet(wallet):
+    """Return a claimed wallet to the pool (caller commits)"""
+    PooledWallet.query.filter(PooledWallet.id == wallet.id).update({
+        PooledWallet.status: 'READY',
+        PooledWallet.user_id: None,
+        PooledWallet.claimed_at: None
+    }, synchronize_session=False)
+
+
+def request_refill():
+    """
+    Queue a pool refill if the pool is low and none is queued (commits)
+
+    All refills share one job row (REFILL_JOB_KEY). A finished refill is
+    re-armed with a conditional UPDATE, and the first refill is inserted
+    under the unique key, so concurrent orders queue at most one.
+
+    Returns:
+        The pending refill Job, or None if the pool is above the watermark
+    """
+    if ready_count() >= WALLET_POOL_LOW_WATERMARK:
+        return None
+
+    Job.query.filter(Job.idempotency_key == REFILL_JOB_KEY, Job.status == 'DONE').update({
+        Job.status: 'PENDING',
+        Job.attempts: 0,
+        Job.run_after: datetime.utcnow(),
+        Job.last_error: None
+    }, synchronize_session=False)
+    return enqueue('refill_wallet_pool', idempotency_key=REFILL_JOB_KEY)
+
+
+def assign_waiting_cases():
+    """
+    Give wallets to unpaid cases created while the pool was empty (caller commits)
+
+    Returns:
+        Number of cases assigned a wallet
+    """
+    waiting = LegalCase.query.filter(
+        LegalCase.client_wallet_id.is_(None), LegalCase.status == 'PENDING_PAYMENT'
+    ).all()
+
+    users = {}
+    assigned = 0
+    for case in waiting:
+        user = users.get(case.user_id) or db.session.get(User, case.user_id)
+        users[case.user_id] = user
+        wallet_id = client_wallet_for(user)
+        if wallet_id is None:
+            break
+        case.client_wallet_id = wallet_id
+        assigned += 1
+    return assigned
+
+
+def provision_users(wallet_agent, users):
+    """
+    Give many users their own wallet with batched create_wallets calls (commits)
+
+    Used to onboard a large client: the pool is left for individual orders
+    and the wallets are created directly, WALLET_CREATE_BATCH_SIZE per call.
+
+    Args:
+        wallet_agent: CircleWalletAgent
+        users: Users to provision; users that already have a wallet are skipped
+
+    Returns:
+        Number of users given a wallet
+    """
+    user_ids = [user.id for user in users if not user.wallet_id]
+    wallets = _insert_wallets(wallet_agent, len(user_ids), user_ids=user_ids)
+    if wallets:
+        db.session.execute(
+            update(User),
+            [{'id': user_id, 'wallet_id': wallet['id']} for user_id, wallet in zip(user_ids, wallets)]
+        )
+    db.session.commit()
+    return len(wallets)
+
+
+@job_handler('refill_wallet_pool')
+def refill_wallet_pool(job):
+    """
+    Refill the pool, then hand wallets to cases that were waiting for one
+
+    After a partial refill the wallets that were created are still handed
+    out before the job fails and is retried.
+    """
+    try:
+        replenish(get_registry().get('wallet'))
+    except WalletPoolShortfall:
+        _assign_waiting_cases()
+        raise
+    _assign_waiting_cases()
+
+
+def _assign_waiting_cases():
+    """assign_waiting_cases, committed"""
+    assigned = assign_waiting_cases()
+    db.session.commit()
+    if assigned:
+        print(f"👛 Assigned wallets to {assigned} waiting cases")
@@ -3,45 +3,57 @@ Legal Views Blueprint
 Implements the full A-to-Z legal service workflow (Steps A-J)
 """
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app, \
+    abort, Response, stream_with_context
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import LegalCase
-from app.agents.circle_wallet_agent import CircleWalletAgent
-from app.agents.ai_intent_agent import AiIntentAgent
-from app.agents.document_agent import DocumentAgent
-from app.agents.scheduling_agent import SchedulingAgent
-from app.services.legal_factory import LegalFactory
+from app.models import Job, LegalCase, CaseSearchTerm, CircleTransfer, SEARCHABLE_FORM_FIELDS, normalize_search_value
+from app.agents.circle_wallet_agent import transfer_idempotency_key
+from app.agents.registry import get_registry
+from app.agents.intent_cache import get_intent_cache
+from app.services.case_pipeline import enqueue_approval
+from app.services.job_queue import run_inline
+from app.services.transfer_tracker import track_transfer, mark_for_check, refresh_transfers
+from app.services.voice_pipeline import (
+    VOICE_JOB_KINDS, UploadTooLarge, spool_upload, discard_upload, enqueue_voice, voice_job_status
+)
+from app.services.review_batch import REVIEW_BATCH_MAX_ITEMS, enqueue_review_batch
+from app.services.escrow_settlement import record_release, settle_releases, reconcile, pending_summary
+from app.services.ledger import ledger_summary
+from app.services.service_catalog import field_description, get_catalog
+from app.services.wallet_pool import (
+    WALLET_POOL_LOW_WATERMARK, WALLET_POOL_TARGET, client_wallet_for, request_refill, ready_count
+)
 import json
 import os
+import time
 from datetime import datetime
 
 legal_blueprint = Blueprint('legal', __name__)
 
-# Initialize agents (singleton pattern for the demo)
-wallet_agent = None
-intent_agent = None
-doc_agent = None
-schedule_agent = None
-factory = None
+# Rows per page on the /legal/cases listing
+CASES_PAGE_SIZE = 50
+
+# Voice job event streams: seconds between checks, and before the stream closes
+VOICE_EVENTS_POLL_SECONDS = 0.5
+VOICE_EVENTS_TIMEOUT = 30
+
+
+def get_agent(name):
+    """Get one agent from the app's registry, initializing it on first use"""
+    return get_registry().get(name)
 
 
 def get_agents():
-    """Lazy initialization of agents"""
-    global wallet_agent, intent_agent, doc_agent, schedule_agent, factory
+    """Initialize and return every agent (views should prefer get_agent)"""
+    return tuple(get_agent(name) for name in ('wallet', 'intent', 'document', 'scheduler', 'factory'))
 
-    if wallet_agent is None:
-        wallet_agent = CircleWalletAgent()
-    if intent_agent is None:
-        intent_agent = AiIntentAgent()
-    if doc_agent is None:
-        doc_agent = DocumentAgent()
-    if schedule_agent is None:
-        schedule_agent = SchedulingAgent(wallet_agent=wallet_agent)
-    if factory is None:
-        factory = LegalFactory()
 
-    return wallet_agent, intent_agent, doc_agent, schedule_agent, factory
+def _use_intent_cache():
+    """False when the request opts out of cached intent extraction (no_cache=1)"""
+    return request.values.get('no_cache') not in ('1', 'true', 'yes')
 
 
 # ============================================================================
@@ -53,11 +65,18 @@ def get_agents():
 def order_form():
     """
     Step A/B: Show the order form
-    Displays available legal services
+    Services are grouped by category and each form field is shown for the
+    services that require it, all taken from the service catalog
     """
-    _, _, _, _, factory = get_agents()
-    services = list(factory.get_all_services())
-    return render_template('legal/order_form.html', services=services)
+    catalog = get_catalog()
+    return render_template(
+        'legal/order_form.html',
+        categories=catalog.by_category,
+        form_fields=[
+            {'name': field, 'description': field_description(field), 'services': service_ids}
+            for field, service_ids in catalog.fields.items()
+        ]
+    )
 
 
 @legal_blueprint.route('/order', methods=['POST'])
@@ -67,7 +86,7 @@ def submit_order_form():
     Step A/B: Handle form submission
     Creates a new legal case
     """
-    _, _, _, _, factory = get_agents()
+    factory = get_agent('factory')
 
     data = request.form.to_dict()
     service_id = data.get('service_id')
@@ -85,14 +104,14 @@ def submit_order_form():
         return redirect(url_for('legal.order_form'))
 
     # Step C: Create case and prepare for payment
-    # For demo, simulate client wallet creation
-    client_wallet_id = f"client_wallet_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    # The client wallet is claimed from the pre-created pool, never created here
+    client_wallet_id = client_wallet_for(current_user)
 
     new_case = LegalCase(
         user_id=current_user.id,
         service_id=service_id,
         status='PENDING_PAYMENT',
-        form_data=json.dumps(data),
+        form_data=data,
         client_wallet_id=client_wallet_id,
         total_price_usdc=service['price_usdc'],
         recurring_fee_usdc=service['recurring_fee_usdc']
@@ -100,62 +119,34 @@ def submit_order_form():
 
     db.session.add(new_case)
     db.session.commit()
+    _top_up_wallet_pool(new_case)
 
     flash(f"Order created! Case ID: {new_case.id}. Proceeding to payment...", "success")
     return redirect(url_for('legal.handle_payment', case_id=new_case.id))
 
 
+def _top_up_wallet_pool(case):
+    """
+    Queue a wallet pool refill if the pool is running low
+
+    Without a job worker (RUN_JOBS_INLINE) the refill runs now, but only
+    when the pool was empty and the case is still waiting for a wallet.
+    """
+    refill = request_refill()
+    if refill is not None and not case.client_wallet_id and current_app.config.get('RUN_JOBS_INLINE'):
+        run_inline(refill)
+        db.session.refresh(case)
+
+
 @legal_blueprint.route('/order/voice', methods=['POST'])
 @login_required
 def submit_order_voice():
     """
     Step A/B (Alternative): Handle "Vibe Coder" voice submission
-    Uses ElevenLabs + Gemini to extract intent from audio
+    The recording is spooled to disk and a background job transcribes it
+    (ElevenLabs), extracts the order (Gemini) and creates the case
     """
-    wallet_agent, intent_agent, _, _, factory = get_agents()
-
-    audio_file = request.files.get('audio')
-    if not audio_file:
-        return jsonify({"error": "No audio file provided"}), 400
-
-    # Extract intent from voice
-    form_data = intent_agent.get_intent_from_voice_order(audio_file.read())
-    if not form_data:
-        return jsonify({"error": "Could not understand audio"}), 400
-
-    service_id = form_data.get('service_id')
-    service = factory.get_service(service_id)
-
-    if not service:
-        return jsonify({"error": "Invalid service in voice command"}), 400
-
-    try:
-        factory.validate_fields(service_id, form_data)
-    except ValueError as e:
-        return jsonify({"error": str(e)}), 400
-
-    # Create case
-    client_wallet_id = f"client_wallet_{current_user.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-
-    new_case = LegalCase(
-        user_id=current_user.id,
-        service_id=service_id,
-        status='PENDING_PAYMENT',
-        form_data=json.dumps(form_data),
-        client_wallet_id=client_wallet_id,
-        total_price_usdc=service['price_usdc'],
-        recurring_fee_usdc=service['recurring_fee_usdc']
-    )
-
-    db.session.add(new_case)
-    db.session.commit()
-
-    return jsonify({
-        "success": True,
-        "case_id": new_case.id,
-        "message": f"Voice order processed! Case {new_case.id} created.",
-        "redirect_url": url_for('legal.handle_payment', case_id=new_case.id)
-    })
+    return _submit_voice_job('voice_order')
 
 
 # ============================================================================
@@ -169,7 +160,7 @@ def handle_payment(case_id):
     Step C: Simulate payment and move funds to escrow
     In production, this would integrate with Circle Paymaster
     """
-    wallet_agent, _, _, _, _ = get_agents()
+    wallet_agent = get_agent('wallet')
     case = LegalCase.query.get_or_404(case_id)
 
     # Security check
@@ -177,27 +168,49 @@ def handle_payment(case_id):
         flash("Unauthorized access", "danger")
         return redirect(url_for('main.index'))
 
+    escrow_wallet_id = os.environ.get("LAW_FIRM_ESCROW_WALLET_ID", "escrow_wallet_demo")
+
     if request.method == 'GET':
-        # Show payment page
-        return render_template('legal/payment.html', case=case)
+        # Show payment page (balance served from the balance cache)
+        balance = wallet_agent.get_wallet_balance(case.client_wallet_id) if case.client_wallet_id else None
+        return render_template('legal/payment.html', case=case, balance=balance)
 
     # POST: Process payment
     # Simulate: Transfer from client wallet to escrow wallet
-    escrow_wallet_id = os.environ.get("LAW_FIRM_ESCROW_WALLET_ID", "escrow_wallet_demo")
+    if not case.client_wallet_id:
+        flash("Your client wallet is still being set up. Please try again in a moment.", "warning")
+        return redirect(url_for('legal.handle_payment', case_id=case.id))
 
     challenge_id = wallet_agent.initiate_gasless_transfer(
         from_wallet_id=case.client_wallet_id,
         to_address=escrow_wallet_id,
-        amount_usdc=case.total_price_usdc
+        amount_usdc=case.total_price_usdc,
+        # A new key per failed attempt, so a retried payment is not deduplicated into the failure
+        idempotency_key=transfer_idempotency_key('payment', case.id, CircleTransfer.query.filter(
+            CircleTransfer.case_id == case.id,
+            CircleTransfer.purpose == 'payment',
+            CircleTransfer.state.in_(['FAILED', 'CANCELLED', 'DENIED'])
+        ).count())
     )
 
     if challenge_id:
-        case.status = 'PENDING_REVIEW'  # Step D
+        # Moves to PENDING_REVIEW (Step D) once the transfer tracker sees it settle
+        case.status = 'PAYMENT_SUBMITTED'
         case.payment_challenge_id = challenge_id
+        track_transfer(challenge_id, 'payment', case.id,
+                       from_wallet_id=case.client_wallet_id, to_address=escrow_wallet_id)
         db.session.commit()
 
-        flash(f"Payment successful! Case {case.id} is pending lawyer review.", "success")
-        return redirect(url_for('legal.lawyer_review_page', case_id=case.id))
+        if current_app.config.get('RUN_JOBS_INLINE'):
+            refresh_transfers(wallet_agent, CircleTransfer.query.filter_by(challenge_id=challenge_id).all())
+            db.session.refresh(case)
+
+        if case.status == 'PENDING_REVIEW':
+            flash(f"Payment successful! Case {case.id} is pending lawyer review.", "success")
+            return redirect(url_for('legal.lawyer_review_page', case_id=case.id))
+
+        flash(f"Payment submitted! Case {case.id} moves to lawyer review once the transfer settles.", "success")
+        return redirect(url_for('legal.case_detail', case_id=case.id))
     else:
         flash("Payment transfer failed. Please try again.", "danger")
         return redirect(url_for('legal.handle_payment', case_id=case.id))
@@ -215,7 +228,7 @@ def lawyer_review_page(case_id):
     Lawyer can approve/reject with voice or form
     """
     case = LegalCase.query.get_or_404(case_id)
-    form_data = json.loads(case.form_data)
+    form_data = case.form_data or {}
 
     # In production, add role check: if not current_user.is_lawyer
     return render_template('legal/lawyer_review.html', case=case, form_data=form_data)
@@ -226,94 +239,208 @@ def lawyer_review_page(case_id):
 def lawyer_approve_case(case_id):
     """
     Step E/F: Lawyer approves case (form-based approval)
-    Generates document and uploads to client locker
+    Queues document generation and upload; the job worker runs the pipeline
     """
-    _, _, doc_agent, _, factory = get_agents()
     case = LegalCase.query.get_or_404(case_id)
 
     # Get lawyer's memo
     lawyer_memo = request.form.get('memo', '')
 
-    # Step E: Generate the document
-    form_data = json.loads(case.form_data)
-    form_data['case_id'] = case.id  # Add case_id for template
-
-    try:
-        doc_content, doc_filename = factory.generate_document(case.service_id, form_data)
-    except Exception as e:
-        flash(f"Error generating document: {e}", "danger")
-        return redirect(url_for('legal.lawyer_review_page', case_id=case.id))
-
-    # Step F: Upload to client locker
-    doc_url = doc_agent.upload_document(doc_content, doc_filename, case.id)
-
-    if doc_url:
-        case.status = 'PENDING_APPROVAL'  # Step G
-        case.document_url = doc_url
-        case.generated_document_path = doc_url
-        case.lawyer_memo = lawyer_memo
-        case.reviewed_at = datetime.utcnow()
-        db.session.commit()
+    job = enqueue_approval(case, lawyer_memo)
+    if current_app.config.get('RUN_JOBS_INLINE'):
+        run_inline(job)
+        db.session.refresh(case)
 
+    if case.pipeline_stage == 'DONE':
         flash(f"Case {case.id} approved! Document uploaded. Client notified.", "success")
         return redirect(url_for('legal.client_approval_page', case_id=case.id))
-    else:
-        flash("Document upload failed.", "danger")
+    elif case.pipeline_stage == 'FAILED':
+        flash(f"Document pipeline failed: {case.pipeline_error}", "danger")
         return redirect(url_for('legal.lawyer_review_page', case_id=case.id))
 
+    flash(f"Case {case.id} approved! The document is being generated and uploaded.", "success")
+    return redirect(url_for('legal.case_detail', case_id=case.id))
+
 
 @legal_blueprint.route('/review/voice', methods=['POST'])
 @login_required
 def lawyer_submit_review_voice():
     """
     Step D/E/F (Alternative): Handle lawyer's voice approval
-    Uses AI to extract "approve/reject" intent
+    A background job transcribes the recording and applies the extracted
+    "approve/reject" intent, so long dictated memos do not hold a worker
+    """
+    return _submit_voice_job('voice_review')
+
+
+@legal_blueprint.route('/review/batch', methods=['POST'])
+@login_required
+def lawyer_submit_review_batch():
     """
-    _, intent_agent, doc_agent, _, factory = get_agents()
+    Step D/E/F (Batch): Clear a review queue in one request
+    Accepts any mix of 'audio' clips and 'text' directives (form fields, or
+    a JSON body {"directives": [...]}); one background job transcribes and
+    extracts them concurrently, renders approvals per service and uploads
+    every document in one wave
+    """
+    if request.is_json:
+        texts = (request.get_json(silent=True) or {}).get('directives') or []
+    else:
+        texts = request.form.getlist('text')
+    texts = [str(text).strip() for text in texts if str(text).strip()]
+    audio_files = [audio_file for audio_file in request.files.getlist('audio') if audio_file]
+
+    if not texts and not audio_files:
+        return jsonify({"error": "No audio files or text directives provided"}), 400
+    if len(texts) + len(audio_files) > REVIEW_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {REVIEW_BATCH_MAX_ITEMS} reviews per batch"}), 400
+
+    # Each clip is capped as usual, and all of them together at REVIEW_BATCH_MAX_BYTES
+    clip_bytes = current_app.config['VOICE_MAX_UPLOAD_BYTES']
+    batch_bytes = current_app.config['REVIEW_BATCH_MAX_BYTES']
+    items = [{'text': text} for text in texts]
+    spooled_bytes = 0
+    try:
+        for audio_file in audio_files:
+            remaining = batch_bytes - spooled_bytes
+            try:
+                path = spool_upload(audio_file, max_bytes=min(clip_bytes, remaining))
+            except UploadTooLarge:
+                if remaining < clip_bytes:
+                    raise UploadTooLarge(f"Batch audio exceeds {batch_bytes // (1024 * 1024)} MB limit")
+                raise
+            items.append({'path': path})
+            spooled_bytes += os.path.getsize(path)
+    except ValueError as e:
+        for item in items:
+            if 'path' in item:
+                discard_upload(item['path'])
+        return jsonify({"error": str(e)}), 413 if isinstance(e, UploadTooLarge) else 400
 
+    job = enqueue_review_batch(items, current_user.id, use_cache=_use_intent_cache())
+    if current_app.config.get('RUN_JOBS_INLINE'):
+        run_inline(job)
+        db.session.refresh(job)
+
+    return _voice_job_response(job)
+
+
+def _submit_voice_job(kind):
+    """Spool the uploaded recording and queue its voice job"""
     audio_file = request.files.get('audio')
     if not audio_file:
         return jsonify({"error": "No audio file provided"}), 400
 
-    review_data = intent_agent.get_intent_from_voice_review(audio_file.read())
-    if not review_data:
-        return jsonify({"error": "Could not understand audio"}), 400
-
-    case_id = review_data.get('case_id')
-    case = LegalCase.query.get_or_404(case_id)
+    try:
+        path = spool_upload(audio_file)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    if review_data.get('action') == 'approve':
-        # Generate document
-        form_data = json.loads(case.form_data)
-        form_data['case_id'] = case.id
-
-        doc_content, doc_filename = factory.generate_document(case.service_id, form_data)
-        doc_url = doc_agent.upload_document(doc_content, doc_filename, case.id)
-
-        if doc_url:
-            case.status = 'PENDING_APPROVAL'
-            case.document_url = doc_url
-            case.generated_document_path = doc_url
-            case.lawyer_memo = review_data.get('memo', '')
-            case.reviewed_at = datetime.utcnow()
-            db.session.commit()
-
-            return jsonify({
-                "success": True,
-                "message": "Case approved via voice, document uploaded.",
-                "redirect_url": url_for('legal.client_approval_page', case_id=case.id)
-            })
+    job = enqueue_voice(kind, path, current_user.id, use_cache=_use_intent_cache())
+    if current_app.config.get('RUN_JOBS_INLINE'):
+        run_inline(job)
+        db.session.refresh(job)
+        if kind == 'voice_order' and job.case_id:
+            _top_up_wallet_pool(db.session.get(LegalCase, job.case_id))
+        approval_job_id = (voice_job_status(job)['result'] or {}).get('approval_job_id')
+        if approval_job_id:
+            run_inline(db.session.get(Job, approval_job_id))
+
+    return _voice_job_response(job)
+
+
+def _voice_job_body(job):
+    """Voice job progress with the URLs a client follows next"""
+    body = voice_job_status(job)
+    body['status_url'] = url_for('legal.voice_job_status_view', job_id=job.id)
+    body['events_url'] = url_for('legal.voice_job_events', job_id=job.id)
+
+    result = body['result'] or {}
+    if job.status != 'DONE':
+        return body
+
+    body['success'] = True
+    body['message'] = result.get('message')
+    if job.kind == 'review_batch':
+        body['reviews'] = result.get('reviews', [])
+        return body
+
+    body['case_id'] = result.get('case_id')
+    if job.kind == 'voice_order':
+        body['redirect_url'] = url_for('legal.handle_payment', case_id=result['case_id'])
+    elif result.get('action') == 'approve':
+        case = db.session.get(LegalCase, result['case_id'])
+        if case.pipeline_stage == 'DONE':
+            body['message'] = "Case approved via voice, document uploaded."
+            body['redirect_url'] = url_for('legal.client_approval_page', case_id=case.id)
         else:
-            return jsonify({"error": "Document upload failed"}), 500
+            body['pipeline_stage'] = case.pipeline_stage
+            body['pipeline_status_url'] = url_for('legal.case_pipeline_status', case_id=case.id)
+            body['redirect_url'] = url_for('legal.case_detail', case_id=case.id)
+    return body
+
+
+def _voice_job_response(job):
+    """Response to a voice submission: final result when it ran inline, else 202 and where to poll"""
+    body = _voice_job_body(job)
+    if job.status == 'FAILED':
+        return jsonify(dict(body, error=job.last_error)), 400
+    if body.get('pipeline_stage') == 'FAILED':
+        case = db.session.get(LegalCase, body['case_id'])
+        return jsonify(dict(body, error=f"Document pipeline failed: {case.pipeline_error}")), 500
+    if job.status != 'DONE' or body.get('pipeline_status_url'):
+        return jsonify(body), 202
+    return jsonify(body)
+
+
+def _get_voice_job(job_id):
+    """A voice job submitted by the current user (404 otherwise)"""
+    job = db.session.get(Job, job_id)
+    if job is None or job.kind not in VOICE_JOB_KINDS or \
+            json.loads(job.payload or '{}').get('user_id') != current_user.id:
+        abort(404)
+    return job
+
+
+@legal_blueprint.route('/voice/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def voice_job_status_view(job_id):
+    """Voice job progress, polled after a voice submission"""
+    return jsonify(_voice_job_body(_get_voice_job(job_id)))
 
-    elif review_data.get('action') == 'reject':
-        case.status = 'REJECTED'
-        case.lawyer_memo = review_data.get('memo', 'Rejected by lawyer')
-        db.session.commit()
-        return jsonify({"success": True, "message": "Case rejected."})
 
-    else:
-        return jsonify({"error": "Unknown action"}), 400
+@legal_blueprint.route('/voice/jobs/<int:job_id>/events', methods=['GET'])
+@login_required
+def voice_job_events(job_id):
+    """
+    Voice job progress as server-sent events
+
+    One "status" event per change until the job is DONE or FAILED. The
+    stream closes after VOICE_EVENTS_TIMEOUT seconds so it never holds a
+    worker thread for long; EventSource reconnects on its own.
+    """
+    _get_voice_job(job_id)
+
+    def stream():
+        deadline = time.monotonic() + VOICE_EVENTS_TIMEOUT
+        last = None
+        yield f"retry: {int(VOICE_EVENTS_POLL_SECONDS * 1000)}\n\n"
+        while True:
+            # End the previous transaction so the worker's commits are visible
+            db.session.rollback()
+            job = db.session.get(Job, job_id, populate_existing=True)
+            data = json.dumps(_voice_job_body(job), sort_keys=True)
+            if data != last:
+                yield f"event: status\ndata: {data}\n\n"
+                last = data
+            if job.status in ('DONE', 'FAILED') or time.monotonic() >= deadline:
+                return
+            time.sleep(VOICE_EVENTS_POLL_SECONDS)
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 # ============================================================================
@@ -327,6 +454,7 @@ def client_approval_page(case_id):
     Step G: Show client the final approval page
     Client reviews the generated document
     """
+    wallet_agent = get_agent('wallet')
     case = LegalCase.query.get_or_404(case_id)
 
     # Security check
@@ -334,7 +462,16 @@ def client_approval_page(case_id):
         flash("Unauthorized access", "danger")
         return redirect(url_for('main.index'))
 
-    return render_template('legal/client_approval.html', case=case)
+    # Escrow and client balances in one batched read (or straight from the balance cache)
+    escrow_wallet_id = os.environ.get("LAW_FIRM_ESCROW_WALLET_ID", "escrow_wallet_demo")
+    balances = wallet_agent.get_wallet_balances([escrow_wallet_id, case.client_wallet_id])
+
+    return render_template(
+        'legal/client_approval.html',
+        case=case,
+        escrow_balance=balances.get(escrow_wallet_id),
+        client_balance=balances.get(case.client_wallet_id)
+    )
 
 
 @legal_blueprint.route('/approve/<int:case_id>', methods=['POST'])
@@ -346,7 +483,8 @@ def client_submit_approval(case_id):
     - Schedule recurring fees if applicable
     - Finalize case
     """
-    wallet_agent, _, _, schedule_agent, _ = get_agents()
+    wallet_agent = get_agent('wallet')
+    schedule_agent = get_agent('scheduler')
     case = LegalCase.query.get_or_404(case_id)
 
     # Security check
@@ -355,23 +493,14 @@ def client_submit_approval(case_id):
         return redirect(url_for('main.index'))
 
     # Step H: Release funds from escrow to law firm main wallet
+    # Recorded in the escrow ledger now; the scheduler nets releases into one
+    # transfer per window (escrow_challenge_id is set when it is submitted)
     escrow_wallet_id = os.environ.get("LAW_FIRM_ESCROW_WALLET_ID", "escrow_wallet_demo")
     main_wallet_id = os.environ.get("LAW_FIRM_MAIN_WALLET_ID", "main_wallet_demo")
-
-    challenge_id = wallet_agent.initiate_gasless_transfer(
-        from_wallet_id=escrow_wallet_id,
-        to_address=main_wallet_id,
-        amount_usdc=case.total_price_usdc
-    )
-
-    if not challenge_id:
-        flash("Fund release failed. Please contact support.", "danger")
-        return redirect(url_for('legal.client_approval_page', case_id=case.id))
-
-    case.escrow_challenge_id = challenge_id
+    record_release(case, escrow_wallet_id, main_wallet_id)
 
     # Step I: Schedule recurring fee if applicable
-    if float(case.recurring_fee_usdc) > 0:
+    if case.recurring_fee_usdc:
         fee_wallet_id = os.environ.get("LAW_FIRM_FEE_WALLET_ID", case.client_wallet_id)
         schedule_agent.schedule_annual_payment(
             case_id=case.id,
@@ -385,6 +514,10 @@ def client_submit_approval(case_id):
     case.updated_at = datetime.utcnow()
     db.session.commit()
 
+    # No scheduler process runs alongside inline deployments, so settle now
+    if current_app.config.get('RUN_JOBS_INLINE'):
+        settle_releases(wallet_agent, force=True)
+
     flash(f"Case {case.id} complete! Funds released and document is yours.", "success")
     return redirect(url_for('legal.case_detail', case_id=case.id))
 
@@ -393,19 +526,86 @@ def client_submit_approval(case_id):
 # Additional Routes
 # ============================================================================
 
+def _encode_case_cursor(case):
+    """Keyset cursor pointing just past a case in created_at DESC, id DESC order"""
+    return f"{case.created_at.strftime('%Y%m%d%H%M%S%f')}-{case.id}"
+
+
+def _decode_case_cursor(cursor):
+    """Parse a cursor from _encode_case_cursor; returns (created_at, id) or None"""
+    try:
+        created_at, case_id = cursor.split('-', 1)
+        return datetime.strptime(created_at, '%Y%m%d%H%M%S%f'), int(case_id)
+    except (AttributeError, ValueError):
+        return None
+
+
 @legal_blueprint.route('/cases')
 @login_required
 def my_cases():
-    """List all cases for current user"""
+    """
+    List cases for current user, newest first
+
+    Uses keyset pagination (?after=<cursor>) so deep pages cost the same as
+    the first, with optional ?status= and ?service_id= filters. ?q= searches
+    the indexed form fields (entity_name, debtor_name, smart_contract_identifier)
+    by prefix, narrowed to one of them with ?field=.
+    """
+    status = request.args.get('status') or None
+    service_id = request.args.get('service_id') or None
+    q = (request.args.get('q') or '').strip() or None
+    field = request.args.get('field') if request.args.get('field') in SEARCHABLE_FORM_FIELDS else None
+
+    query = LegalCase.query
     if current_user.is_lawyer:
-        # Lawyers see all cases
-        cases = LegalCase.query.order_by(LegalCase.created_at.desc()).all()
+        # Lawyers see all cases; load clients in the same query for the Client column
+        query = query.options(joinedload(LegalCase.user))
     else:
         # Clients see only their cases
-        cases = LegalCase.query.filter_by(user_id=current_user.id)\
-            .order_by(LegalCase.created_at.desc()).all()
-
-    return render_template('legal/cases.html', cases=cases)
+        query = query.filter(LegalCase.user_id == current_user.id)
+
+    if status:
+        query = query.filter(LegalCase.status == status)
+    if service_id:
+        query = query.filter(LegalCase.service_id == service_id)
+    if q:
+        prefix = normalize_search_value(q).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        matches = db.session.query(CaseSearchTerm.case_id)\
+            .filter(CaseSearchTerm.value.like(prefix + '%', escape='\\'))
+        if field:
+            matches = matches.filter(CaseSearchTerm.field == field)
+        query = query.filter(LegalCase.id.in_(matches))
+
+    cursor = _decode_case_cursor(request.args.get('after'))
+    if cursor:
+        created_at, case_id = cursor
+        query = query.filter(or_(
+            LegalCase.created_at < created_at,
+            and_(LegalCase.created_at == created_at, LegalCase.id < case_id)
+        ))
+
+    # Fetch one extra row to know whether an older page exists
+    cases = query.order_by(LegalCase.created_at.desc(), LegalCase.id.desc())\
+        .limit(CASES_PAGE_SIZE + 1).all()
+
+    next_cursor = None
+    if len(cases) > CASES_PAGE_SIZE:
+        cases = cases[:CASES_PAGE_SIZE]
+        next_cursor = _encode_case_cursor(cases[-1])
+
+    factory = get_agent('factory')
+    return render_template(
+        'legal/cases.html',
+        cases=cases,
+        next_cursor=next_cursor,
+        is_first_page=cursor is None,
+        status=status,
+        service_id=service_id,
+        q=q,
+        field=field,
+        search_fields=SEARCHABLE_FORM_FIELDS,
+        services=list(factory.get_all_services())
+    )
 
 
 @legal_blueprint.route('/case/<int:case_id>')
@@ -419,23 +619,118 @@ def case_detail(case_id):
         flash("Unauthorized access", "danger")
         return redirect(url_for('main.index'))
 
-    form_data = json.loads(case.form_data) if case.form_data else {}
+    form_data = case.form_data or {}
     return render_template('legal/case_detail.html', case=case, form_data=form_data)
 
 
+@legal_blueprint.route('/case/<int:case_id>/pipeline')
+@login_required
+def case_pipeline_status(case_id):
+    """Background document pipeline progress, polled after approval"""
+    case = LegalCase.query.get_or_404(case_id)
+
+    # Security check
+    if not current_user.is_lawyer and case.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return jsonify({
+        "case_id": case.id,
+        "status": case.status,
+        "pipeline_stage": case.pipeline_stage,
+        "pipeline_error": case.pipeline_error,
+        "document_url": case.document_url
+    })
+
+
+@legal_blueprint.route('/webhooks/circle', methods=['POST', 'HEAD'])
+def circle_webhook():
+    """
+    Circle webhook notifications for transfers and challenges
+
+    Only notifications signed by Circle are accepted. They are treated as
+    hints: the referenced transfers are made due for an immediate status
+    lookup, and state only changes from what the Circle API itself reports.
+    """
+    if request.method == 'HEAD':
+        return '', 200
+
+    wallet_agent = get_agent('wallet')
+    if not wallet_agent.verify_webhook_signature(request.get_data(), request.headers.get('X-Circle-Signature'),
+                                                 request.headers.get('X-Circle-Key-Id')):
+        return jsonify({"error": "Invalid signature"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    notification = payload.get('notification') or {}
+    challenge_ids = [notification.get('id')] + list(notification.get('correlationIds') or [])
+
+    marked = mark_for_check(challenge_ids)
+    if marked and current_app.config.get('RUN_JOBS_INLINE'):
+        refresh_transfers(wallet_agent, CircleTransfer.query.filter(
+            CircleTransfer.challenge_id.in_([c for c in challenge_ids if c]),
+            CircleTransfer.next_check_at.isnot(None)
+        ).all())
+
+    return jsonify({"received": True, "tracked": marked})
+
+
+@legal_blueprint.route('/api/escrow')
+@login_required
+def escrow_reconciliation():
+    """
+    Escrow ledger for lawyers: escrow and revenue balances from the
+    double-entry ledger, released-but-unsettled totals and a reconciliation
+    of recent settlements (?settlement_id=... to pick some)
+    """
+    if not current_user.is_lawyer:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    settlement_ids = request.args.getlist('settlement_id', type=int)
+    settlements = reconcile(settlement_ids or None)
+    return jsonify({
+        "balances": ledger_summary(),
+        "pending": pending_summary(),
+        "settlements": settlements,
+        "balanced": all(settlement['balanced'] and not settlement['stuck'] for settlement in settlements)
+    })
+
+
 @legal_blueprint.route('/api/status')
 def api_status():
-    """API status endpoint for demo/testing"""
-    wallet_agent, intent_agent, doc_agent, schedule_agent, factory = get_agents()
+    """
+    API status endpoint for demo/testing
+
+    Reports each agent's state and init latency without building the rest;
+    ?init=1 initializes every agent first (e.g. to warm a fresh instance)
+    and ?check=1 runs the health probes of initialized agents.
+    """
+    from app.agents.intent_prompts import get_prompt_registry  # pydantic stays off the import path
+
+    registry = get_registry()
+    if request.args.get('init') in ('1', 'true', 'yes'):
+        registry.startup()
+    if request.args.get('check') in ('1', 'true', 'yes'):
+        registry.check_health()
+
+    metrics = registry.metrics()
+    factory = get_agent('factory') if registry.is_initialized('factory') else None
 
     return jsonify({
         "status": "operational",
         "agents": {
-            "wallet": "initialized" if wallet_agent else "not initialized",
-            "intent": "initialized" if intent_agent else "not initialized",
-            "document": "initialized" if doc_agent else "not initialized",
-            "scheduler": "initialized" if schedule_agent else "not initialized"
+            "wallet": metrics['wallet']['state'],
+            "intent": metrics['intent']['state'],
+            "document": metrics['document']['state'],
+            "scheduler": metrics['scheduler']['state']
+        },
+        "agent_metrics": metrics,
+        "intent_cache": get_intent_cache().stats(),
+        "intent_prompts": get_prompt_registry().versions(),
+        "wallet_pool": {
+            "ready": ready_count(),
+            "low_watermark": WALLET_POOL_LOW_WATERMARK,
+            "target": WALLET_POOL_TARGET
         },
         "services": len(factory.services) if factory else 0,
+        "service_catalog": get_catalog().version,
         "mock_mode": os.environ.get('MOCK_MODE', 'True')
     })
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Ledger Backfill
+Books payments and escrow releases recorded before the double-entry ledger
+existed, then checks every running balance against its entries. Safe to run
+more than once.
+
+Usage:
+    python backfill_ledger.py            # backfill, then verify
+    python backfill_ledger.py --verify   # verify only
+    python backfill_ledger.py --repair   # verify and overwrite drifted running balances
+"""
+
+import argparse
+import os
+import sys
+
+from app import create_app, db
+from app.services.ledger import LEDGER_BACKFILL_BATCH_SIZE, backfill_cases, verify_balances, ledger_summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill and verify the double-entry ledger")
+    parser.add_argument('--batch-size', type=int, default=LEDGER_BACKFILL_BATCH_SIZE, help="Postings per commit")
+    parser.add_argument('--verify', action='store_true', help="Only verify running balances")
+    parser.add_argument('--repair', action='store_true', help="Overwrite drifted running balances")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        db.create_all()
+
+        if not args.verify and not args.repair:
+            report = backfill_cases(batch_size=args.batch_size)
+            print(f"📒 Examined {report['payments']} paid cases and {report['releases']} escrow releases")
+
+        check = verify_balances(repair=args.repair)
+        db.session.commit()
+        for account, drift in sorted(check['drifted'].items()):
+            print(f"⚠️  {account}: running {drift['running_usdc']} != entries {drift['entries_usdc']}"
+                  + (" (repaired)" if args.repair else ""))
+        print(f"📒 Balances: {ledger_summary()} (net {check['net_usdc']})")
+
+    if not check['net_zero'] or (check['drifted'] and not args.repair):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
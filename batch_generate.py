@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Bulk Document Generation
+Renders one legal document per row of a CSV or JSONL file and streams the
+results to the document store (SharePoint or local storage).
+
+Usage:
+    python batch_generate.py DE_LLC formations.csv
+    python batch_generate.py WY_DAO_LLC members.jsonl --workers 8 --report errors.jsonl
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+from app.services.legal_factory import LegalFactory
+from app.agents.document_agent import DocumentAgent
+
+
+def read_rows(input_path, input_format=None):
+    """
+    Read form rows from a CSV or JSONL file, one record at a time
+
+    A record that does not parse (invalid JSON, not a JSON object, a CSV
+    line with the wrong number of fields) is reported with its line number
+    instead of stopping the whole file.
+
+    Args:
+        input_path: Path to the input file
+        input_format: 'csv' or 'jsonl' (detected from the extension if None)
+
+    Returns:
+        List of (row dictionary, error) pairs in file order; exactly one of
+        the two is None
+    """
+    if input_format is None:
+        extension = os.path.splitext(input_path)[1].lower()
+        input_format = 'csv' if extension == '.csv' else 'jsonl'
+
+    with open(input_path, 'r', newline='') as f:
+        if input_format == 'csv':
+            return list(_read_csv_rows(f))
+        return list(_read_jsonl_rows(f))
+
+
+def _read_jsonl_rows(f):
+    """(row, error) per non-blank JSONL line"""
+    for line_number, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield None, f"Line {line_number}: invalid JSON ({e.msg})"
+            continue
+        if not isinstance(row, dict):
+            yield None, f"Line {line_number}: expected a JSON object, got {type(row).__name__}"
+        else:
+            yield row, None
+
+
+def _read_csv_rows(f):
+    """(row, error) per CSV record; the header is read first"""
+    reader = csv.DictReader(f)
+    try:
+        fields = reader.fieldnames or []
+    except csv.Error as e:
+        yield None, f"Line {reader.line_num}: {e}"
+        return
+
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield None, f"Line {reader.line_num}: {e}"
+            continue
+
+        # DictReader files surplus values under None and fills missing ones with None
+        if None in row:
+            count = len(fields) + len(row[None])
+        else:
+            count = sum(1 for value in row.values() if value is not None)
+        if count != len(fields):
+            yield None, f"Line {reader.line_num}: expected {len(fields)} fields, got {count}"
+            continue
+        yield {key: value for key, value in row.items() if value != ''}, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate legal documents in bulk")
+    parser.add_argument('service_id', help="Service ID from services.json (e.g. DE_LLC)")
+    parser.add_argument('input', help="CSV or JSONL file with one form per row")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="Input format (default: by extension)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Render processes (default: CPU count, 0 = in-process)")
+    parser.add_argument('--batch-id', default=None,
+                        help="Locker folder for rows without a case_id (default: batch_<timestamp>)")
+    parser.add_argument('--report', default=None, help="Write per-row results as JSONL to this path")
+    args = parser.parse_args(argv)
+
+    factory = LegalFactory()
+    if not factory.get_service(args.service_id):
+        print(f"❌ Unknown service '{args.service_id}'")
+        return 2
+
+    records = read_rows(args.input, args.format)
+    batch_id = args.batch_id or f"batch_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+    doc_agent = DocumentAgent()
+
+    # Records that parsed are rendered; 'row' in results and the report is the record's position
+    parsed = [index for index, (row, _) in enumerate(records) if row is not None]
+    rows = [records[index][0] for index in parsed]
+
+    print(f"📦 Generating {len(rows)} {args.service_id} documents...")
+    started = time.perf_counter()
+    succeeded = 0
+    failed = 0
+
+    report = open(args.report, 'w') if args.report else None
+    try:
+        unreadable = (
+            {'row': index, 'ok': False, 'content': None, 'filename': None, 'error': error}
+            for index, (row, error) in enumerate(records) if row is None
+        )
+        rendered = (
+            dict(result, row=parsed[result['row']])
+            for result in factory.generate_batch(args.service_id, rows, max_workers=args.workers)
+        )
+        for result in itertools.chain(unreadable, rendered):
+            entry = {'row': result['row'], 'ok': result['ok'], 'error': result['error'], 'document_url': None}
+
+            if result['ok']:
+                case_id = records[result['row']][0].get('case_id', batch_id)
+                doc_url = doc_agent.upload_document(result['content'], result['filename'], case_id)
+                if doc_url:
+                    entry['document_url'] = doc_url
+                else:
+                    entry['ok'] = False
+                    entry['error'] = "Document upload failed"
+
+            if entry['ok']:
+                succeeded += 1
+            else:
+                failed += 1
+                print(f"❌ Row {entry['row']}: {entry['error']}")
+
+            if report:
+                report.write(json.dumps(entry) + '\n')
+    finally:
+        if report:
+            report.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ {succeeded} generated, {failed} failed in {elapsed:.2f}s")
+    return 0 if failed == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Intent Extraction Benchmark
+Runs the labelled transcript corpus through the local rule extractor and
+reports accuracy (right answers, wrong answers accepted without the LLM,
+correct fallbacks) together with per-transcript latency.
+
+Usage:
+    python benchmark_intents.py
+    python benchmark_intents.py --corpus my_corpus.jsonl --min-confidence 0.8
+    python benchmark_intents.py --with-agent   # also time the full agent path (mock or Gemini)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from app.agents.intent_prompts import get_prompt_registry
+from app.agents.intent_rules import IntentRules
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), 'app', 'agents', 'intent_corpus.jsonl')
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_rules(corpus, rules, repeat):
+    """
+    Score the rule extractor on a corpus
+
+    Entries with an expected intent must be answered locally with exactly
+    that intent; entries whose expected intent is null must fall back.
+    """
+    report = {'entries': len(corpus), 'local': 0, 'correct': 0, 'wrong_local': 0,
+              'correct_fallback': 0, 'missed_local': 0, 'failures': []}
+    latencies = []
+
+    for entry in corpus:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            data, confidence = rules.extract(entry['kind'], entry['text'])
+        latencies.append((time.perf_counter() - started) / repeat * 1000)
+
+        local = rules.is_confident(confidence)
+        expected = entry.get('expected')
+        if local:
+            report['local'] += 1
+        if local and data == expected:
+            report['correct'] += 1
+        elif local:
+            report['wrong_local'] += 1
+            report['failures'].append({'text': entry['text'], 'got': data, 'expected': expected})
+        elif expected is None:
+            report['correct_fallback'] += 1
+        else:
+            report['missed_local'] += 1
+            report['failures'].append({'text': entry['text'], 'got': data, 'confidence': confidence,
+                                       'expected': expected})
+
+    report['accuracy'] = round((report['correct'] + report['correct_fallback']) / len(corpus), 3) if corpus else 0.0
+    report['local_share'] = round(report['local'] / len(corpus), 3) if corpus else 0.0
+    report['mean_ms'] = round(sum(latencies) / len(latencies), 4) if latencies else 0.0
+    report['p95_ms'] = round(percentile(latencies, 0.95), 4)
+    return report
+
+
+def run_agent(corpus):
+    """Time the full AiIntentAgent path (rules, then cache, then mock/Gemini)"""
+    from app.agents.ai_intent_agent import AiIntentAgent
+    from app.agents.intent_cache import MemoryIntentCache
+
+    agent = AiIntentAgent(cache=MemoryIntentCache())
+    latencies = []
+    for entry in corpus:
+        extract = agent.get_intent_from_text_review if entry['kind'] == 'review' else agent.get_intent_from_text_order
+        started = time.perf_counter()
+        extract(entry['text'], use_cache=False)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'mock_mode': agent.mock_mode,
+        'mean_ms': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        'p95_ms': round(percentile(latencies, 0.95), 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark local intent extraction")
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help="JSONL corpus of {kind, text, expected}")
+    parser.add_argument('--min-confidence', type=float, default=None,
+                        help="Confidence needed to skip the LLM (default: INTENT_RULES_MIN_CONFIDENCE)")
+    parser.add_argument('--repeat', type=int, default=100, help="Extractions per entry when timing")
+    parser.add_argument('--with-agent', action='store_true', help="Also time the full agent path")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, 'r') as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    registry = get_prompt_registry()
+    rules = registry.rules
+    if args.min_confidence is not None:
+        rules = IntentRules(registry.services, min_confidence=args.min_confidence)
+
+    report = run_rules(corpus, rules, max(1, args.repeat))
+    for failure in report.pop('failures'):
+        print(f"❌ {json.dumps(failure)}")
+
+    print(
+        f"📊 {report['entries']} transcripts: accuracy {report['accuracy']:.1%}, "
+        f"{report['local_share']:.1%} answered locally "
+        f"({report['correct']} correct, {report['wrong_local']} wrong), "
+        f"{report['correct_fallback']} correct fallbacks, {report['missed_local']} missed; "
+        f"rules {report['mean_ms']:.3f} ms mean / {report['p95_ms']:.3f} ms p95"
+    )
+
+    if args.with_agent:
+        agent_report = run_agent(corpus)
+        mode = "mock" if agent_report['mock_mode'] else "Gemini"
+        print(f"⏱️  Full agent path ({mode} fallback): {agent_report['mean_ms']:.3f} ms mean / "
+              f"{agent_report['p95_ms']:.3f} ms p95")
+
+    return 0 if report['wrong_local'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
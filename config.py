@@ -19,17 +19,49 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Tables are created by `flask --app run init-db` (or `python run.py`), not at import;
+    # set this where the database starts empty on every instance (e.g. SQLite in /tmp)
+    CREATE_DB_ON_FIRST_REQUEST = os.environ.get('CREATE_DB_ON_FIRST_REQUEST', 'False').lower() in ('true', '1', 'yes')
+
     # Circle WaaS
     CIRCLE_API_KEY = os.environ.get('CIRCLE_API_KEY')
     CIRCLE_ENTITY_SECRET = os.environ.get('CIRCLE_ENTITY_SECRET')
+    CIRCLE_TRANSFER_RATE = float(os.environ.get('CIRCLE_TRANSFER_RATE', '10'))  # transfers/second per process
+    CIRCLE_TRANSFER_BURST = int(os.environ.get('CIRCLE_TRANSFER_BURST', '20'))
+    CIRCLE_TRANSFER_WORKERS = int(os.environ.get('CIRCLE_TRANSFER_WORKERS', '8'))
+    CIRCLE_IDEMPOTENCY_SALT = os.environ.get('CIRCLE_IDEMPOTENCY_SALT')  # default: per-database install ID
+    CIRCLE_API_BASE_URL = os.environ.get('CIRCLE_API_BASE_URL', 'https://api.circle.com/v1/w3s')
+    CIRCLE_WEBHOOK_KEY_URL = os.environ.get('CIRCLE_WEBHOOK_KEY_URL',
+                                            'https://api.circle.com/v2/notifications/publicKey')
+    CIRCLE_WALLET_SET_ID = os.environ.get('CIRCLE_WALLET_SET_ID')  # shared by all client wallets
+    WALLET_POOL_LOW_WATERMARK = int(os.environ.get('WALLET_POOL_LOW_WATERMARK', '20'))  # refill below this
+    WALLET_POOL_TARGET = int(os.environ.get('WALLET_POOL_TARGET', '100'))
 
     # Arc Network
     ARC_RPC_URL = os.environ.get('ARC_RPC_URL', 'https://rpc.testnet.arc.network')
     ARC_CHAIN_ID = os.environ.get('ARC_CHAIN_ID', '5042002')
+    ARC_BALANCE_CACHE_TTL = float(os.environ.get('ARC_BALANCE_CACHE_TTL', '30'))  # seconds
+    ESCROW_NETTING_WINDOW = int(os.environ.get('ESCROW_NETTING_WINDOW', '300'))  # seconds releases are netted
 
     # AI Services
     ELEVENLABS_API_KEY = os.environ.get('ELEVENLABS_API_KEY')
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    INTENT_CACHE_TTL = float(os.environ.get('INTENT_CACHE_TTL', '86400'))  # seconds, 0 = never expire
+    INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE', '1024'))
+    INTENT_CACHE_PATH = os.environ.get('INTENT_CACHE_PATH')  # SQLite file shared by workers
+    INTENT_RULES_MIN_CONFIDENCE = float(os.environ.get('INTENT_RULES_MIN_CONFIDENCE', '0.9'))  # skip LLM at/above
+    SERVICE_CATALOG_POLL_SECONDS = float(os.environ.get('SERVICE_CATALOG_POLL_SECONDS', '2'))  # services.json reload
+    VOICE_UPLOAD_DIR = os.environ.get('VOICE_UPLOAD_DIR')  # spooled recordings, shared with worker.py
+    VOICE_MAX_UPLOAD_BYTES = int(os.environ.get('VOICE_MAX_UPLOAD_BYTES', str(25 * 1024 * 1024)))
+    REVIEW_BATCH_MAX_ITEMS = int(os.environ.get('REVIEW_BATCH_MAX_ITEMS', '50'))
+    REVIEW_BATCH_WORKERS = int(os.environ.get('REVIEW_BATCH_WORKERS', '8'))
+    REVIEW_BATCH_MAX_BYTES = int(os.environ.get('REVIEW_BATCH_MAX_BYTES', str(200 * 1024 * 1024)))  # all clips
+
+    # Requests larger than this are refused before their body is read
+    MAX_CONTENT_LENGTH = VOICE_MAX_UPLOAD_BYTES + 1024 * 1024
+    MAX_CONTENT_LENGTH_BY_ENDPOINT = {
+        'legal.lawyer_submit_review_batch': REVIEW_BATCH_MAX_BYTES + 1024 * 1024
+    }
 
     # MS Graph (Optional)
     MS_TENANT_ID = os.environ.get('MS_TENANT_ID')
@@ -37,12 +69,17 @@ class Config:
     MS_CLIENT_SECRET = os.environ.get('MS_CLIENT_SECRET')
     SHAREPOINT_SITE_ID = os.environ.get('SHAREPOINT_SITE_ID')
     SHAREPOINT_DRIVE_ID = os.environ.get('SHAREPOINT_DRIVE_ID')
+    MS_GRAPH_BASE_URL = os.environ.get('MS_GRAPH_BASE_URL', 'https://graph.microsoft.com/v1.0')
+    MS_GRAPH_TOKEN_CACHE_PATH = os.environ.get('MS_GRAPH_TOKEN_CACHE_PATH')  # shared by gunicorn workers
 
     # Law Firm Wallets
     LAW_FIRM_ESCROW_WALLET_ID = os.environ.get('LAW_FIRM_ESCROW_WALLET_ID')
     LAW_FIRM_MAIN_WALLET_ID = os.environ.get('LAW_FIRM_MAIN_WALLET_ID')
     LAW_FIRM_FEE_WALLET_ID = os.environ.get('LAW_FIRM_FEE_WALLET_ID')
 
+    # Background jobs: run the approval pipeline inside the request when no worker.py is deployed
+    RUN_JOBS_INLINE = os.environ.get('RUN_JOBS_INLINE', 'False').lower() in ('true', '1', 'yes')
+
     # Mock Mode (for development without real API keys)
     MOCK_MODE = os.environ.get('MOCK_MODE', 'True').lower() in ('true', '1', 'yes')
 
@@ -58,9 +95,18 @@ class ProductionConfig(Config):
     MOCK_MODE = False
 
 
+class TestingConfig(Config):
+    """Test configuration (tests/conftest.py gives each test its own database)"""
+    TESTING = True
+    MOCK_MODE = True
+    RUN_JOBS_INLINE = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
 # Config dictionary
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
+    'testing': TestingConfig,
     'default': DevelopmentConfig
 }
@@ -0,0 +1,39 @@
+"""
+Gunicorn configuration for Agent-Ledger
+
+Usage:
+    gunicorn -c gunicorn.conf.py run:app
+
+Each worker builds its own agents (see app/agents/registry.py) and shuts
+them down on exit, so executor threads and HTTP pools never leak across
+worker restarts. Set AGENT_PRELOAD=wallet,factory (or "all") to build
+agents when a worker starts instead of on its first request.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+
+
+def _registry(worker):
+    from app.agents.registry import get_registry
+    return get_registry(worker.wsgi)
+
+
+def post_worker_init(worker):
+    """Optionally build agents before the worker accepts requests"""
+    preload = os.environ.get('AGENT_PRELOAD', '').strip()
+    if not preload:
+        return
+
+    names = None if preload == 'all' else [name.strip() for name in preload.split(',') if name.strip()]
+    errors = _registry(worker).startup(names)
+    for name, error in errors.items():
+        worker.log.warning("Agent %s failed to start: %s", name, error)
+
+
+def worker_exit(server, worker):
+    """Shut down this worker's agents (thread pools, schedulers)"""
+    _registry(worker).shutdown()
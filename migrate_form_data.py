@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: form_data Migration
+Upgrades an existing database to structured form_data:
+  - Postgres: converts legal_cases.form_data from TEXT to JSONB
+  - creates the case_search_terms table and any missing legal_cases indexes
+  - backfills search terms for existing cases
+
+SQLite keeps form_data as JSON text, so only the table, indexes and backfill
+apply there. Safe to run more than once.
+
+Usage:
+    python migrate_form_data.py
+    python migrate_form_data.py --batch-size 500
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.models import LegalCase, CaseSearchTerm
+
+
+def convert_form_data_column():
+    """Convert form_data to JSONB on Postgres; returns True if it was altered"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+
+    columns = {c['name']: c for c in inspect(db.engine).get_columns('legal_cases')}
+    if 'JSON' in str(columns['form_data']['type']).upper():
+        return False
+
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "ALTER TABLE legal_cases ALTER COLUMN form_data TYPE JSONB "
+            "USING NULLIF(form_data, '')::jsonb"
+        ))
+    return True
+
+
+def create_indexes():
+    """Create indexes declared on the models that create_all skips for existing tables"""
+    for index in list(LegalCase.__table__.indexes) + list(CaseSearchTerm.__table__.indexes):
+        index.create(db.engine, checkfirst=True)
+
+
+def backfill_search_terms(batch_size):
+    """Index form_data for cases that have no search terms yet"""
+    indexed = db.session.query(CaseSearchTerm.case_id)
+    last_id = 0
+    total = 0
+
+    while True:
+        cases = LegalCase.query.filter(LegalCase.id > last_id, ~LegalCase.id.in_(indexed))\
+            .order_by(LegalCase.id).limit(batch_size).all()
+        if not cases:
+            break
+
+        for case in cases:
+            # Reassigning runs LegalCase._index_form_data
+            case.form_data = dict(case.form_data or {})
+        db.session.commit()
+
+        last_id = cases[-1].id
+        total += len(cases)
+        db.session.expunge_all()
+
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate LegalCase.form_data to a structured, searchable column")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Cases indexed per transaction")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        if convert_form_data_column():
+            print("✅ legal_cases.form_data converted to JSONB")
+
+        db.create_all()
+        create_indexes()
+        print("✅ Search table and indexes ready")
+
+        total = backfill_search_terms(args.batch_size)
+        print(f"✅ Indexed form data for {total} cases")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Money Column Migration
+Converts USDC amount columns (legal_cases, escrow_releases, escrow_settlements,
+recurring_fees) from decimal strings to BIGINT micro-USDC:
+  - Postgres: ALTER COLUMN ... TYPE BIGINT, converted exactly via NUMERIC
+  - SQLite: rebuilds each table from its model (rows copied in batches,
+    then swapped in), since integers written to a text column stay text
+    and a column's type or NOT NULL cannot be altered in place
+Amounts that are not exact micro-USDC stop the migration on both dialects.
+
+Safe to run more than once.
+
+Usage:
+    python migrate_money_columns.py
+    python migrate_money_columns.py --batch-size 500
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from app import create_app, db
+from app.money import MICROS_PER_USDC, Money, MoneyType
+
+
+def money_columns():
+    """(table, column) of every Money column declared on the models"""
+    return [
+        (table.name, column.name)
+        for table in db.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, MoneyType)
+    ]
+
+
+def is_converted(table, column):
+    """True if the column is missing or already an integer column"""
+    columns = {c['name']: c for c in inspect(db.engine).get_columns(table)}
+    return column not in columns or 'INT' in str(columns[column]['type']).upper()
+
+
+def invalid_amounts(table, column, nullable, limit=5, batch_size=1000):
+    """
+    Stored amounts Money cannot represent exactly (sub-micro, malformed, or
+    empty in a NOT NULL column), checked before either dialect converts
+
+    Returns:
+        Up to limit (id, value) pairs
+    """
+    invalid = []
+    last_id = None
+    while len(invalid) < limit:
+        with db.engine.connect() as conn:
+            rows = conn.execute(text(
+                f"SELECT id, {column} FROM {table} WHERE {column} IS NOT NULL"
+                + ("" if last_id is None else " AND id > :last_id")
+                + " ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).all()
+        if not rows:
+            break
+        for row_id, value in rows:
+            try:
+                _to_micros(value, nullable)
+            except ValueError:
+                invalid.append((row_id, value))
+        last_id = rows[-1][0]
+    return invalid[:limit]
+
+
+def _to_micros(value, nullable=True):
+    """Stored decimal string -> micro-USDC (None for empty amounts in nullable columns)"""
+    if value is None or not str(value).strip():
+        if nullable:
+            return None
+        raise ValueError("Empty amount in a NOT NULL column")
+    return Money.parse(str(value)).micros
+
+
+def convert_postgres_column(table, column):
+    """ALTER a text amount column to BIGINT micro-USDC (NOT NULL and indexes are kept)"""
+    # invalid_amounts has ruled out sub-micro amounts, so round() never changes a value
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT "
+            f"USING round(NULLIF(trim({column}), '')::numeric * {MICROS_PER_USDC})::bigint"
+        ))
+
+
+def rebuild_sqlite_table(table, columns, batch_size):
+    """
+    Rebuild a SQLite table from its model with the given amount columns as
+    BIGINT micro-USDC
+
+    ALTER TABLE cannot change a column's type or add a NOT NULL column
+    without a default, so rows are copied in batches into a new table
+    created from the model (keeping NOT NULL, unique constraints and
+    indexes), which then replaces the old one. An interrupted rebuild
+    resumes from the last copied row.
+
+    Returns:
+        Number of rows copied
+    """
+    model_table = db.metadata.tables[table]
+    staging = f"{table}__micros"
+    with db.engine.begin() as conn:
+        inspector = inspect(conn)
+        existing = {c['name'] for c in inspector.get_columns(table)}
+        if staging not in inspector.get_table_names():
+            # A scratch MetaData, with the tables foreign keys point at, so the
+            # staging table never joins db.metadata
+            scratch = MetaData()
+            for foreign_key in model_table.foreign_keys:
+                foreign_key.column.table.to_metadata(scratch)
+            conn.execute(CreateTable(model_table.to_metadata(scratch, name=staging)))
+    copied_columns = [c.name for c in model_table.columns if c.name in existing]
+    nullable = {c.name: c.nullable for c in model_table.columns}
+
+    # Model columns the old table lacks get their scalar defaults (e.g. NOT NULL counters)
+    defaults = {
+        c.name: c.default.arg for c in model_table.columns
+        if c.name not in existing and c.default is not None and c.default.is_scalar
+    }
+
+    with db.engine.connect() as conn:
+        last_id = conn.execute(text(f"SELECT max(id) FROM {staging}")).scalar()
+        total = conn.execute(text(f"SELECT count(*) FROM {staging}")).scalar()
+
+    column_list = ', '.join(copied_columns)
+    while True:
+        with db.engine.begin() as conn:
+            rows = conn.execute(text(
+                f"SELECT {column_list} FROM {table}"
+                + ("" if last_id is None else " WHERE id > :last_id")
+                + " ORDER BY id LIMIT :limit"
+            ), {'last_id': last_id, 'limit': batch_size}).mappings().all()
+            if not rows:
+                break
+            names = copied_columns + list(defaults)
+            conn.execute(
+                text(f"INSERT INTO {staging} ({', '.join(names)}) VALUES ({', '.join(':' + n for n in names)})"),
+                [
+                    dict({name: _to_micros(row[name], nullable[name]) if name in columns else row[name]
+                          for name in copied_columns}, **defaults)
+                    for row in rows
+                ]
+            )
+        last_id = rows[-1]['id']
+        total += len(rows)
+
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {table}"))
+        conn.execute(text(f"ALTER TABLE {staging} RENAME TO {table}"))
+    for index in model_table.indexes:
+        index.create(db.engine, checkfirst=True)
+    return total
+
+
+def convert_all(batch_size=1000):
+    """
+    Convert every text amount column, after checking all of them
+
+    Returns:
+        False (nothing converted) if any column holds inexact amounts
+    """
+    existing = set(inspect(db.engine).get_table_names())
+    pending = {}
+    for table, column in money_columns():
+        if table in existing and not is_converted(table, column):
+            pending.setdefault(table, []).append(column)
+
+    # Both dialects refuse amounts that would not convert exactly
+    ok = True
+    for table, columns in pending.items():
+        for column in columns:
+            invalid = invalid_amounts(table, column, db.metadata.tables[table].c[column].nullable)
+            if invalid:
+                ok = False
+                print(f"❌ {table}.{column} has amounts that are not exact micro-USDC "
+                      f"(fix them first): {', '.join(f'id {i}: {v!r}' for i, v in invalid)}")
+    if not ok:
+        return False
+
+    for table, columns in pending.items():
+        if db.engine.dialect.name == 'postgresql':
+            for column in columns:
+                convert_postgres_column(table, column)
+                print(f"✅ {table}.{column} converted to BIGINT micro-USDC")
+        else:
+            copied = rebuild_sqlite_table(table, columns, batch_size)
+            print(f"✅ {table} rebuilt with {', '.join(columns)} as BIGINT micro-USDC ({copied} rows)")
+
+    db.create_all()
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert USDC amount columns to BIGINT micro-USDC")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows converted per transaction (SQLite)")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        return 0 if convert_all(args.batch_size) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Schema Migration
+Brings existing tables up to the models where create_all cannot:
+  - adds columns declared on the models but missing from the database
+    (e.g. jobs.stage and jobs.result)
+  - creates indexes declared on the models but missing from the database
+
+Column type changes have their own scripts (migrate_form_data.py,
+migrate_money_columns.py). Safe to run more than once.
+
+Usage:
+    python migrate_schema.py
+    python migrate_schema.py --dry-run
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect, literal, text
+
+from app import create_app, create_tables, db
+
+
+def missing_columns():
+    """(table, column) of every model column whose table exists without it"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend((table, column) for column in table.columns if column.name not in existing)
+    return missing
+
+
+def add_column_sql(table, column):
+    """
+    ALTER TABLE ... ADD COLUMN for a model column
+
+    NOT NULL columns need a scalar default to fill existing rows; without
+    one the column is added nullable (reported by the caller).
+
+    Returns:
+        Tuple of (SQL string, True if added NOT NULL as declared)
+    """
+    dialect = db.engine.dialect
+    sql = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=dialect)}"
+
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        rendered = literal(default, type_=column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})
+        sql += f" DEFAULT {rendered}"
+
+    not_null = not column.nullable and not column.primary_key and default is not None
+    if not_null:
+        sql += " NOT NULL"
+    return sql, not_null or column.nullable
+
+
+def create_missing_indexes():
+    """Create model indexes missing from existing tables; returns their names"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine, checkfirst=True)
+                created.append(index.name)
+    return created
+
+
+def upgrade(dry_run=False):
+    """
+    Add missing columns, then missing tables and indexes
+
+    Args:
+        dry_run: Only print the ALTER TABLE statements
+
+    Returns:
+        Number of columns added (or that would be added)
+    """
+    missing = missing_columns()
+    for table, column in missing:
+        sql, as_declared = add_column_sql(table, column)
+        if dry_run:
+            print(f"🔎 {sql}")
+            continue
+        with db.engine.begin() as conn:
+            conn.execute(text(sql))
+        print(f"✅ {table.name}.{column.name} added"
+              + ("" if as_declared else " (nullable: no default to fill existing rows)"))
+
+    if not dry_run:
+        create_tables()
+        for name in create_missing_indexes():
+            print(f"✅ Index {name} created")
+    return len(missing)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add missing columns and indexes to an existing database")
+    parser.add_argument('--dry-run', action='store_true', help="Print the missing columns without changing anything")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        if upgrade(dry_run=args.dry_run) == 0:
+            print("✅ Schema already matches the models")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Wallet Provisioning
+Pre-creates client wallets in bulk under one Circle WalletSet: tops up the
+wallet pool that orders claim from, or onboards many users at once.
+
+Usage:
+    python provision_wallets.py                      # refill the pool if below the low watermark
+    python provision_wallets.py --fill --target 500  # top the pool up to 500 ready wallets now
+    python provision_wallets.py --emails members.txt # one wallet per listed user (one line per email)
+    python provision_wallets.py --all-users          # every user without a wallet
+"""
+
+import argparse
+import os
+import sys
+
+from app import create_app, db
+from app.models import User
+from app.agents.circle_wallet_agent import CircleWalletAgent
+from app.services.wallet_pool import (
+    WALLET_POOL_TARGET, WALLET_POOL_LOW_WATERMARK, WalletPoolShortfall, replenish, provision_users,
+    assign_waiting_cases, ready_count
+)
+
+
+def read_emails(path):
+    """Email addresses from a text file, one per line (blank lines and # comments skipped)"""
+    with open(path, 'r') as f:
+        return [line.strip().lower() for line in f if line.strip() and not line.startswith('#')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-create Circle wallets in bulk")
+    parser.add_argument('--target', type=int, default=WALLET_POOL_TARGET, help="Ready wallets after a refill")
+    parser.add_argument('--fill', action='store_true', help="Refill to --target even above the low watermark")
+    parser.add_argument('--emails', default=None, help="File of user emails to give their own wallet")
+    parser.add_argument('--all-users', action='store_true', help="Give every user without a wallet their own")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        db.create_all()
+        wallet_agent = CircleWalletAgent()
+
+        if args.emails or args.all_users:
+            query = User.query.filter(User.wallet_id.is_(None))
+            if args.emails:
+                emails = read_emails(args.emails)
+                query = query.filter(User.email.in_(emails))
+            users = query.all()
+            provisioned = provision_users(wallet_agent, users)
+            print(f"👛 Provisioned {provisioned} of {len(users)} users without a wallet")
+            if provisioned < len(users):
+                return 1
+            return 0
+
+        shortfall = None
+        try:
+            created = replenish(wallet_agent, target=args.target, low_watermark=WALLET_POOL_LOW_WATERMARK,
+                                force=args.fill)
+        except WalletPoolShortfall as e:
+            shortfall, created = e, None
+        assigned = assign_waiting_cases()
+        db.session.commit()
+        if shortfall:
+            print(f"⚠️  {shortfall}")
+        print(f"👛 Wallet pool: {ready_count()} ready, {assigned} waiting cases assigned"
+              + (f", {created} created" if created is not None else ""))
+
+    return 1 if shortfall else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,8 +5,8 @@ Built for the "AI Agents on Arc with USDC" Hackathon
 """
 
 import os
-from app import create_app, db
-from app.models import User, LegalCase
+from app import create_app, create_tables, db
+from app.models import User, LegalCase, Job, RecurringFee
 
 # Create Flask application
 app = create_app(os.getenv('FLASK_ENV') or 'development')
@@ -17,13 +17,16 @@ def make_shell_context():
     return {
         'db': db,
         'User': User,
-        'LegalCase': LegalCase
+        'LegalCase': LegalCase,
+        'Job': Job,
+        'RecurringFee': RecurringFee
     }
 
-# Initialize database
-with app.app_context():
-    db.create_all()
-    print("✅ Database initialized successfully")
-
 if __name__ == '__main__':
+    # Importing this module (gunicorn, api/index.py) never touches the database;
+    # deployments create tables once with `flask --app run init-db`
+    with app.app_context():
+        create_tables()
+        print("✅ Database initialized successfully")
+
     app.run(host='0.0.0.0', port=5000, debug=True)
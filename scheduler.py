@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Recurring Fee Scheduler
+Runs the hourly recurring-fee billing run against the app database. Run one
+per deployment (extra copies are safe: they stand by on a database lease
+until the active scheduler stops).
+
+Usage:
+    python scheduler.py
+    python scheduler.py --every-seconds 60
+    python scheduler.py --once --dry-run
+    python scheduler.py --once --workers 16
+"""
+
+import argparse
+import os
+import sys
+
+from app import create_app, create_tables
+from app.agents.circle_wallet_agent import CircleWalletAgent, CIRCLE_TRANSFER_WORKERS
+from app.agents.scheduling_agent import SchedulingAgent
+from app.services.billing_run import BILLING_PAGE_SIZE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bill due recurring fees")
+    parser.add_argument('--every-seconds', type=int, default=None,
+                        help="Run on this interval instead of hourly (useful for demos)")
+    parser.add_argument('--once', action='store_true', help="Run one billing run now, then exit")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report what would be billed without submitting transfers")
+    parser.add_argument('--workers', type=int, default=CIRCLE_TRANSFER_WORKERS,
+                        help="Concurrent transfer submissions (rate limit: CIRCLE_TRANSFER_RATE)")
+    parser.add_argument('--page-size', type=int, default=BILLING_PAGE_SIZE,
+                        help="Due fees processed per page")
+    args = parser.parse_args(argv)
+
+    options = {
+        'dry_run': args.dry_run,
+        'page_size': args.page_size
+    }
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        create_tables()
+
+    schedule_agent = SchedulingAgent(wallet_agent=CircleWalletAgent(max_workers=args.workers))
+
+    if args.once:
+        with app.app_context():
+            if not args.dry_run and not schedule_agent.acquire_lease():
+                print("⚠️  Another scheduler holds the lease, nothing billed")
+                return 1
+            report = schedule_agent.run_pending_payments(**options)
+            if not args.dry_run:
+                schedule_agent.release_lease()
+        return 0 if report['transfers_failed'] == 0 else 1
+
+    try:
+        schedule_agent.run_forever(app, every_seconds=args.every_seconds, **options)
+    except (KeyboardInterrupt, SystemExit):
+        schedule_agent.shutdown()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
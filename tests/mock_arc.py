@@ -0,0 +1,57 @@
+"""
+Mock Arc node
+An anvil-style JSON-RPC endpoint on localhost answering batched USDC
+balanceOf eth_calls from a dict of balances
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.agents.wallet_balance_cache import BALANCE_OF_SELECTOR, USDC_CONTRACT_ADDRESS
+
+
+class MockArc:
+    """USDC balances in micro-USDC by lowercase address, and a log of the batches served"""
+
+    def __init__(self):
+        self.balances = {}
+        self.batches = []
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _call(self, request):
+        call, _block = request['params']
+        if request['method'] != 'eth_call' or call['to'] != USDC_CONTRACT_ADDRESS \
+                or not call['data'].startswith(BALANCE_OF_SELECTOR):
+            return {'jsonrpc': '2.0', 'id': request['id'], 'error': {'code': -32601, 'message': 'unsupported'}}
+        address = '0x' + call['data'][len(BALANCE_OF_SELECTOR):][-40:]
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': hex(self.balances.get(address, 0))}
+
+    def _handler(self):
+        arc = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                batch = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                arc.batches.append(batch)
+                body = json.dumps([arc._call(request) for request in batch]).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,76 @@
+"""
+Mock Circle server
+Serves transaction states and a webhook signing key on localhost, and signs
+notifications the way Circle does
+"""
+
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+
+class MockCircle:
+    """Transaction states by ID, one webhook key, and a log of the requests served"""
+
+    KEY_ID = 'mock-key-1'
+
+    def __init__(self):
+        self.states = {}
+        self.requests = []
+        self._private_key = ec.generate_private_key(ec.SECP256R1())
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def sign(self, body):
+        """Headers Circle would send with a notification body (bytes)"""
+        signature = self._private_key.sign(body, ec.ECDSA(hashes.SHA256()))
+        return {'X-Circle-Signature': base64.b64encode(signature).decode(), 'X-Circle-Key-Id': self.KEY_ID}
+
+    def _public_key(self):
+        der = self._private_key.public_key().public_bytes(
+            serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        return base64.b64encode(der).decode()
+
+    def _handler(self):
+        circle = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                circle.requests.append(self.path)
+                transaction = re.fullmatch(r'/v1/w3s/transactions/([^/]+)', self.path)
+                key = re.fullmatch(r'/v2/notifications/publicKey/([^/]+)', self.path)
+                if transaction and transaction.group(1) in circle.states:
+                    self._reply(200, {'data': {'transaction': {
+                        'id': transaction.group(1), 'state': circle.states[transaction.group(1)]}}})
+                elif key and key.group(1) == MockCircle.KEY_ID:
+                    self._reply(200, {'data': {'id': MockCircle.KEY_ID, 'algorithm': 'ECDSA_SHA_256',
+                                               'publicKey': circle._public_key()}})
+                else:
+                    self._reply(404, {'code': 404, 'message': 'Not found'})
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,124 @@
+"""
+Mock Microsoft Graph server
+Accepts simple /content uploads and chunked upload sessions on localhost
+over keep-alive connections, optionally failing the first few PUTs with a
+throttling status
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+
+
+class MockGraph:
+    """Uploaded files by path, queued failure statuses, and the client ports that connected"""
+
+    def __init__(self):
+        self.files = {}
+        # Status per PUT, in order (None lets that PUT through)
+        self.failures = []
+        self.bodies = []
+        self.client_ports = set()
+        # Upload session id -> {'path', 'received'}
+        self.upload_sessions = {}
+        # Reply to every chunk with nextExpectedRanges ['0-'], as a broken session would
+        self.stale_ranges = False
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.host_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self.url = f"{self.host_url}/v1.0"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        graph = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self.path.endswith(':/createUploadSession'):
+                    self._reply(404, {'error': {'code': 'itemNotFound'}})
+                    return
+                path = self.path.split('root:/', 1)[1][:-len(':/createUploadSession')]
+                with graph._lock:
+                    session_id = str(len(graph.upload_sessions) + 1)
+                    graph.upload_sessions[session_id] = {'path': path, 'received': bytearray()}
+                self._reply(200, {'uploadUrl': f"{graph.host_url}/upload/{session_id}"})
+
+            def do_GET(self):
+                upload = graph.upload_sessions.get(self.path.rsplit('/', 1)[-1])
+                if not self.path.startswith('/upload/') or upload is None:
+                    self._reply(404, {'error': {'code': 'itemNotFound'}})
+                    return
+                self._reply(200, {'nextExpectedRanges': [f"{len(upload['received'])}-"]})
+
+            def do_PUT(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                with graph._lock:
+                    graph.client_ports.add(self.client_address[1])
+                    graph.bodies.append(body)
+                    status = graph.failures.pop(0) if graph.failures else None
+                if status is not None:
+                    self._reply(status, {'error': {'code': 'serviceNotAvailable'}}, {'Retry-After': '0'})
+                    return
+                if self.path.startswith('/upload/'):
+                    self._put_range(self.path.rsplit('/', 1)[-1], body)
+                    return
+                if not self.path.endswith(':/content'):
+                    self._reply(404, {'error': {'code': 'itemNotFound'}})
+                    return
+                path = self.path.split('root:/', 1)[1][:-len(':/content')]
+                with graph._lock:
+                    graph.files[path] = body
+                self._reply(201, self._drive_item(path))
+
+            def _put_range(self, session_id, body):
+                """Append one Content-Range fragment; 201 with the item once the file is complete"""
+                upload = graph.upload_sessions.get(session_id)
+                if upload is None:
+                    self._reply(404, {'error': {'code': 'itemNotFound'}})
+                    return
+                byte_range, total_size = self.headers['Content-Range'].split(' ', 1)[1].split('/')
+                start, end = (int(value) for value in byte_range.split('-'))
+                with graph._lock:
+                    if start != len(upload['received']) or end - start + 1 != len(body):
+                        self._reply(416, {'error': {'code': 'invalidRange'}})
+                        return
+                    upload['received'] += body
+                    complete = len(upload['received']) == int(total_size)
+                    if complete:
+                        graph.files[upload['path']] = bytes(upload['received'])
+                        del graph.upload_sessions[session_id]
+                    next_offset = 0 if graph.stale_ranges else len(upload['received'])
+                if complete:
+                    self._reply(201, self._drive_item(upload['path']))
+                else:
+                    self._reply(202, {'nextExpectedRanges': [f"{next_offset}-"]})
+
+            @staticmethod
+            def _drive_item(path):
+                return {'name': path.rsplit('/', 1)[-1], 'webUrl': f"https://sharepoint.example.com/{path}"}
+
+            def _reply(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
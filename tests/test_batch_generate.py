@@ -0,0 +1,43 @@
+"""
+Bulk generation input tests
+Unparseable records are reported one by one and the rest of the file is read
+"""
+
+from batch_generate import main, read_rows
+
+
+def test_jsonl_rows_are_parsed_one_by_one(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text('{"entity_name": "Acme"}\n{"entity_name": \n\n["not", "an object"]\n{"entity_name": "Beta"}\n')
+
+    assert read_rows(str(path)) == [
+        ({'entity_name': 'Acme'}, None),
+        (None, "Line 2: invalid JSON (Expecting value)"),
+        (None, "Line 4: expected a JSON object, got list"),
+        ({'entity_name': 'Beta'}, None),
+    ]
+
+
+def test_csv_rows_with_the_wrong_field_count_are_reported(tmp_path):
+    path = tmp_path / 'rows.csv'
+    path.write_text('entity_name,state\nAcme,DE\nShort\nLong,DE,extra\n"Quoted, Inc",\n')
+
+    assert read_rows(str(path)) == [
+        ({'entity_name': 'Acme', 'state': 'DE'}, None),
+        (None, "Line 3: expected 2 fields, got 1"),
+        (None, "Line 4: expected 2 fields, got 3"),
+        ({'entity_name': 'Quoted, Inc'}, None),
+    ]
+
+
+def test_bad_records_do_not_stop_the_batch(tmp_path, capsys):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text('not json\n{}\n')
+    report = tmp_path / 'report.jsonl'
+
+    assert main(['DE_LLC', str(path), '--workers', '0', '--report', str(report)]) == 1
+
+    lines = report.read_text().splitlines()
+    assert len(lines) == 2
+    assert '"row": 0' in lines[0] and 'Line 1: invalid JSON' in lines[0]
+    assert '"row": 1' in lines[1]
@@ -0,0 +1,64 @@
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import LegalCase, RecurringFee
+from app.money import Money, ZERO
+from app.services.billing_run import run_billing
+
+
+class FlakyDispatcher:
+    """Records every dispatched transfer; the first one times out after reaching Circle"""
+
+    def __init__(self):
+        self.transfers = []
+
+    def dispatch_transfers(self, transfers):
+        futures = []
+        for transfer in transfers:
+            self.transfers.append(transfer)
+            future = Future()
+            future.set_result(None if len(self.transfers) == 1 else f'challenge_{len(self.transfers)}')
+            futures.append(future)
+        return futures
+
+
+def _fee(user_id, amount, due_at):
+    case = LegalCase(user_id=user_id, service_id='DE_LLC', form_data={}, client_wallet_id='client',
+                     total_price_usdc='150.00', recurring_fee_usdc=ZERO, status='COMPLETE')
+    db.session.add(case)
+    db.session.flush()
+    fee = RecurringFee(case_id=case.id, client_fee_wallet_id='fee_wallet', amount_usdc=Money.parse(amount),
+                       interval_days=365, next_due_at=due_at, next_run_at=due_at)
+    db.session.add(fee)
+    db.session.commit()
+    return fee.id
+
+
+def test_failed_group_is_retried_with_same_key_after_group_changes(app, user):
+    now = datetime.utcnow()
+    user_id = user.id
+    first_id = _fee(user_id, '100.00', now - timedelta(minutes=1))
+    dispatcher = FlakyDispatcher()
+
+    report = run_billing(dispatcher, 'law_firm')
+    assert report['transfers_failed'] == 1
+    failed = dispatcher.transfers[0]
+
+    # Before the retry: the fee's amount changes and a second fee on the wallet falls due
+    first = db.session.get(RecurringFee, first_id)
+    first.amount_usdc = Money.parse('250.00')
+    first.next_run_at = now - timedelta(seconds=1)
+    second_id = _fee(user_id, '40.00', now - timedelta(minutes=1))
+
+    report = run_billing(dispatcher, 'law_firm')
+    assert report['transfers_submitted'] == 2
+    retried, new = dispatcher.transfers[1:]
+    assert retried == failed
+    assert new['idempotency_key'] != failed['idempotency_key']
+    assert new['amount_usdc'] == '40.00'
+
+    for fee_id in (first_id, second_id):
+        fee = db.session.get(RecurringFee, fee_id)
+        assert fee.pending_transfer_key is None
+        assert fee.next_due_at > now
@@ -0,0 +1,137 @@
+"""
+Document agent tests
+One Graph session per process, shared by concurrent uploads to a local
+Graph server over pooled keep-alive connections; large files go through
+resumable upload sessions
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from app.agents import document_agent
+from app.agents.document_agent import DocumentAgent, get_graph_session
+from tests.mock_graph import MockGraph
+
+
+class FakeTokenCache:
+    def get_token(self):
+        return 'graph-token'
+
+    def invalidate(self):
+        pass
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    graph = MockGraph().start()
+    monkeypatch.setattr(document_agent, '_graph_session', None)
+    yield graph
+    graph.stop()
+
+
+@pytest.fixture
+def agent(graph, tmp_path, monkeypatch):
+    """Agent that uploads to the mock Graph server instead of running in mock mode"""
+    agent = DocumentAgent(mock_mode=True)
+    agent.mock_mode = False
+    agent.graph_base_url = graph.url
+    agent.site_id, agent.drive_id = 'site', 'drive'
+    agent.token_cache = FakeTokenCache()
+    agent.local_storage_path = str(tmp_path / 'document_storage')
+    return agent
+
+
+def test_concurrent_first_use_builds_one_session(monkeypatch):
+    monkeypatch.setattr(document_agent, '_graph_session', None)
+
+    class SlowSession(requests.Session):
+        def __init__(self):
+            time.sleep(0.05)  # widen the window between the check and the assignment
+            super().__init__()
+
+    monkeypatch.setattr(document_agent.requests, 'Session', SlowSession)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: get_graph_session(), range(8)))
+
+    assert len({id(session) for session in sessions}) == 1
+
+
+def test_concurrent_uploads_share_pooled_connections(agent, graph):
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        urls = list(executor.map(
+            lambda i: agent.upload_document(f"Document {i}", f"doc_{i}.txt", i), range(40)))
+
+    assert urls == [f"https://sharepoint.example.com/Case_{i}_Locker/doc_{i}.txt" for i in range(40)]
+    assert graph.files['Case_7_Locker/doc_7.txt'] == b'Document 7'
+    assert len(graph.client_ports) <= 4
+
+
+def test_throttled_upload_is_retried_on_the_session(agent, graph):
+    graph.failures = [503, 429]
+
+    url = agent.upload_document("Operating agreement", 'agreement.txt', 12)
+
+    assert url == "https://sharepoint.example.com/Case_12_Locker/agreement.txt"
+    assert graph.bodies == [b'Operating agreement'] * 3
+
+
+def test_retried_file_upload_resends_the_whole_file(agent, graph, tmp_path):
+    path = tmp_path / 'operating_agreement.pdf'
+    path.write_bytes(b'%PDF-1.7 operating agreement')
+    graph.failures = [503]
+
+    url = agent.upload_file(str(path), 'operating_agreement.pdf', 12)
+
+    assert url == "https://sharepoint.example.com/Case_12_Locker/operating_agreement.pdf"
+    assert graph.bodies == [b'%PDF-1.7 operating agreement'] * 2
+    assert graph.files['Case_12_Locker/operating_agreement.pdf'] == b'%PDF-1.7 operating agreement'
+
+
+CHUNK_SIZE = 320 * 1024
+
+
+@pytest.fixture
+def large_file(tmp_path, monkeypatch):
+    """A file just over three chunks, sent through an upload session"""
+    monkeypatch.setattr(document_agent, 'SIMPLE_UPLOAD_LIMIT', CHUNK_SIZE)
+    path = tmp_path / 'exhibits.pdf'
+    path.write_bytes(bytes(i % 251 for i in range(CHUNK_SIZE * 3)) + b'%%EOF')
+    return path
+
+
+def test_large_file_is_uploaded_in_ranges(agent, graph, large_file):
+    url = agent.upload_file(str(large_file), 'exhibits.pdf', 12, chunk_size=CHUNK_SIZE)
+
+    assert url == "https://sharepoint.example.com/Case_12_Locker/exhibits.pdf"
+    assert graph.files['Case_12_Locker/exhibits.pdf'] == large_file.read_bytes()
+    assert [len(body) for body in graph.bodies] == [CHUNK_SIZE] * 3 + [5]
+
+
+def test_failed_chunk_resumes_the_upload_session(agent, graph, large_file, monkeypatch):
+    monkeypatch.setattr(document_agent, 'GRAPH_BACKOFF_FACTOR', 0)
+    agent.session = document_agent._build_graph_session()
+    # The second chunk fails past the session's own retries
+    graph.failures = [None] + [503] * (document_agent.GRAPH_MAX_RETRIES + 1)
+
+    url = agent.upload_file(str(large_file), 'exhibits.pdf', 12, chunk_size=CHUNK_SIZE)
+
+    assert url == "https://sharepoint.example.com/Case_12_Locker/exhibits.pdf"
+    assert graph.files['Case_12_Locker/exhibits.pdf'] == large_file.read_bytes()
+    # Resumed at the second chunk, not restarted from the first
+    second_chunk = large_file.read_bytes()[CHUNK_SIZE:2 * CHUNK_SIZE]
+    sends = document_agent.GRAPH_MAX_RETRIES + 2
+    assert graph.bodies[1:1 + sends] == [second_chunk] * sends
+    assert len(graph.bodies) == sends + 3
+
+
+def test_upload_session_that_does_not_advance_falls_back_to_local(agent, graph, large_file, tmp_path):
+    graph.stale_ranges = True
+
+    path = agent.upload_file(str(large_file), 'exhibits.pdf', 12, chunk_size=CHUNK_SIZE)
+
+    assert path == str(tmp_path / 'document_storage' / 'Case_12_Locker' / 'exhibits.pdf')
+    assert len(graph.bodies) == 1
+    assert not graph.files
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import EscrowRelease, EscrowSettlement, LegalCase
+from app.money import ZERO
+from app.services import escrow_settlement
+from app.services.escrow_settlement import apply_settlement_outcomes, record_release, settle_releases
+
+
+class FlakyWalletAgent:
+    """Records every submission; the first one times out after reaching Circle"""
+
+    def __init__(self):
+        self.submissions = []
+
+    def initiate_gasless_transfer(self, from_wallet_id, to_address, amount_usdc, idempotency_key=None):
+        self.submissions.append(idempotency_key)
+        if len(self.submissions) == 1:
+            return None
+        return f'challenge_{len(self.submissions)}'
+
+
+def _release_case(user):
+    case = LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, client_wallet_id='client',
+                     total_price_usdc='150.00', recurring_fee_usdc=ZERO, status='COMPLETE')
+    db.session.add(case)
+    db.session.flush()
+    record_release(case, 'escrow', 'main')
+    db.session.commit()
+    return case
+
+
+def _age_settlements():
+    """Move every settlement past the resubmission grace period"""
+    EscrowSettlement.query.update({
+        EscrowSettlement.created_at: datetime.utcnow() - escrow_settlement.ESCROW_SUBMIT_GRACE - timedelta(seconds=1)
+    })
+    db.session.commit()
+
+
+def test_failed_submission_is_retried_with_same_key(app, user):
+    _release_case(user)
+    agent = FlakyWalletAgent()
+
+    report = settle_releases(agent, force=True)
+    assert report['failed'] == 1
+    settlement = EscrowSettlement.query.one()
+    assert settlement.state == 'CREATED'
+    assert EscrowRelease.query.one().status == 'SETTLING'
+
+    # The next window must not net the release into a second settlement
+    settle_releases(agent, force=True)
+    assert EscrowSettlement.query.count() == 1
+    assert len(agent.submissions) == 1
+
+    _age_settlements()
+    report = settle_releases(agent, force=True)
+    assert report['settlements'] == 1
+    assert EscrowSettlement.query.count() == 1
+    assert settlement.state == 'SUBMITTED'
+    assert agent.submissions[0] == agent.submissions[1]
+
+
+def test_release_returns_to_pending_only_when_transfer_fails(app, user):
+    _release_case(user)
+    agent = FlakyWalletAgent()
+    settle_releases(agent, force=True)
+    _age_settlements()
+    settle_releases(agent, force=True)
+    settlement = EscrowSettlement.query.one()
+
+    apply_settlement_outcomes({settlement.challenge_id: 'FAILED'})
+    db.session.commit()
+    assert settlement.state == 'FAILED'
+    release = EscrowRelease.query.one()
+    assert release.status == 'PENDING' and release.settlement_id is None
@@ -0,0 +1,69 @@
+import itertools
+import sys
+import types
+
+import pytest
+
+from app.agents.graph_token_cache import TOKEN_REFRESH_RETRY_SECONDS, GraphTokenCache
+
+
+class FakeAzureAD:
+    """Stands in for msal: each app caches its token until under 300 s remain, like MSAL"""
+
+    def __init__(self, lifetime=3600):
+        self.lifetime = lifetime
+        self.issued = itertools.count(1)
+        self.now = 0.0
+
+    def module(self):
+        azure = self
+
+        class ConfidentialClientApplication:
+            def __init__(self, client_id, authority=None, client_credential=None):
+                self.token = None
+
+            def acquire_token_for_client(self, scopes):
+                if self.token is None or self.token[1] - azure.now < 300:
+                    self.token = (f'token_{next(azure.issued)}', azure.now + azure.lifetime)
+                return {'access_token': self.token[0], 'expires_in': int(self.token[1] - azure.now)}
+
+        return types.SimpleNamespace(ConfidentialClientApplication=ConfidentialClientApplication)
+
+
+@pytest.fixture
+def azure(monkeypatch):
+    azure = FakeAzureAD()
+    monkeypatch.setitem(sys.modules, 'msal', azure.module())
+    monkeypatch.setattr('app.agents.graph_token_cache.time.time', lambda: azure.now)
+    return azure
+
+
+@pytest.fixture
+def cache(azure):
+    cache = GraphTokenCache('tenant', 'client', 'secret', refresh_margin=600)
+    yield cache
+    cache.shutdown()
+
+
+def test_invalidate_gets_a_new_token(cache):
+    assert cache.get_token() == 'token_1'
+    cache.invalidate()
+    assert cache.get_token() == 'token_2'
+
+
+def test_proactive_refresh_gets_a_new_token(cache, azure):
+    cache.get_token()
+    azure.now = 3600 - 600
+    cache._background_refresh()
+    assert cache.access_token == 'token_2'
+    assert cache._timer is not None and cache.expires_at == azure.now + 3600
+
+
+def test_short_lived_token_is_used_and_refresh_rescheduled(azure):
+    azure.lifetime = 400
+    cache = GraphTokenCache('tenant', 'client', 'secret', refresh_margin=600)
+    try:
+        assert cache.get_token()
+        assert cache._timer.interval == TOKEN_REFRESH_RETRY_SECONDS
+    finally:
+        cache.shutdown()
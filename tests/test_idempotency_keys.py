@@ -0,0 +1,27 @@
+from app import create_app, create_tables
+from app.agents import circle_wallet_agent
+from app.agents.circle_wallet_agent import transfer_idempotency_key
+from config import TestingConfig
+
+
+def test_key_is_stable_within_a_database(app):
+    assert transfer_idempotency_key('payment', 1) == transfer_idempotency_key('payment', 1)
+    assert transfer_idempotency_key('payment', 1) != transfer_idempotency_key('payment', 2)
+
+
+def test_reset_database_gets_new_keys(app, tmp_path, monkeypatch):
+    first = transfer_idempotency_key('payment', 1)
+
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'reset.db'}")
+    with create_app('testing').app_context():
+        create_tables()
+        assert transfer_idempotency_key('payment', 1) != first
+
+
+def test_configured_salt_is_used(app, monkeypatch):
+    unsalted = transfer_idempotency_key('payment', 1)
+    monkeypatch.setattr(circle_wallet_agent, 'CIRCLE_IDEMPOTENCY_SALT', 'staging')
+    staging = transfer_idempotency_key('payment', 1)
+    monkeypatch.setattr(circle_wallet_agent, 'CIRCLE_IDEMPOTENCY_SALT', 'production')
+    assert staging != unsalted
+    assert staging != transfer_idempotency_key('payment', 1)
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for `import run` in a fresh interpreter (cold starts on Vercel/gunicorn)
+IMPORT_BUDGET_SECONDS = float(os.environ.get('IMPORT_BUDGET_SECONDS', '1.5'))
+
+# SDKs that must only be imported when an agent is first used
+LAZY_MODULES = ('web3', 'google.generativeai', 'elevenlabs', 'apscheduler', 'msal', 'httpx')
+
+
+def _import_run():
+    script = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        "import run\n"
+        "print(time.perf_counter() - started)\n"
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    # An unusable database path proves importing never touches the database
+    env = dict(os.environ, DATABASE_URL='sqlite:////nonexistent/dir/agent_ledger.db')
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    seconds, loaded = result.stdout.splitlines()[-2:]
+    return float(seconds), [module for module in loaded.split(',') if module]
+
+
+def test_import_run_within_budget():
+    seconds, loaded = _import_run()
+    assert loaded == []
+    assert seconds < IMPORT_BUDGET_SECONDS, f"import run took {seconds:.2f}s (budget {IMPORT_BUDGET_SECONDS}s)"
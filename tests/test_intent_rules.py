@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from app.agents.ai_intent_agent import AiIntentAgent
+from app.agents.intent_cache import MemoryIntentCache
+from app.agents.intent_prompts import get_prompt_registry
+from benchmark_intents import DEFAULT_CORPUS, run_rules
+
+
+@pytest.fixture(scope='module')
+def rules():
+    return get_prompt_registry().rules
+
+
+@pytest.mark.parametrize('text', [
+    "Do not approve case 42",
+    "Don't approve case 42 yet",
+    "Should I approve case 42?",
+    "I can't sign off on case 12",
+    "Approve case 42 once the client confirms the agent address",
+    "approve case 42 and case 43",
+])
+def test_hedged_review_defers_to_llm(rules, text):
+    _, confidence = rules.extract_review(text)
+    assert not rules.is_confident(confidence)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("Approve case 42", {'action': 'approve', 'case_id': 42}),
+    ("Reject case 9, not enough detail", {'action': 'reject', 'case_id': 9, 'memo': 'not enough detail'}),
+    ("Comment on case 8: can the client confirm?", {'action': 'comment', 'case_id': 8, 'memo': 'can the client confirm?'}),
+])
+def test_memo_does_not_hedge_instruction(rules, text, expected):
+    data, confidence = rules.extract_review(text)
+    assert rules.is_confident(confidence)
+    assert data == expected
+
+
+def test_mock_agent_does_not_approve_refusal():
+    agent = AiIntentAgent(mock_mode=True, cache=MemoryIntentCache())
+    assert agent.get_intent_from_text_review("Do not approve case 1", use_cache=False) is None
+
+
+def test_field_ends_at_next_label(rules):
+    data, confidence = rules.extract_order(
+        "Form a Delaware LLC called Foo LLC, registered agent Bob at 1 Main St, authorized person Jane Roe")
+    assert rules.is_confident(confidence)
+    assert data['registered_agent_address'] == '1 Main St'
+    assert data['authorized_person_name'] == 'Jane Roe'
+
+
+def test_field_ends_at_next_label_without_punctuation(rules):
+    data, _ = rules.extract_order(
+        "File a UCC-1 debtor is Northwind secured party is First Capital collateral is all equipment")
+    assert data['debtor_name'] == 'Northwind'
+    assert data['secured_party_name'] == 'First Capital'
+    assert data['collateral_description'] == 'all equipment'
+
+
+def test_own_label_inside_value(rules):
+    data, _ = rules.extract_order(
+        "Form a Delaware LLC called Collateral Partners LLC, registered agent is Acme Registered Agent Co "
+        "at 1 Main St; authorized person Jane")
+    assert data['entity_name'] == 'Collateral Partners LLC'
+    assert data['registered_agent_name'] == 'Acme Registered Agent Co'
+
+
+def test_corpus_has_no_wrong_local_answers(rules):
+    with open(DEFAULT_CORPUS) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    report = run_rules(corpus, rules, repeat=1)
+    assert report['failures'] == []
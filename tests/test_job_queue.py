@@ -0,0 +1,56 @@
+"""
+Job queue tests
+Running jobs keep their claim fresh, and re-approval updates the memo
+"""
+
+import time
+
+from sqlalchemy import select
+
+from app import db
+from app.models import Job, LegalCase
+from app.money import ZERO
+from app.services import job_queue
+from app.services.case_pipeline import enqueue_approval
+from app.services.job_queue import claim_next, enqueue, job_handler, run_inline, run_job
+
+heartbeats = []
+
+
+@job_handler('slow_test_job')
+def slow_test_job(job, seconds):
+    started = db.session.get(Job, job.id).locked_at
+    time.sleep(seconds)
+    with db.engine.connect() as conn:
+        heartbeats.append((started, conn.execute(select(Job.locked_at).where(Job.id == job.id)).scalar()))
+
+
+def test_heartbeat_refreshes_the_claim_of_a_long_job(app, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_HEARTBEAT_SECONDS', 0.05)
+    heartbeats.clear()
+    job = enqueue('slow_test_job', payload={'seconds': 0.3})
+    job = claim_next('worker-a')
+
+    assert run_job(job)
+
+    started, refreshed = heartbeats[0]
+    assert refreshed > started
+    assert db.session.get(Job, job.id).status == 'DONE'
+
+
+def test_reapproval_replaces_the_memo(app, user):
+    case = LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, total_price_usdc='150.00',
+                     recurring_fee_usdc=ZERO, status='PENDING_REVIEW', document_url='https://docs.example.com/1.md')
+    db.session.add(case)
+    db.session.commit()
+
+    first = enqueue_approval(case, 'Looks good')
+    run_inline(first)
+    db.session.refresh(case)
+    assert case.pipeline_stage == 'DONE' and case.lawyer_memo == 'Looks good'
+
+    second = enqueue_approval(case, 'Corrected: registered agent confirmed')
+    assert second.id == first.id
+    db.session.refresh(case)
+    assert case.lawyer_memo == 'Corrected: registered agent confirmed'
+    assert case.status == 'PENDING_APPROVAL'
@@ -0,0 +1,61 @@
+"""
+Money column migration tests
+Text amounts from before micro-USDC are converted exactly, NOT NULL is kept,
+and amounts Money cannot represent stop the migration
+"""
+
+import re
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+
+from app import db
+from app.models import RecurringFee
+from app.money import Money
+from migrate_money_columns import convert_all
+
+
+def _legacy_recurring_fees(amounts):
+    """Recreate recurring_fees with a text amount column and the given amounts"""
+    db.session.remove()
+    table = db.metadata.tables['recurring_fees']
+    ddl = str(CreateTable(table).compile(db.engine))
+    ddl = re.sub(r'amount_usdc BIGINT', 'amount_usdc VARCHAR(20)', ddl)
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP TABLE recurring_fees"))
+        conn.execute(text(ddl))
+        for case_id, amount in enumerate(amounts, start=1):
+            conn.execute(text(
+                "INSERT INTO recurring_fees (case_id, client_fee_wallet_id, amount_usdc, interval_days, status, "
+                "next_due_at, next_run_at) VALUES (:case_id, 'w', :amount, 365, 'ACTIVE', "
+                "'2026-01-01 00:00:00', '2026-01-01 00:00:00')"
+            ), {'case_id': case_id, 'amount': amount})
+
+
+def _amount_column():
+    return next(c for c in inspect(db.engine).get_columns('recurring_fees') if c['name'] == 'amount_usdc')
+
+
+def test_sqlite_rebuild_keeps_not_null_and_indexes(app):
+    _legacy_recurring_fees(['50.00', ' 0.000001', '1234.5'])
+
+    assert convert_all(batch_size=2)
+
+    column = _amount_column()
+    assert 'INT' in str(column['type']).upper()
+    assert column['nullable'] is False
+    indexes = {index['name'] for index in inspect(db.engine).get_indexes('recurring_fees')}
+    assert 'ix_recurring_fees_status_next_run_at' in indexes
+    assert [fee.amount_usdc for fee in RecurringFee.query.order_by(RecurringFee.id)] == \
+        [Money.parse('50.00'), Money(1), Money.parse('1234.5')]
+
+    assert convert_all()  # already converted: nothing to do
+
+
+def test_sub_micro_amounts_stop_the_migration(app, capsys):
+    _legacy_recurring_fees(['50.00', '0.0000001'])
+
+    assert not convert_all()
+
+    assert 'VARCHAR' in str(_amount_column()['type']).upper()
+    assert "id 2: '0.0000001'" in capsys.readouterr().out
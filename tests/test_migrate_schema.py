@@ -0,0 +1,49 @@
+"""
+Schema migration tests
+A jobs table from before stage/result gains both columns
+"""
+
+from sqlalchemy import inspect, text
+
+from app import db
+from app.models import Job
+from migrate_schema import add_column_sql, missing_columns, upgrade
+
+
+def _drop_job_columns():
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text("ALTER TABLE jobs DROP COLUMN stage"))
+        conn.execute(text("ALTER TABLE jobs DROP COLUMN result"))
+
+
+def test_adds_missing_job_columns(app):
+    _drop_job_columns()
+    assert {(t.name, c.name) for t, c in missing_columns()} == {('jobs', 'stage'), ('jobs', 'result')}
+
+    assert upgrade() == 2
+    columns = {c['name'] for c in inspect(db.engine).get_columns('jobs')}
+    assert {'stage', 'result'} <= columns
+
+    db.session.add(Job(kind='voice_order', stage='TRANSCRIBING'))
+    db.session.commit()
+    assert missing_columns() == []
+
+
+def test_dry_run_changes_nothing(app):
+    _drop_job_columns()
+    assert upgrade(dry_run=True) == 2
+    assert len(missing_columns()) == 2
+    assert upgrade() == 2
+    assert upgrade() == 0
+
+
+def test_not_null_columns_keep_their_default(app):
+    jobs = db.metadata.tables['jobs']
+    sql, as_declared = add_column_sql(jobs, jobs.c.status)
+    assert sql.endswith("status VARCHAR(20) DEFAULT 'PENDING' NOT NULL")
+    assert as_declared
+
+    sql, as_declared = add_column_sql(jobs, jobs.c.kind)
+    assert 'NOT NULL' not in sql
+    assert not as_declared
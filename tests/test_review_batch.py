@@ -0,0 +1,95 @@
+"""
+Batch review tests
+Request size caps of the batch route, and cases whose document was already
+uploaded are not uploaded again
+"""
+
+import io
+import json
+
+import pytest
+
+from app import db
+from app.agents.intent_prompts import ReviewTask
+from app.models import Job, LegalCase
+from app.money import ZERO, Money
+from app.services.review_batch import apply_reviews
+
+
+@pytest.fixture
+def small_limits(app, tmp_path):
+    app.config.update(
+        RUN_JOBS_INLINE=False,
+        VOICE_UPLOAD_DIR=str(tmp_path / 'voice'),
+        VOICE_MAX_UPLOAD_BYTES=1000,
+        MAX_CONTENT_LENGTH=2000,
+        REVIEW_BATCH_MAX_BYTES=4000,
+        MAX_CONTENT_LENGTH_BY_ENDPOINT={'legal.lawyer_submit_review_batch': 10000}
+    )
+
+
+def _clips(count, size=900):
+    return [(io.BytesIO(b'x' * size), f'clip{i}.webm') for i in range(count)]
+
+
+def test_batch_route_accepts_more_than_one_clip_limit(client, small_limits):
+    response = client.post('/legal/review/batch', data={'audio': _clips(4)}, content_type='multipart/form-data')
+    assert response.status_code == 202
+    job = db.session.get(Job, response.get_json()['job_id'])
+    assert len(json.loads(job.payload)['items']) == 4
+
+
+def test_batch_audio_is_capped_in_total(client, small_limits):
+    response = client.post('/legal/review/batch', data={'audio': _clips(5)}, content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert 'Batch audio exceeds' in response.get_json()['error']
+    assert Job.query.count() == 0
+
+
+def test_other_routes_keep_the_app_wide_limit(client, small_limits):
+    response = client.post('/legal/review/voice', data={'audio': _clips(3)}, content_type='multipart/form-data')
+    assert response.status_code == 413
+    assert not response.is_json
+
+
+class FakeFactory:
+    def __init__(self):
+        self.rows = []
+
+    def generate_batch(self, service_id, rows):
+        self.rows.extend(rows)
+        return [{'ok': True, 'content': 'doc', 'filename': f"case_{row['case_id']}.md"} for row in rows]
+
+
+class FakeDocumentAgent:
+    def __init__(self):
+        self.uploaded = []
+
+    def upload_documents(self, documents, max_concurrency=8):
+        documents = list(documents)
+        self.uploaded.extend(case_id for _, _, case_id in documents)
+        return [f"https://docs.example.com/{filename}" for _, filename, _ in documents]
+
+
+def test_cases_with_a_document_are_not_uploaded_again(app, user):
+    cases = [
+        LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, total_price_usdc=Money.parse('150.00'),
+                  recurring_fee_usdc=ZERO, status='PENDING_REVIEW', document_url=url)
+        for url in (None, 'https://docs.example.com/earlier.md')
+    ]
+    db.session.add_all(cases)
+    db.session.commit()
+
+    extracted = [
+        {'item': i, 'transcript': f"Approve case {case.id}", 'error': None,
+         'review': ReviewTask(action='approve', case_id=case.id, memo='ok')}
+        for i, case in enumerate(cases)
+    ]
+    factory, doc_agent = FakeFactory(), FakeDocumentAgent()
+    results = apply_reviews(extracted, factory, doc_agent)
+
+    assert doc_agent.uploaded == [cases[0].id]
+    assert [row['case_id'] for row in factory.rows] == [cases[0].id]
+    assert results[0]['ok'] and cases[0].status == 'PENDING_APPROVAL'
+    assert not results[1]['ok'] and 'already has an uploaded document' in results[1]['error']
+    assert cases[1].document_url == 'https://docs.example.com/earlier.md'
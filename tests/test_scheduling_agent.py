@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from app import db
+from app.agents.scheduling_agent import SchedulingAgent
+from app.models import LegalCase, RecurringFee
+from app.money import ZERO
+
+
+def test_second_approval_does_not_move_due_date(app, user):
+    case = LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, client_wallet_id='client',
+                     total_price_usdc='150.00', recurring_fee_usdc=ZERO, status='COMPLETE')
+    db.session.add(case)
+    db.session.commit()
+    agent = SchedulingAgent()
+
+    agent.schedule_annual_payment(case.id, 'fee_wallet', '100.00')
+    db.session.commit()
+    fee = RecurringFee.query.one()
+
+    # The first period is billed
+    fee.next_due_at += timedelta(days=365)
+    fee.next_run_at = fee.next_due_at
+    db.session.commit()
+    paid_through = fee.next_due_at
+
+    agent.schedule_annual_payment(case.id, 'new_fee_wallet', '120.00')
+    db.session.commit()
+    fee = RecurringFee.query.one()
+    assert fee.next_due_at == paid_through
+    assert fee.next_run_at == paid_through
+    assert fee.client_fee_wallet_id == 'new_fee_wallet'
+    assert str(fee.amount_usdc) == '120.00'
@@ -0,0 +1,53 @@
+"""
+Service catalog tests
+Ambiguous aliases are rejected at load, and a missing services.json is
+reported once rather than on every poll
+"""
+
+import json
+
+import pytest
+
+from app.services import service_catalog
+from app.services.service_catalog import CatalogError, ServiceCatalog
+
+
+def _services():
+    with open(service_catalog.SERVICES_PATH) as f:
+        return json.load(f)
+
+
+def test_alias_used_by_two_services_is_rejected(tmp_path):
+    services = _services()
+    services[1]['aliases'] = list(services[1].get('aliases', [])) + [services[0]['aliases'][0].upper()]
+    path = tmp_path / 'services.json'
+    path.write_text(json.dumps(services))
+
+    with pytest.raises(CatalogError) as error:
+        ServiceCatalog.load(str(path))
+    assert f"is already used by {services[0]['id']}" in str(error.value)
+
+
+def test_shipped_catalog_has_no_ambiguous_aliases():
+    assert len(ServiceCatalog.load()) == len(_services())
+
+
+def test_stat_failure_is_reported_once(tmp_path, monkeypatch, capsys):
+    contents = json.dumps(_services())
+    path = tmp_path / 'services.json'
+    path.write_text(contents)
+    monkeypatch.setattr(service_catalog, 'SERVICES_PATH', str(path))
+    monkeypatch.setattr(service_catalog, 'SERVICE_CATALOG_POLL_SECONDS', 0)
+    monkeypatch.setattr(service_catalog, '_catalog', ServiceCatalog.load(str(path)))
+    monkeypatch.setattr(service_catalog, '_stat_failing', False)
+
+    path.unlink()
+    for _ in range(3):
+        service_catalog.get_catalog()
+    assert capsys.readouterr().out.count("Cannot stat services.json") == 1
+
+    path.write_text(contents)
+    service_catalog.get_catalog()
+    path.unlink()
+    service_catalog.get_catalog()
+    assert capsys.readouterr().out.count("Cannot stat services.json") == 1
@@ -0,0 +1,119 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from app import db
+from app.agents import circle_wallet_agent
+from app.agents.circle_wallet_agent import CircleWalletAgent, get_circle_session
+from app.agents.registry import get_registry
+from app.models import CircleTransfer, LegalCase
+from app.money import ZERO, Money
+from app.services.transfer_tracker import poll_transfers, track_transfer
+from tests.mock_circle import MockCircle
+
+
+@pytest.fixture
+def circle(monkeypatch):
+    circle = MockCircle().start()
+    monkeypatch.setattr(circle_wallet_agent, 'CIRCLE_API_BASE_URL', f"{circle.url}/v1/w3s")
+    monkeypatch.setattr(circle_wallet_agent, 'CIRCLE_WEBHOOK_KEY_URL', f"{circle.url}/v2/notifications/publicKey")
+    monkeypatch.setattr(circle_wallet_agent, '_webhook_keys', {})
+    yield circle
+    circle.stop()
+
+
+@pytest.fixture
+def wallet_agent(app, circle):
+    """Agent that talks to the mock Circle server instead of running in mock mode"""
+    agent = CircleWalletAgent(mock_mode=True)
+    agent.mock_mode = False
+    agent.api_key = 'test-api-key'
+    get_registry(app)._agents['wallet'] = agent
+    return agent
+
+
+@pytest.fixture
+def payment(user):
+    case = LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, client_wallet_id='client_wallet',
+                     total_price_usdc=Money.parse('150.00'), recurring_fee_usdc=ZERO, status='PAYMENT_SUBMITTED',
+                     payment_challenge_id='tx_1')
+    db.session.add(case)
+    db.session.flush()
+    transfer = track_transfer('tx_1', 'payment', case_id=case.id,
+                              from_wallet_id='client_wallet', to_address='escrow_wallet')
+    db.session.commit()
+    return case, transfer
+
+
+def _notify(client, body, headers=None):
+    return client.post('/legal/webhooks/circle', data=body, content_type='application/json', headers=headers or {})
+
+
+def test_unsigned_webhook_is_rejected(client, circle, wallet_agent, payment):
+    case, transfer = payment
+    due = transfer.next_check_at
+    circle.states['tx_1'] = 'COMPLETE'
+    body = json.dumps({'notificationType': 'transactions.outbound', 'notification': {'id': 'tx_1'}}).encode()
+
+    assert _notify(client, body).status_code == 401
+    forged = dict(circle.sign(b'{}'))
+    assert _notify(client, body, forged).status_code == 401
+
+    db.session.refresh(transfer)
+    assert transfer.next_check_at == due
+    assert not any(path.startswith('/v1/w3s/transactions') for path in circle.requests)
+    assert db.session.get(LegalCase, case.id).status == 'PAYMENT_SUBMITTED'
+
+
+def test_signed_webhook_settles_payment(client, circle, wallet_agent, payment):
+    case, transfer = payment
+    circle.states['tx_1'] = 'COMPLETE'
+    body = json.dumps({'notificationType': 'transactions.outbound', 'notification': {'id': 'tx_1'}}).encode()
+
+    response = _notify(client, body, circle.sign(body))
+    assert response.status_code == 200
+    assert response.get_json()['tracked'] == 1
+
+    db.session.expire_all()
+    assert db.session.get(CircleTransfer, transfer.id).state == 'COMPLETE'
+    assert db.session.get(LegalCase, case.id).status == 'PENDING_REVIEW'
+
+
+def test_polling_backs_off_then_applies_failure(app, circle, wallet_agent, payment):
+    case_id, transfer_id = payment[0].id, payment[1].id
+    circle.states['tx_1'] = 'QUEUED'
+    CircleTransfer.query.update({CircleTransfer.next_check_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+    assert poll_transfers(wallet_agent) == {'checked': 1, 'settled': 0}
+    transfer = db.session.get(CircleTransfer, transfer_id)
+    assert transfer.state == 'QUEUED' and transfer.checks == 1
+    assert transfer.next_check_at > datetime.utcnow()
+    assert poll_transfers(wallet_agent) == {'checked': 0, 'settled': 0}
+
+    circle.states['tx_1'] = 'FAILED'
+    CircleTransfer.query.update({CircleTransfer.next_check_at: datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+    assert poll_transfers(wallet_agent) == {'checked': 1, 'settled': 1}
+    transfer = db.session.get(CircleTransfer, transfer_id)
+    assert transfer.state == 'FAILED' and transfer.next_check_at is None
+    assert db.session.get(LegalCase, case_id).status == 'PENDING_PAYMENT'
+
+
+def test_concurrent_first_use_builds_one_circle_session(monkeypatch):
+    monkeypatch.setattr(circle_wallet_agent, '_circle_session', None)
+
+    class SlowSession(requests.Session):
+        def __init__(self):
+            time.sleep(0.05)  # widen the window between the check and the assignment
+            super().__init__()
+
+    monkeypatch.setattr(circle_wallet_agent.requests, 'Session', SlowSession)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: get_circle_session(), range(8)))
+
+    assert len({id(session) for session in sessions}) == 1
@@ -0,0 +1,99 @@
+"""
+Wallet balance tests
+Balances are read from a mock Arc node in one batch, served from cache, and
+re-read once a transfer recorded by another process moves the wallet's funds
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from app import db
+from app.agents import circle_wallet_agent, wallet_balance_cache
+from app.agents.circle_wallet_agent import CircleWalletAgent, get_arc_session
+from app.agents.wallet_balance_cache import WalletBalanceCache
+from app.models import CircleTransfer
+from app.services.transfer_tracker import track_transfer
+from tests.mock_arc import MockArc
+
+CLIENT = '0x' + 'aa' * 20
+ESCROW = '0x' + 'bb' * 20
+OTHER = '0x' + 'cc' * 20
+
+
+@pytest.fixture
+def arc(monkeypatch):
+    arc = MockArc().start()
+    monkeypatch.setattr(wallet_balance_cache, '_balance_cache', WalletBalanceCache(ttl=300))
+    monkeypatch.setattr(circle_wallet_agent, '_wallet_addresses',
+                        {'client_wallet': CLIENT, 'escrow_wallet': ESCROW, 'other_wallet': OTHER})
+    yield arc
+    arc.stop()
+
+
+@pytest.fixture
+def wallet_agent(app, arc):
+    """Agent that reads balances from the mock node instead of running in mock mode"""
+    agent = CircleWalletAgent(mock_mode=True)
+    agent.mock_mode = False
+    agent.arc_rpc_url = arc.url
+    return agent
+
+
+def _balances(agent):
+    balances = agent.get_wallet_balances(['client_wallet', 'escrow_wallet', 'other_wallet'])
+    return {wallet_id: balance['balance'] for wallet_id, balance in balances.items()}
+
+
+def test_balances_are_read_in_one_batch_and_cached(wallet_agent, arc):
+    arc.balances = {CLIENT: 150_000_000, ESCROW: 0, OTHER: 1_500_000}
+
+    assert _balances(wallet_agent) == {'client_wallet': '150.000000', 'escrow_wallet': '0.000000',
+                                       'other_wallet': '1.500000'}
+    assert len(arc.batches) == 1 and len(arc.batches[0]) == 3
+
+    arc.balances[CLIENT] = 0
+    assert _balances(wallet_agent)['client_wallet'] == '150.000000'
+    assert len(arc.batches) == 1
+
+
+def test_transfer_settled_elsewhere_drops_cached_balances(wallet_agent, arc):
+    # Submitted before the balances were read
+    transfer = track_transfer('tx_1', 'payment', from_wallet_id='client_wallet', to_address=ESCROW)
+    transfer.created_at = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+
+    arc.balances = {CLIENT: 150_000_000, ESCROW: 0, OTHER: 1_500_000}
+    _balances(wallet_agent)
+
+    # scheduler.py settles it: only the database changes, not this process's cache
+    arc.balances.update({CLIENT: 0, ESCROW: 150_000_000, OTHER: 0})
+    CircleTransfer.query.filter_by(challenge_id='tx_1').update(
+        {CircleTransfer.state: 'COMPLETE', CircleTransfer.settled_at: datetime.utcnow()})
+    db.session.commit()
+
+    assert _balances(wallet_agent) == {'client_wallet': '0.000000', 'escrow_wallet': '150.000000',
+                                       'other_wallet': '1.500000'}
+    assert [len(batch) for batch in arc.batches] == [3, 2]
+
+    # Settled before the re-read, so served from cache again
+    _balances(wallet_agent)
+    assert len(arc.batches) == 2
+
+
+def test_concurrent_first_use_builds_one_arc_session(monkeypatch):
+    monkeypatch.setattr(circle_wallet_agent, '_arc_session', None)
+
+    class SlowSession(requests.Session):
+        def __init__(self):
+            time.sleep(0.05)  # widen the window between the check and the assignment
+            super().__init__()
+
+    monkeypatch.setattr(circle_wallet_agent.requests, 'Session', SlowSession)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        sessions = list(executor.map(lambda _: get_arc_session(), range(8)))
+
+    assert len({id(session) for session in sessions}) == 1
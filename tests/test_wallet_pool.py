@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app.agents.circle_wallet_agent import CircleWalletAgent
+from app.agents.registry import get_registry
+from app.models import Job, LegalCase, PooledWallet, User
+from app.money import ZERO, Money
+from app.services import wallet_pool
+from app.services.app_settings import WALLET_SET_ID, get_setting
+from app.services.job_queue import run_inline
+from app.services.wallet_pool import WalletPoolShortfall, client_wallet_for, replenish, request_refill
+
+
+class ShortWalletAgent(CircleWalletAgent):
+    """Mock agent whose create_wallets call fails after `limit` wallets"""
+
+    def __init__(self, limit):
+        super().__init__(mock_mode=True)
+        self.limit = limit
+
+    def create_wallets(self, count, wallet_set_id=None):
+        wallets = super().create_wallets(min(count, self.limit), wallet_set_id)
+        self.limit -= len(wallets)
+        return wallets
+
+
+def test_concurrent_requests_queue_one_refill(app):
+    first = request_refill()
+    second = request_refill()
+    assert first.id == second.id
+    assert Job.query.filter_by(kind='refill_wallet_pool').count() == 1
+
+
+def test_finished_refill_is_rearmed(app, monkeypatch):
+    get_registry(app)._agents['wallet'] = CircleWalletAgent(mock_mode=True)
+    monkeypatch.setattr(wallet_pool, 'WALLET_POOL_TARGET', 5)
+    job = request_refill()
+    assert run_inline(job)
+    assert db.session.get(Job, job.id).status == 'DONE'
+
+    PooledWallet.query.delete()
+    db.session.commit()
+    job = request_refill()
+    assert job.status == 'PENDING'
+    assert Job.query.filter_by(kind='refill_wallet_pool').count() == 1
+
+
+def test_partial_refill_raises_after_pooling(app):
+    with pytest.raises(WalletPoolShortfall):
+        replenish(ShortWalletAgent(limit=3), target=10)
+    assert PooledWallet.query.filter_by(status='READY').count() == 3
+
+
+def test_partial_refill_job_assigns_and_retries(app, user):
+    get_registry(app)._agents['wallet'] = ShortWalletAgent(limit=3)
+    case = LegalCase(user_id=user.id, service_id='DE_LLC', form_data={}, status='PENDING_PAYMENT',
+                     total_price_usdc=Money.parse('150.00'), recurring_fee_usdc=ZERO)
+    db.session.add(case)
+    db.session.commit()
+
+    job = request_refill()
+    assert not run_inline(job)
+    job = db.session.get(Job, job.id)
+    assert job.status == 'PENDING' and 'Circle created 3' in job.last_error
+    assert db.session.get(LegalCase, case.id).client_wallet_id is not None
+
+
+def test_wallet_set_is_shared_through_the_database(app):
+    first = CircleWalletAgent(mock_mode=True).get_wallet_set_id()
+    assert CircleWalletAgent(mock_mode=True).get_wallet_set_id() == first
+    assert get_setting(WALLET_SET_ID) == first
+
+
+def test_concurrent_first_order_releases_losing_wallet(app, user):
+    replenish(CircleWalletAgent(mock_mode=True), target=2)
+    # Another request gave the user a wallet after this one loaded the user
+    db.session.execute(update(User).where(User.id == user.id).values(wallet_id='winner_wallet'),
+                       execution_options={'synchronize_session': False})
+    assert user.wallet_id is None
+
+    assert client_wallet_for(user) == 'winner_wallet'
+    db.session.commit()
+    assert user.wallet_id == 'winner_wallet'
+    assert PooledWallet.query.filter_by(status='READY').count() == 2
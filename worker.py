@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Agent-Ledger: Background Job Worker
+Runs queued jobs (document generation and upload after lawyer approval,
+voice transcription and intent extraction) off the web request path.
+Start one or more alongside the web app.
+
+Usage:
+    python worker.py
+    python worker.py --poll-interval 2 --once
+"""
+
+import argparse
+import os
+import sys
+
+from app import create_app, create_tables
+from app.services.job_queue import run_worker
+import app.services.case_pipeline  # noqa: F401  (registers pipeline job handlers)
+import app.services.voice_pipeline  # noqa: F401  (registers voice job handlers)
+import app.services.review_batch  # noqa: F401  (registers the batch review handler)
+import app.services.wallet_pool  # noqa: F401  (registers the wallet pool refill handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued background jobs")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="Seconds to wait when the queue is empty")
+    parser.add_argument('--worker-id', default=None, help="Name recorded on claimed jobs (default: host:pid)")
+    parser.add_argument('--once', action='store_true', help="Run all currently due jobs, then exit")
+    args = parser.parse_args(argv)
+
+    app = create_app(os.getenv('FLASK_ENV') or 'development')
+    with app.app_context():
+        create_tables()
+        try:
+            run_worker(poll_interval=args.poll_interval, worker_id=args.worker_id, once=args.once)
+        except KeyboardInterrupt:
+            print("👋 Job worker stopped")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())